@@ -0,0 +1,370 @@
+"""
+    Sample pages of every retailer for the offline benchmarks.
+
+    Pages reproduce the markup and JSON the scrapers read, wrapped in
+    the navigation, scripts and footer a real page carries, so partial
+    parsing has something to skip. They are written to
+    benchmarks/fixtures/ and committed:
+
+        python benchmarks/fixtures.py [--products 48]
+
+    A page recorded from the live site can replace any of them, the file
+    name is all the benchmarks look at.
+"""
+import argparse
+import json
+
+from pathlib import Path
+
+
+PATH_FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+NAMES = [
+    'Halfvolle melk', 'Volkoren brood', 'Jonge kaas plakken', 'Pindakaas',
+    'Appelsap', 'Bananen', 'Kipfilet', 'Spaghetti', 'Tomatensoep',
+    'Koffiebonen', 'Hagelslag', 'Roomboter', 'Yoghurt naturel', 'Eieren',
+]
+
+UNITS = ['1 liter', '800 g', '500 g', '350 g', '1,5 liter', '6 stuks', '1 kg']
+
+
+def product(number: int) -> dict:
+    euros = 1 + number % 9
+    cents = (number * 37) % 100
+    return {
+        'id': 100000 + number,
+        'name': f"{NAMES[number % len(NAMES)]} {number}",
+        'slug': f"product-{number}",
+        'unit': UNITS[number % len(UNITS)],
+        'euros': str(euros),
+        'cents': f"{cents:02}",
+        'price': euros + cents / 100,
+        'old_euros': str(euros + 1),
+        'discount': number % 3 == 0,
+    }
+
+
+def page(body: str, title: str) -> str:
+    """
+        return html page with body between the parts every page has
+    """
+    navigation = ''.join(
+        f'<li class="menu__item"><a href="/categorie-{number}">'
+        f'Categorie {number}</a></li>'
+        for number in range(60)
+    )
+    scripts = ''.join(
+        f'<script>window.__data{number} = '
+        f'{json.dumps({"id": number, "items": list(range(40))})};</script>'
+        for number in range(20)
+    )
+    footer = ''.join(
+        f'<div class="footer__column"><h4>Service {number}</h4>'
+        f'<p>Klantenservice, openingstijden en bezorging</p></div>'
+        for number in range(12)
+    )
+    return (
+        f'<!DOCTYPE html><html lang="nl"><head><meta charset="utf-8">'
+        f'<title>{title}</title>'
+        f'<link rel="stylesheet" href="/static/main.css">{scripts}</head>'
+        f'<body><header class="header"><nav class="menu"><ul>{navigation}'
+        f'</ul></nav></header><main>{body}</main>'
+        f'<footer class="footer">{footer}</footer></body></html>'
+    )
+
+
+def aldi(count: int, start: int = 0) -> str:
+    tiles = ''
+    for item in map(product, range(start, start + count)):
+        previous = (
+            f'<s class="price__previous">{item["old_euros"]}.{item["cents"]}</s>'
+            if item['discount'] else ''
+        )
+        tiles += (
+            f'<div class="mod mod-article-tile mod-article-tile--default">'
+            f'<a href="/product/{item["slug"]}.article.html">'
+            f'<img class="img-responsive" data-srcset="'
+            f'/images/{item["id"]}-s.jpg 200w, /images/{item["id"]}-l.jpg 400w">'
+            f'<span class="mod-article-tile__title"> {item["name"]} </span>'
+            f'</a><div class="price"><span class="price__unit">{item["unit"]}'
+            f'</span>{previous}<span class="price__wrapper">'
+            f'{item["euros"]}.{item["cents"]}</span></div></div>'
+        )
+    return page(f'<div class="tiles-grid">{tiles}</div>', 'ALDI')
+
+
+def coop(count: int, start: int = 0) -> str:
+    columns = ''
+    for item in map(product, range(start, start + count)):
+        columns += (
+            f'<div class="product-list__column ng-star-inserted">'
+            f'<a href="/producten/{item["slug"]}">'
+            f'<img class="product-image ng-star-inserted" itemprop="image" '
+            f'src="https://static.coop.nl/{item["id"]}.png"></a>'
+            f'<p itemprop="name">{item["name"]}</p>'
+            f'<meta itemprop="price" content="{item["price"]:.2f}">'
+            f'</div>'
+        )
+    return page(
+        f'<custom-product-list class="ng-star-inserted">{columns}'
+        f'</custom-product-list>',
+        'Coop'
+    )
+
+
+def deka(count: int, start: int = 0) -> str:
+    cards = ''
+    for item in map(product, range(start, start + count)):
+        regular = (
+            f'<span class="price--before-decimal--regular price-2">'
+            f'{item["old_euros"]}.</span>'
+            f'<span class="price--after-decimal--regular price-2">'
+            f'{item["cents"]}</span>'
+            if item['discount'] else ''
+        )
+        cards += (
+            f'<article class="deka-product-card">'
+            f'<a class="deka-product-card--image" '
+            f'href="/producten/{item["slug"]}">'
+            f'<img src="https://static.dekamarkt.nl/{item["id"]}.jpg"></a>'
+            f'<h3 class="deka-product-card--info--title product-card-title-1">'
+            f'{item["name"]}</h3><div class="price">{regular}'
+            f'<span class="price--before-decimal--offer price-1">'
+            f'{item["euros"]}.</span>'
+            f'<span class="price--after-decimal--offer price-2">'
+            f'{item["cents"]}</span></div></article>'
+        )
+    return page(f'<section class="offers">{cards}</section>', 'Dekamarkt')
+
+
+def dirk_price(item: dict) -> str:
+    old = (
+        f'<div class="product-card__price__old"> {item["old_euros"]}.'
+        f'{item["cents"]} </div>'
+        if item['discount'] else ''
+    )
+    return (
+        f'<div class="product-card__price">{old}'
+        f'<span class="product-card__price__euros">{item["euros"]}.</span>'
+        f'<span class="product-card__price__cents">{item["cents"]}</span>'
+        f'</div>'
+    )
+
+
+def dirk_listing(count: int, start: int = 0, detail_every: int = 0) -> str:
+    """
+        :detail_every: every detail_every-th card has no price, so its
+                product page is fetched, 0 - every card is complete
+    """
+    cards = ''
+    for number, item in enumerate(map(product, range(start, start + count))):
+        price = '' if detail_every and number % detail_every == 0 \
+            else dirk_price(item)
+        cards += (
+            f'<div class="product-card">'
+            f'<a class="product-card__image" '
+            f'href="/boodschappen/{item["slug"]}/{item["id"]}">'
+            f'<img src="https://d3r3h30p75xj6a.cloudfront.net/{item["id"]}.png">'
+            f'</a><p class="product-card__name"> {item["name"]} </p>'
+            f'{price}</div>'
+        )
+    return page(
+        f'<div class="products-list-container">'
+        f'<div class="products-wrapper">{cards}</div></div>',
+        'Dirk'
+    )
+
+
+def dirk_product(count: int, start: int = 0) -> str:
+    item = product(start + count)
+    related = ''.join(
+        f'<div class="related__card">{related["name"]}</div>'
+        for related in map(product, range(start, start + count))
+    )
+    return page(
+        f'<div class="product-details">'
+        f'<div class="product-details__image">'
+        f'<img src="https://d3r3h30p75xj6a.cloudfront.net/{item["id"]}.png">'
+        f'</div><div class="product-details__info">'
+        f'<h1 class="product-details__info__title">{item["name"]}</h1>'
+        f'<p>{item["unit"]}</p></div>{dirk_price(item)}</div>'
+        f'<section class="related">{related}</section>',
+        'Dirk'
+    )
+
+
+def janlinders_catalog(count: int, start: int = 0, pages: int = 5) -> str:
+    items = ''
+    for item in map(product, range(start, start + count)):
+        items += (
+            f'<div class="item_container">'
+            f'<div class="item_imgcontainer">'
+            f'<img src="https://www.janlinders.nl/media/{item["id"]}.jpg"></div>'
+            f'<span class="teaser">{item["unit"]} </span>'
+            f'<h3 class="item_header"><a href="producten/{item["slug"]}.html">'
+            f'{item["name"]}</a></h3>'
+            f'<div class="pricebox"><span class="price">{item["euros"]}.'
+            f'<sup>{item["cents"]}</sup></span></div></div>'
+        )
+    pagination = ''.join(
+        f'<a class="link{" last" if number == pages else ""}" '
+        f'href="?page_n={number}" title="Pagina {number}">{number}</a>'
+        for number in range(1, pages + 1)
+    ) if pages > 1 else ''
+    return page(
+        f'<div class="catalog_list_items">{items}</div>'
+        f'<div class="pagination block">{pagination}</div>',
+        'Jan Linders'
+    )
+
+
+def janlinders_offers(count: int, start: int = 0) -> str:
+    offers = ''
+    for item in map(product, range(start, start + count)):
+        offers += (
+            f'<div class="offer_container">'
+            # Offers link the product pages of the catalog the same way,
+            # so they are merged into the catalog products
+            f'<h3 class="item_header"><a href="producten/{item["slug"]}.html">'
+            f'{item["name"]}</a></h3>'
+            f'<img class="error" src="/media/offers/{item["id"]}.jpg">'
+            f'<span class="teaser"><span class="strikethrough">'
+            f'{item["old_euros"]}.{item["cents"]}</span></span>'
+            f'<div class="labels"> 2e halve prijs </div></div>'
+        )
+    return page(f'<div class="offers">{offers}</div>', 'Jan Linders')
+
+
+def jumbo(count: int, start: int = 0) -> str:
+    cards = ''
+    for item in map(product, range(start, start + count)):
+        tag = (
+            '<span class="jum-tag prominent">1 + 1 gratis</span>'
+            if item['discount'] else ''
+        )
+        cards += (
+            f'<article class="product-container">'
+            f'<img class="image" '
+            f'src="https://static.jumbo.com/product_images/{item["id"]}.png">'
+            f'<a class="title-link" href="/producten/{item["slug"]}">'
+            f'{item["name"]}</a>'
+            f'<div class="subtitle"><a href="#">{item["unit"]}</a>'
+            f'<a href="#">per stuk</a></div>{tag}'
+            f'<div class="current-price"><span>{item["euros"]}</span>'
+            f'<sup>{item["cents"]}</sup></div></article>'
+        )
+    pages = ''.join(
+        f'<span class="page">{number}</span>' for number in range(1, 8)
+    )
+    return page(
+        f'<div class="jum-card-grid">{cards}</div>'
+        f'<div class="pages-grid">{pages}</div>',
+        'Jumbo'
+    )
+
+
+def vomar(count: int, start: int = 0) -> str:
+    products = ''
+    for item in map(product, range(start, start + count)):
+        discount = (
+            '<img class="discount" src="/images/discount.png">'
+            if item['discount'] else ''
+        )
+        products += (
+            f'<div class="product">'
+            f'<a href="/producten/{item["slug"]}">'
+            f'<img src="https://d3vricquig1bbs.cloudfront.net/{item["id"]}.png">'
+            f'</a>{discount}<p class="description">{item["name"]}</p>'
+            f'<span class="price"><span class="large">{item["euros"]}.</span>'
+            f'<span class="small">{item["cents"]}</span></span></div>'
+        )
+    return page(f'<div id="products">{products}</div>', 'Vomar')
+
+
+def hoogvliet(count: int, start: int = 0, pages: int = 12) -> str:
+    return json.dumps({
+        'properties': {'nrofpages': pages, 'nrofitems': pages * count},
+        'items': [
+            {
+                'itemno': str(item['id']),
+                'title': item['name'],
+                'url': f"https://www.hoogvliet.com/product/{item['slug']}",
+                'image': f"https://www.hoogvliet.com/INTERSHOP/{item['id']}.jpg",
+                'price': item['price'],
+                'labels': [],
+            }
+            for item in map(product, range(start, start + count))
+        ],
+    })
+
+
+def poiesz_products(count: int, start: int = 0, pages: int = 9) -> str:
+    return json.dumps({
+        'paging': {'pages': pages, 'page': 1},
+        'items': [
+            {
+                'id': item['id'],
+                'name': item['name'],
+                'description': item['unit'],
+                'image': f"https://webwinkel.poiesz-supermarkten.nl/artikelen/{item['id']}.png",
+                'price': item['price'],
+            }
+            for item in map(product, range(start, start + count))
+        ],
+    })
+
+
+def poiesz_offers(count: int, start: int = 0) -> str:
+    def offer(item: dict) -> dict:
+        return {
+            'commercialTextLine1': item['name'],
+            'commercialTextDetailsLine1': item['unit'],
+            'commercialTextDetailsLine2': None,
+            'commercialTextDetailsLine3': None,
+            'newPriceLow': item['price'],
+            'oldPriceHigh': item['price'] + 1,
+            'offerTypeLine1': '2e halve prijs',
+            'offerTypeLine2': None,
+            'offerTypeLine3': None,
+            'productIDs': [item['id'], item['id'] + 50000],
+        }
+
+    items = list(map(product, range(start, start + count // 2)))
+    return json.dumps({
+        'categories': [
+            {'name': f"Categorie {number}", 'offers': list(map(offer, items[number::4]))}
+            for number in range(4)
+        ],
+    })
+
+
+# File of a fixture -> function which renders it for a number of products
+FIXTURES = {
+    'aldi/tiles.html': aldi,
+    'coop/products.html': coop,
+    'deka/offers.html': deka,
+    'dirk/listing.html': dirk_listing,
+    'dirk/product.html': dirk_product,
+    'janlinders/catalog.html': janlinders_catalog,
+    'janlinders/offers.html': janlinders_offers,
+    'jumbo/grid.html': jumbo,
+    'vomar/products.html': vomar,
+    'hoogvliet/products.json': hoogvliet,
+    'poiesz/products.json': poiesz_products,
+    'poiesz/offers.json': poiesz_offers,
+}
+
+
+def write_fixtures(count: int) -> None:
+    for name, render in FIXTURES.items():
+        path = PATH_FIXTURES / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(render(count), encoding='utf-8')
+        print(f"{name}: {path.stat().st_size // 1024} KiB")
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--products', type=int, default=48,
+                      help='products on one listing page')
+    write_fixtures(args.parse_args().products)
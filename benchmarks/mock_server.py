@@ -0,0 +1,433 @@
+"""
+    Local mock of the retailers for end-to-end benchmarks.
+
+    Every retailer is served on its own port, so it is a host of its own
+    for the scheduler, with a synthetic catalog in the page shapes its
+    scraper reads:
+
+    - Aldi, Coop, Vomar: category, subcategory and product pages
+    - Dirk: the same plus a product page of every product, every fourth
+      product card misses its price so its product page is fetched
+    - Jan Linders: category and subcategory pages, paginated product
+      pages and the offers of the week
+    - Hoogvliet: the paginated JSON API
+    - Poiesz: the paginated JSON API, paged by a header, the offers API
+      and /data.json with the categories the scraper reads from a file
+    - Deka: the offers page
+
+    Jumbo needs a browser, it isn't mocked.
+
+        python benchmarks/mock_server.py [--products 10000]
+                [--categories 10] [--per-page 48]
+                [--latency 0.02] [--error-rate 0.01] [--port 8700]
+
+    The first line printed is json retailer -> base url.
+"""
+import argparse
+import json
+import math
+import random
+import sys
+import threading
+import time
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import parse_qs, urlsplit
+
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+import fixtures  # noqa: E402
+
+
+# Retailers with categories, subcategories and product pages
+CATALOG_RETAILERS = ['aldi', 'coop', 'vomar', 'dirk', 'janlinders']
+
+# Retailers whose subcategories have several pages of products
+PAGINATED_RETAILERS = ['janlinders', 'poiesz']
+
+# Pages of one subcategory of a paginated retailer
+LISTING_PAGES = 3
+
+# Retailers which share the products of the catalog. Deka has one page
+# of offers, offers of Jan Linders and Poiesz are one request each
+PAGED_RETAILERS = CATALOG_RETAILERS + ['hoogvliet', 'poiesz']
+
+RETAILERS = PAGED_RETAILERS + ['deka']
+
+# Products of the Dirk listing without a price, fetched from their page
+DIRK_DETAIL_EVERY = 4
+
+Page = Tuple[int, str, str]
+
+
+def aldi_categories(links: List[Tuple[str, str]]) -> str:
+    tiles = ''.join(
+        f'<div class="mod mod-content-tile"><a class="link link--primary" '
+        f'href="{link}"><h4 class="mod-content-tile__title">{name}</h4></a>'
+        f'</div>'
+        for name, link in links
+    )
+    return fixtures.page(f'<div class="tiles-grid">{tiles}</div>', 'ALDI')
+
+
+def coop_categories(links: List[Tuple[str, str]]) -> str:
+    tiles = ''.join(
+        f'<custom-category-tile class="ng-star-inserted"><a href="{link}">'
+        f'<div class="category-tile__name">{name}</div></a>'
+        f'</custom-category-tile>'
+        for name, link in links
+    )
+    return fixtures.page(
+        f'<custom-category-list><div id="listContainer">{tiles}</div>'
+        f'</custom-category-list>',
+        'Coop'
+    )
+
+
+def vomar_categories(links: List[Tuple[str, str]], is_sub: bool) -> str:
+    container, card = ('department', 'department-group') if is_sub \
+        else ('productrange', 'col-xs-6')
+    cards = ''.join(
+        f'<div class="{card}"><a href="{link}"><span>{name}</span></a></div>'
+        for name, link in links
+    )
+    return fixtures.page(f'<div class="{container}">{cards}</div>', 'Vomar')
+
+
+def dirk_categories(links: List[Tuple[str, str]]) -> str:
+    items = ''.join(
+        f'<li><a href="{link}">{name}</a></li>' for name, link in links
+    )
+    return fixtures.page(
+        f'<nav class="product-category-header__nav"><ul>{items}</ul></nav>',
+        'Dirk'
+    )
+
+
+def janlinders_categories(links: List[Tuple[str, str]], is_sub: bool) -> str:
+    # The scraper joins MAIN_URL + '/' + href
+    if is_sub:
+        items = ''.join(
+            f'<li class="catalog_navigation_item even"><a href="{link[1:]}">'
+            f'<span class="title">{name}</span></a></li>'
+            for name, link in links
+        )
+        return fixtures.page(
+            f'<div id="main"><div class="inside"><ul>{items}</ul></div></div>',
+            'Jan Linders'
+        )
+    items = ''.join(
+        f'<li class="catalog_navigation_item replace_commas even">'
+        f'<a href="{link[1:]}">{name}</a></li>'
+        for name, link in links
+    )
+    return fixtures.page(
+        f'<div class="mod_catalog_navigation"><ul>{items}</ul></div>',
+        'Jan Linders'
+    )
+
+
+class MockRetailer:
+    """
+        Synthetic catalog of one retailer.
+
+        Products are split into pages of per_page products. A subcategory
+        is one page, or LISTING_PAGES pages of a paginated retailer, and
+        belongs to one of at most categories categories. Every request
+        waits latency seconds and fails with 503 at error_rate, except
+        /data.json: the benchmark downloads it once as a file of the
+        scraper, it isn't crawled.
+    """
+
+    def __init__(
+            self,
+            name: str,
+            products: int,
+            categories: int = 10,
+            per_page: int = 48,
+            latency: float = 0,
+            error_rate: float = 0
+    ) -> None:
+        self.name = name
+        self.per_page = per_page
+        self.latency = latency
+        self.error_rate = error_rate
+        self.pages = max(1, math.ceil(products / per_page))
+        self.listing_pages = LISTING_PAGES if name in PAGINATED_RETAILERS else 1
+        self.listings = math.ceil(self.pages / self.listing_pages)
+        self.categories = min(categories, self.listings)
+        self.subcategories = math.ceil(self.listings / self.categories)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def listing(self, category: int, subcategory: int) -> Optional[Tuple[int, int]]:
+        """
+            return (first page, pages) of subcategory, None if there's none
+        """
+        number = category * self.subcategories + subcategory
+        if category >= self.categories or subcategory >= self.subcategories \
+                or number >= self.listings:
+            return None
+        first = number * self.listing_pages
+        return first, min(self.listing_pages, self.pages - first)
+
+    def subcategory_links(self, category: int) -> List[Tuple[str, str]]:
+        return [
+            (f"Subcategorie {category}.{sub}", f"/c/{category}/{sub}")
+            for sub in range(self.subcategories)
+            if self.listing(category, sub) is not None
+        ]
+
+    def categories_page(self, links: List[Tuple[str, str]], is_sub: bool) -> str:
+        if self.name == 'aldi':
+            return aldi_categories(links)
+        if self.name == 'coop':
+            return coop_categories(links)
+        if self.name == 'dirk':
+            return dirk_categories(links)
+        if self.name == 'janlinders':
+            return janlinders_categories(links, is_sub)
+        return vomar_categories(links, is_sub)
+
+    def products_page(self, page: int, pages: int) -> str:
+        """
+            :page: page of the whole catalog
+            :pages: pages of its subcategory
+        """
+        start = page * self.per_page
+        if self.name == 'dirk':
+            return fixtures.dirk_listing(
+                self.per_page, start=start, detail_every=DIRK_DETAIL_EVERY)
+        if self.name == 'janlinders':
+            return fixtures.janlinders_catalog(
+                self.per_page, start=start, pages=pages)
+        if self.name == 'poiesz':
+            return fixtures.poiesz_products(
+                self.per_page, start=start, pages=pages)
+        render = getattr(fixtures, self.name)
+        return render(self.per_page, start=start)
+
+    def listing_page(self, category: int, subcategory: int, page: int) -> Page:
+        """
+            return page of subcategory, counted from 1
+        """
+        listing = self.listing(category, subcategory)
+        if listing is None or not 1 <= page <= listing[1]:
+            return 404, 'text/plain', 'not found'
+        first, pages = listing
+        content_type = 'application/json' if self.name == 'poiesz' else 'text/html'
+        return 200, content_type, self.products_page(first + page - 1, pages)
+
+    def catalog_route(self, parts: List[str], query: Dict[str, List[str]]) -> Page:
+        """
+            / - categories, /c/<category> - subcategories,
+            /c/<category>/<subcategory>[?page_n=<page>] - products
+        """
+        if not parts:
+            links = [
+                (f"Categorie {category}", f"/c/{category}")
+                for category in range(self.categories)
+            ]
+            return 200, 'text/html', self.categories_page(links, False)
+        if parts[0] != 'c' or not all(map(str.isdigit, parts[1:])):
+            return 404, 'text/plain', 'not found'
+        if len(parts) == 2:
+            links = self.subcategory_links(int(parts[1]))
+            return 200, 'text/html', self.categories_page(links, True)
+        if len(parts) == 3:
+            page = int(query.get('page_n', ['1'])[0])
+            return self.listing_page(int(parts[1]), int(parts[2]), page)
+        return 404, 'text/plain', 'not found'
+
+    def poiesz_categories(self) -> str:
+        """
+            return categories in the shape of data.json of PoieszScrapper
+        """
+        return json.dumps([
+            {
+                'name': f"categorie-{category}",
+                'subcategories': [
+                    f"subcategorie-{sub}"
+                    for sub in range(self.subcategories)
+                    if self.listing(category, sub) is not None
+                ],
+            }
+            for category in range(self.categories)
+        ])
+
+    def poiesz_route(self, parts: List[str], headers: dict) -> Page:
+        """
+            /data.json - categories, /api/v1.0/offers - offers,
+            /api/v1.0/products/<category>/<subcategory>/products with
+            a page header - products
+        """
+        if parts == ['data.json']:
+            return 200, 'application/json', self.poiesz_categories()
+        if parts == ['api', 'v1.0', 'offers']:
+            return 200, 'application/json', fixtures.poiesz_offers(self.per_page)
+        if len(parts) == 6 and parts[:3] == ['api', 'v1.0', 'products']:
+            category = parts[3].rsplit('-', 1)[-1]
+            subcategory = parts[4].rsplit('-', 1)[-1]
+            page = headers.get('page', '1')
+            if category.isdigit() and subcategory.isdigit() and page.isdigit():
+                return self.listing_page(int(category), int(subcategory), int(page))
+            return 404, 'text/plain', 'not found'
+        return 200, 'text/html', fixtures.page('', self.name)
+
+    def route(self, path: str, query: Dict[str, List[str]], headers: dict) -> Page:
+        """
+            return (status, content type, body) of path
+        """
+        parts = [part for part in path.split('/') if part]
+        if self.name == 'dirk' and parts[:1] == ['boodschappen'] and len(parts) == 3:
+            # Product page, /boodschappen/<slug>/<id>
+            if not parts[2].isdigit():
+                return 404, 'text/plain', 'not found'
+            return 200, 'text/html', fixtures.dirk_product(
+                0, int(parts[2]) - fixtures.product(0)['id'])
+        if self.name == 'janlinders' and parts[:1] == ['aanbiedingen']:
+            return 200, 'text/html', fixtures.janlinders_offers(self.per_page)
+        if self.name in CATALOG_RETAILERS:
+            # The catalog page of every retailer has its own path
+            catalogs = (
+                ['producten.html'], ['categorie', 'boodschappen'],
+                ['producten'], ['boodschappen'], ['ons-assortiment.html'],
+            )
+            if parts in catalogs:
+                parts = []
+            elif not parts:
+                return 200, 'text/html', fixtures.page('', self.name)
+            return self.catalog_route(parts, query)
+        if self.name == 'poiesz':
+            return self.poiesz_route(parts, headers)
+        if self.name == 'hoogvliet':
+            if parts != ['navigation']:
+                return 200, 'text/html', fixtures.page('', self.name)
+            page = int(query.get('tn_p', ['1'])[0])
+            return 200, 'application/json', fixtures.hoogvliet(
+                self.per_page,
+                start=(page - 1) * self.per_page,
+                pages=self.pages
+            )
+        if self.name == 'deka':
+            if parts != ['aanbiedingen']:
+                return 200, 'text/html', fixtures.page('', self.name)
+            return 200, 'text/html', fixtures.deka(self.per_page)
+        return 404, 'text/plain', 'not found'
+
+    def handle(self, url: str, headers: dict) -> Page:
+        with self.lock:
+            self.requests += 1
+        if self.latency:
+            time.sleep(self.latency)
+        parts = urlsplit(url)
+        if self.error_rate and parts.path != '/data.json' \
+                and random.random() < self.error_rate:
+            with self.lock:
+                self.errors += 1
+            return 503, 'text/plain', 'unavailable'
+        return self.route(parts.path, parse_qs(parts.query), headers)
+
+
+def make_handler(retailer: MockRetailer) -> type:
+
+    class MockHandler(BaseHTTPRequestHandler):
+
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self) -> None:
+            status, content_type, body = retailer.handle(self.path, self.headers)
+            data = body.encode('utf-8')
+            self.send_response(status)
+            self.send_header('Content-Type', f'{content_type}; charset=utf-8')
+            self.send_header('Content-Length', str(len(data)))
+            if status == 503:
+                self.send_header('Retry-After', '1')
+            self.end_headers()
+            self.wfile.write(data)
+
+        def log_message(self, *args) -> None:
+            pass
+
+    return MockHandler
+
+
+def serve(
+        products: int,
+        categories: int = 10,
+        per_page: int = 48,
+        latency: float = 0,
+        error_rate: float = 0,
+        host: str = '127.0.0.1',
+        port: int = 0
+) -> Dict[str, ThreadingHTTPServer]:
+    """
+        Start a server of every retailer in a daemon thread
+
+        :products: products of all retailers together, split evenly,
+                Deka adds one page of offers
+        :port: port of the first retailer, the next ones follow it,
+                0 - any free ports
+
+        return retailer -> running server
+    """
+    servers = {}
+    share = math.ceil(products / len(PAGED_RETAILERS))
+    for number, name in enumerate(RETAILERS):
+        retailer = MockRetailer(
+            name,
+            share,
+            categories=categories,
+            per_page=per_page,
+            latency=latency,
+            error_rate=error_rate
+        )
+        server = ThreadingHTTPServer(
+            (host, port + number if port else 0),
+            make_handler(retailer)
+        )
+        server.daemon_threads = True
+        server.retailer = retailer
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        servers[name] = server
+    return servers
+
+
+def base_urls(servers: Dict[str, ThreadingHTTPServer]) -> Dict[str, str]:
+    return {
+        name: f"http://{server.server_address[0]}:{server.server_address[1]}"
+        for name, server in servers.items()
+    }
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--products', type=int, default=10000,
+                      help='products of all retailers together')
+    args.add_argument('--categories', type=int, default=10,
+                      help='categories of every catalog')
+    args.add_argument('--per-page', type=int, default=48,
+                      help='products on one page')
+    args.add_argument('--latency', type=float, default=0,
+                      help='seconds every response waits')
+    args.add_argument('--error-rate', type=float, default=0,
+                      help='share of requests answered with 503')
+    args.add_argument('--port', type=int, default=0,
+                      help='port of the first retailer, 0 - free ports')
+    args = args.parse_args()
+    servers = serve(
+        args.products,
+        categories=args.categories,
+        per_page=args.per_page,
+        latency=args.latency,
+        error_rate=args.error_rate,
+        port=args.port
+    )
+    print(json.dumps(base_urls(servers)), flush=True)
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        pass
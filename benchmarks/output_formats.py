@@ -0,0 +1,119 @@
+"""
+    Compare csv and parquet output of the handler: file size, write time
+    and load time of the whole file.
+
+        python benchmarks/output_formats.py [--count 200000] [--repeat 3]
+"""
+import argparse
+import csv
+import logging
+import sys
+import tempfile
+import time
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parser import parquet  # noqa: E402
+from parser.handler import ParserHandler  # noqa: E402
+from parser.prices import PriceNormalizer  # noqa: E402
+from parser.product import Product  # noqa: E402
+
+
+RETAILERS = ['AldiScraper', 'DirkScraper', 'JumboScraper', 'VomarScraper']
+
+
+def make_products(count: int) -> list:
+    products = [
+        Product(
+            name=f"Product {number}",
+            url=f"https://www.example.nl/producten/product-{number}",
+            img_url=f"https://www.example.nl/images/{number}.png",
+            description=f"{number % 1000} g",
+            price=f"{number % 10}.{number % 100:02}",
+            old_price=f"{number % 10 + number % 3}.{number % 100:02}",
+            sale='discount' if number % 3 else None,
+            retailer=RETAILERS[number % len(RETAILERS)],
+            category=f"Categorie {number % 40}",
+            subcategory=f"Subcategorie {number % 400}",
+        )
+        for number in range(count)
+    ]
+    return list(PriceNormalizer().normalize(products))
+
+
+def load_csv(path: Path) -> int:
+    with open(path, encoding='utf-8', newline='') as file:
+        return len(list(csv.reader(file))) - 1
+
+
+def load_arrow_csv(path: Path) -> int:
+    from pyarrow import csv as arrow_csv
+    return arrow_csv.read_csv(str(path)).num_rows
+
+
+def load_parquet(path: Path) -> int:
+    return parquet.read_parquet(path).num_rows
+
+
+def timed(func, *args) -> float:
+    start = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - start
+
+
+def run(count: int, repeat: int) -> None:
+    handler = ParserHandler(
+        path_webdriver=None,
+        ignore_scrapers=[
+            scraper.__name__ for scraper in ParserHandler.SCRAPER_CLASSES
+        ],
+        logging_level=logging.WARNING,
+        normalize_prices=False
+    )
+    products = make_products(count)
+    with tempfile.TemporaryDirectory() as directory:
+        path_csv = Path(directory, 'data.csv')
+        path_parquet = Path(directory, 'data.parquet')
+        results = {
+            'csv': (
+                path_csv,
+                min(timed(handler.save_csv, path_csv, products)
+                    for _ in range(repeat)),
+                {
+                    'csv module': min(timed(load_csv, path_csv)
+                                      for _ in range(repeat)),
+                    'pyarrow.csv': min(timed(load_arrow_csv, path_csv)
+                                       for _ in range(repeat)),
+                },
+            ),
+            'parquet': (
+                path_parquet,
+                min(timed(handler.save_parquet, path_parquet, products)
+                    for _ in range(repeat)),
+                {
+                    'read_parquet': min(timed(load_parquet, path_parquet)
+                                        for _ in range(repeat)),
+                },
+            ),
+        }
+        print(f"{count} products, best of {repeat}")
+        print(f"{'':<10}{'MiB':>8}{'write s':>10}  load s")
+        for name, (path, write, loads) in results.items():
+            load = ', '.join(
+                f"{reader} {seconds:.3f}" for reader, seconds in loads.items())
+            print(
+                f"{name:<10}{path.stat().st_size / 2 ** 20:>8.1f}"
+                f"{write:>10.3f}  {load}"
+            )
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--count', type=int, default=200000,
+                      help='how many products are written')
+    args.add_argument('--repeat', type=int, default=3,
+                      help='runs of every step, the best one is shown')
+    parsed = args.parse_args()
+    run(parsed.count, parsed.repeat)
@@ -0,0 +1,179 @@
+"""
+    Offline parse throughput of every scraper on the sample pages in
+    benchmarks/fixtures/ (see benchmarks/fixtures.py).
+
+    Runs the parsing half of collect_products, get_product,
+    get_discounts and get_offers of each scraper, where the products are
+    built by their wrapper_product_handler, and reports products per
+    second, microseconds per product and peak memory of one page.
+
+        python benchmarks/parse_throughput.py [--repeat 20] [--parser lxml]
+                [--output results.json] [--compare baseline.json]
+
+    Results are written as json, a later run compares itself against
+    them with --compare.
+"""
+import argparse
+import json
+import logging
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+
+from datetime import datetime, timezone
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parser import soup  # noqa: E402
+from parser.aldi.scraper import AldiScraper  # noqa: E402
+from parser.coop.scraper import CoopScraper  # noqa: E402
+from parser.deka.scraper import DekaScraper  # noqa: E402
+from parser.dirk.scraper import DirkScraper  # noqa: E402
+from parser.hoogvliet.scraper import HoogvlieScraper  # noqa: E402
+from parser.janlinders.scraper import JanlindersScraper  # noqa: E402
+from parser.jumbo.scraper import JumboScraper  # noqa: E402
+from parser.poiesz.scraper import PoieszScrapper  # noqa: E402
+from parser.vomar.scraper import VomarScraper  # noqa: E402
+
+
+PATH_FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+PATH_RESULTS = Path(__file__).resolve().parent / 'results' / 'parse_throughput.json'
+
+# Case -> (fixture, scraper, parse method, extra arguments of the method)
+CASES = {
+    'aldi tiles': ('aldi/tiles.html', AldiScraper, 'parse_products', ()),
+    'coop products': ('coop/products.html', CoopScraper, 'parse_products', ()),
+    'deka offers': ('deka/offers.html', DekaScraper, 'parse_discounts', ()),
+    'dirk listing': ('dirk/listing.html', DirkScraper, 'parse_listing', ()),
+    'dirk product': ('dirk/product.html', DirkScraper, 'parse_product',
+                     ('https://www.dirk.nl/boodschappen/product/1',)),
+    'janlinders catalog': ('janlinders/catalog.html', JanlindersScraper,
+                           'parse_products', ()),
+    'janlinders offers': ('janlinders/offers.html', JanlindersScraper,
+                          'parse_discounts', ()),
+    'jumbo grid': ('jumbo/grid.html', JumboScraper, 'parse_products', ()),
+    'vomar products': ('vomar/products.html', VomarScraper,
+                       'parse_products', ()),
+    'hoogvliet json': ('hoogvliet/products.json', HoogvlieScraper,
+                       'parse_products', ()),
+    'poiesz json': ('poiesz/products.json', PoieszScrapper,
+                    'parse_products', ()),
+    'poiesz offers': ('poiesz/offers.json', PoieszScrapper,
+                      'parse_offers', ()),
+}
+
+
+def make_scraper(scraper_class):
+    if scraper_class is JumboScraper:
+        # Jumbo starts a browser session in __init__,
+        # its parser needs nothing but the class attributes
+        return scraper_class.__new__(scraper_class)
+    return scraper_class(check=False)
+
+
+def parse(method, text: str, args: tuple) -> list:
+    products = method(text, *args)
+    return products if isinstance(products, list) else [products]
+
+
+def measure(method, text: str, args: tuple, repeat: int) -> dict:
+    products = parse(method, text, args)
+    seconds = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(method, text, args)
+        seconds.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    parse(method, text, args)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    count = len(products)
+    median = statistics.median(seconds)
+    return {
+        'products': count,
+        'page_bytes': len(text.encode('utf-8')),
+        'seconds_median': median,
+        'seconds_best': min(seconds),
+        'products_per_second': count / median if median else 0,
+        'us_per_product': median / count * 10 ** 6 if count else None,
+        'peak_memory_kib': peak / 1024,
+    }
+
+
+def run(repeat: int, cases: list) -> dict:
+    results = {}
+    scrapers = {}
+    for name in cases:
+        fixture, scraper_class, method_name, args = CASES[name]
+        path = PATH_FIXTURES / fixture
+        if not path.exists():
+            logging.warning(f"{name}: no {path}, run benchmarks/fixtures.py")
+            continue
+        if scraper_class not in scrapers:
+            scrapers[scraper_class] = make_scraper(scraper_class)
+        method = getattr(scrapers[scraper_class], method_name)
+        results[name] = measure(
+            method, path.read_text(encoding='utf-8'), args, repeat)
+    return results
+
+
+def print_results(results: dict, baseline: dict = None) -> None:
+    header = (
+        f"{'case':<22}{'products':>9}{'KiB':>7}{'products/s':>13}"
+        f"{'us/product':>12}{'peak KiB':>10}"
+    )
+    if baseline:
+        header += f"{'vs baseline':>13}"
+    print(header)
+    for name, result in results.items():
+        us = result['us_per_product']
+        row = (
+            f"{name:<22}{result['products']:>9}"
+            f"{result['page_bytes'] // 1024:>7}"
+            f"{result['products_per_second']:>13.0f}"
+            f"{us if us is not None else float('nan'):>12.1f}"
+            f"{result['peak_memory_kib']:>10.0f}"
+        )
+        before = (baseline or {}).get(name, {}).get('us_per_product')
+        if before and us:
+            row += f"{(us - before) / before:>+12.0%} "
+        print(row)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--repeat', type=int, default=20,
+                      help='timed parses of every page')
+    args.add_argument('--parser', default=None,
+                      help='BeautifulSoup backend, default the fastest one')
+    args.add_argument('--case', action='append', choices=list(CASES),
+                      help='run only this case, may be repeated')
+    args.add_argument('--output', type=Path, default=PATH_RESULTS,
+                      help='json file for the results')
+    args.add_argument('--compare', type=Path, default=None,
+                      help='json results of an earlier run')
+    args = args.parse_args()
+
+    backend = soup.set_backend(args.parser)
+    results = run(args.repeat, args.case or list(CASES))
+    baseline = None
+    if args.compare:
+        baseline = json.loads(args.compare.read_text())['results']
+    print(f"HTML parser: {backend}, {args.repeat} runs, median")
+    print_results(results, baseline)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps({
+        'created_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'html_parser': backend,
+        'repeat': args.repeat,
+        'results': results,
+    }, indent=4))
+    print(f"Results written to {args.output}")
@@ -0,0 +1,88 @@
+"""
+    Compare BeautifulSoup backends on the sample pages of every retailer
+    in benchmarks/fixtures/ (see benchmarks/fixtures.py), with full and
+    partial (SoupStrainer) parsing.
+
+    Every page is parsed by the parse method of its scraper, the same
+    ones as in parse_throughput.py, so building products from the tree
+    is timed along with building the tree. JSON pages aren't parsed by
+    BeautifulSoup, they are left out.
+
+        python benchmarks/parser_backends.py [--repeat 5]
+"""
+import argparse
+import logging
+import sys
+import time
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+sys.path.insert(0, str(Path(__file__).resolve().parent))
+
+from parser import soup  # noqa: E402
+from parse_throughput import CASES, PATH_FIXTURES, make_scraper, parse  # noqa: E402
+
+
+# Cases of html pages
+HTML_CASES = [
+    name for name, (fixture, *_) in CASES.items() if fixture.endswith('.html')
+]
+
+
+def measure(method, text: str, args: tuple, backend: str, strained: bool, repeat: int) -> float:
+    """
+        return best time of parsing products of text in seconds
+    """
+    soup.set_backend(backend)
+    soup.set_strainers(strained)
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        parse(method, text, args)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def run(repeat: int) -> None:
+    backends = list(filter(soup.is_available, soup.BACKENDS))
+    print(f"{'case':<22}{'KiB':>6}" + ''.join(
+        f"{backend + (' strained' if strained else ''):>22}"
+        for backend in backends for strained in (False, True)
+    ))
+    scrapers = {}
+    totals = {}
+    for name in HTML_CASES:
+        fixture, scraper_class, method_name, args = CASES[name]
+        path = PATH_FIXTURES / fixture
+        if not path.exists():
+            logging.warning(f"{name}: no {path}, run benchmarks/fixtures.py")
+            continue
+        if scraper_class not in scrapers:
+            scrapers[scraper_class] = make_scraper(scraper_class)
+        method = getattr(scrapers[scraper_class], method_name)
+        text = path.read_text(encoding='utf-8')
+        row = f"{name:<22}{len(text) // 1024:>6}"
+        for backend in backends:
+            for strained in (False, True):
+                seconds = measure(method, text, args, backend, strained, repeat)
+                key = (backend, strained)
+                totals[key] = totals.get(key, 0) + seconds
+                row += f"{seconds * 1000:>20.2f}ms"
+        print(row)
+    soup.set_strainers(True)
+
+    baseline = totals[('html.parser', False)]
+    print()
+    for (backend, strained), seconds in totals.items():
+        name = backend + (' strained' if strained else '')
+        print(f"{name:<28}{seconds * 1000:>10.1f}ms"
+              f"{baseline / seconds:>8.1f}x")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.WARNING)
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--repeat', type=int, default=5,
+                      help='runs per page, the best one is reported')
+    run(args.parse_args().repeat)
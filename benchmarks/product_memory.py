@@ -0,0 +1,85 @@
+"""
+    Compare memory of products kept as dicts (the old representation)
+    and as Product records.
+
+        python benchmarks/product_memory.py [--count 200000]
+"""
+import argparse
+import gc
+import sys
+import time
+import tracemalloc
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parser.product import Product  # noqa: E402
+
+
+RETAILERS = ['AldiScraper', 'DirkScraper', 'JumboScraper', 'VomarScraper']
+
+
+def fields(number: int) -> dict:
+    """
+        return fields of a product as a scraper parses them, category
+        names are new string objects on every page like in parsed html
+    """
+    return {
+        'name': f"Product {number}",
+        'url': f"https://www.example.nl/producten/product-{number}",
+        'img_url': f"https://www.example.nl/images/{number}.png",
+        'description': f"{number % 1000} g",
+        'price': f"{number % 10},{number % 100:02}",
+        'old_price': f"{number % 10},{number % 100:02}",
+        'sale': None,
+        'retailer': ''.join(RETAILERS[number % len(RETAILERS)]),
+        'category': ''.join(['Categorie ', str(number % 40)]),
+        'subcategory': ''.join(['Subcategorie ', str(number % 400)]),
+    }
+
+
+def make_dicts(count: int) -> list:
+    return [fields(number) for number in range(count)]
+
+
+def make_products(count: int) -> list:
+    return [Product(**fields(number)) for number in range(count)]
+
+
+def measure(make, count: int) -> tuple:
+    """
+        return (bytes held by the result, seconds to build it)
+    """
+    gc.collect()
+    tracemalloc.start()
+    start = time.perf_counter()
+    data = make(count)
+    seconds = time.perf_counter() - start
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del data
+    return size, seconds
+
+
+def run(count: int) -> None:
+    results = {
+        'dict': measure(make_dicts, count),
+        'Product': measure(make_products, count),
+    }
+    print(f"{count} products")
+    print(f"{'':<10}{'MiB':>10}{'bytes/product':>16}{'seconds':>10}")
+    for name, (size, seconds) in results.items():
+        print(
+            f"{name:<10}{size / 2 ** 20:>10.1f}"
+            f"{size / count:>16.0f}{seconds:>10.2f}"
+        )
+    saved = 1 - results['Product'][0] / results['dict'][0]
+    print(f"Product saves {saved:.0%} of memory")
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--count', type=int, default=200000,
+                      help='how many products are built')
+    run(args.parse_args().count)
@@ -0,0 +1,246 @@
+"""
+    End-to-end scaling of the ParserHandler pipeline against the local
+    mock retailers of benchmarks/mock_server.py.
+
+    For every size a mock server and a crawl run in processes of their
+    own. The crawl is the one of main.py: all mocked retailers are
+    scraped concurrently and products are written as they arrive.
+    Reported are wall time, requests/s, products/s, CPU time of the
+    crawl and its peak RSS.
+
+        python benchmarks/scaling.py [--sizes 1000 10000 100000]
+                [--latency 0.02] [--error-rate 0.01] [--format csv]
+                [--workers 4] [--output results.json]
+
+    Scrapers are paced by a rate limit of --rate requests per second,
+    their real limits would measure the politeness of the crawler, not
+    the pipeline.
+"""
+import argparse
+import json
+import logging
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+import requests
+
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from parser.aldi.scraper import AldiScraper  # noqa: E402
+from parser.coop.scraper import CoopScraper  # noqa: E402
+from parser.deka.scraper import DekaScraper  # noqa: E402
+from parser.dirk.scraper import DirkScraper  # noqa: E402
+from parser.handler import ParserHandler  # noqa: E402
+from parser.hoogvliet.scraper import HoogvlieScraper  # noqa: E402
+from parser.janlinders.scraper import JanlindersScraper  # noqa: E402
+from parser.poiesz.scraper import PoieszScrapper  # noqa: E402
+from parser.scheduler import RateLimit  # noqa: E402
+from parser.vomar.scraper import VomarScraper  # noqa: E402
+
+
+PATH_BENCHMARKS = Path(__file__).resolve().parent
+PATH_RESULTS = PATH_BENCHMARKS / 'results' / 'scaling.json'
+
+# Retailer of the mock server -> (scraper, url attributes -> path)
+MOCKED_SCRAPERS = {
+    'aldi': (AldiScraper, {'MAIN_URL': '', 'MAIN_CATALOG': '/producten.html'}),
+    'coop': (CoopScraper, {'MAIN_URL': '', 'MAIN_CATALOG': '/categorie/boodschappen'}),
+    'vomar': (VomarScraper, {'MAIN_URL': '', 'MAIN_CATALOG': '/producten'}),
+    'hoogvliet': (HoogvlieScraper, {'MAIN_URL': '/', 'API_PRODUCTS': '/navigation'}),
+    'deka': (DekaScraper, {'MAIN_URL': '', 'MAIN_CATALOG': '/aanbiedingen'}),
+    'dirk': (DirkScraper, {'MAIN_URL': '/', 'MAIN_CATALOG': '/boodschappen'}),
+    'janlinders': (JanlindersScraper, {
+        'MAIN_URL': '',
+        'MAIN_CATALOG': '/ons-assortiment.html',
+        'DISCOUNTS_URL': '/aanbiedingen/~/week/this.html',
+    }),
+    'poiesz': (PoieszScrapper, {
+        'MAIN_URL': '/',
+        'API_URL': '/api/v1.0/products/%s/%s/products',
+        'API_OFFERS': '/api/v1.0/offers?storeNumber=null',
+    }),
+}
+
+
+def mock_scrapers(urls: dict, rate: float, directory: Path) -> list:
+    """
+        return scraper classes which crawl the mock server, with the
+        names of the real ones so the handler treats them the same
+
+        :directory: data files of the scrapers: Dirk listing fingerprints
+                and Poiesz categories, downloaded from the mock
+    """
+    path_poiesz = Path(directory, 'poiesz.json')
+    path_poiesz.write_bytes(
+        requests.get(urls['poiesz'] + '/data.json', timeout=30).content)
+    files = {
+        'dirk': {'PATH_LISTING': Path(directory, 'dirk_listing.json')},
+        'poiesz': {'PATH_DATA': path_poiesz},
+    }
+    scrapers = []
+    for retailer, (scraper_class, paths) in MOCKED_SCRAPERS.items():
+        attributes = {
+            name: urls[retailer] + path for name, path in paths.items()
+        }
+        attributes.update(files.get(retailer, {}))
+        attributes['RATE_LIMIT'] = RateLimit(rate=rate, burst=int(rate))
+        scrapers.append(
+            type(scraper_class.__name__, (scraper_class,), attributes))
+    return scrapers
+
+
+def crawl(urls: dict, output: str, workers: int, rate: float) -> dict:
+    """
+        Crawl the mock server like main does, return measurements
+    """
+
+    products = 0
+
+    with tempfile.TemporaryDirectory() as directory:
+
+        class MockHandler(ParserHandler):
+            SCRAPER_CLASSES = mock_scrapers(urls, rate, directory)
+
+        start = time.perf_counter()
+        handler = MockHandler(
+            path_webdriver=None,
+            ignore_scrapers=[],
+            logging_level=logging.WARNING,
+            max_workers=workers
+        )
+
+        def wrapper_count_handler():
+            nonlocal products
+            for product in handler.iter_products(concurrent=True):
+                products += 1
+                yield product
+
+        if output == 'parquet':
+            handler.save_parquet(Path(directory, 'data.parquet'), wrapper_count_handler())
+        elif output == 'sqlite':
+            handler.save_sqlite(Path(directory, 'data.sqlite'), wrapper_count_handler())
+        else:
+            handler.save_csv(Path(directory, 'data.csv'), wrapper_count_handler())
+        wall = time.perf_counter() - start
+
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    requests = handler.client.stats.as_dict()['requests']
+    return {
+        'products': products,
+        'requests': requests,
+        'wall_seconds': wall,
+        'requests_per_second': requests / wall,
+        'products_per_second': products / wall,
+        'cpu_seconds': usage.ru_utime + usage.ru_stime,
+        # ru_maxrss is in KiB on Linux
+        'peak_rss_mib': usage.ru_maxrss / 1024,
+    }
+
+
+def run_size(size: int, args: argparse.Namespace) -> dict:
+    """
+        Start mock server of size products, crawl it in a new process
+    """
+    server = subprocess.Popen(
+        [
+            sys.executable, str(PATH_BENCHMARKS / 'mock_server.py'),
+            '--products', str(size),
+            '--categories', str(args.categories),
+            '--per-page', str(args.per_page),
+            '--latency', str(args.latency),
+            '--error-rate', str(args.error_rate),
+        ],
+        stdout=subprocess.PIPE,
+        text=True
+    )
+    try:
+        urls = server.stdout.readline()
+        result = subprocess.run(
+            [
+                sys.executable, __file__,
+                '--crawl', urls,
+                '--format', args.format,
+                '--workers', str(args.workers),
+                '--rate', str(args.rate),
+            ],
+            stdout=subprocess.PIPE,
+            text=True,
+            check=True
+        )
+    finally:
+        server.terminate()
+        server.wait()
+    return json.loads(result.stdout.splitlines()[-1])
+
+
+def print_results(results: dict) -> None:
+    print(
+        f"{'size':>8}{'products':>10}{'requests':>10}{'wall s':>9}"
+        f"{'req/s':>9}{'products/s':>12}{'CPU s':>8}{'CPU %':>7}"
+        f"{'RSS MiB':>9}"
+    )
+    for size, result in results.items():
+        print(
+            f"{size:>8}{result['products']:>10}{result['requests']:>10}"
+            f"{result['wall_seconds']:>9.2f}"
+            f"{result['requests_per_second']:>9.0f}"
+            f"{result['products_per_second']:>12.0f}"
+            f"{result['cpu_seconds']:>8.2f}"
+            f"{result['cpu_seconds'] / result['wall_seconds']:>7.0%}"
+            f"{result['peak_rss_mib']:>9.0f}"
+        )
+
+
+if __name__ == "__main__":
+    args = argparse.ArgumentParser(description=__doc__)
+    args.add_argument('--sizes', type=int, nargs='+',
+                      default=[1000, 10000, 100000],
+                      help='products of all retailers of one run')
+    args.add_argument('--categories', type=int, default=10,
+                      help='categories of every mocked catalog')
+    args.add_argument('--per-page', type=int, default=48,
+                      help='products on one page')
+    args.add_argument('--latency', type=float, default=0.02,
+                      help='seconds every response of the mock waits')
+    args.add_argument('--error-rate', type=float, default=0,
+                      help='share of requests the mock answers with 503')
+    args.add_argument('--format', choices=['csv', 'parquet', 'sqlite'],
+                      default='csv', help='output of products')
+    args.add_argument('--workers', type=int, default=4,
+                      help='retailers scraped at the same time')
+    args.add_argument('--rate', type=float, default=1000,
+                      help='requests per second to one retailer')
+    args.add_argument('--output', type=Path, default=PATH_RESULTS,
+                      help='json file for the results')
+    args.add_argument('--crawl', default=None, help=argparse.SUPPRESS)
+    args = args.parse_args()
+
+    if args.crawl:
+        print(json.dumps(crawl(
+            json.loads(args.crawl), args.format, args.workers, args.rate)))
+        sys.exit()
+
+    results = {}
+    for size in args.sizes:
+        results[size] = run_size(size, args)
+        print_results({size: results[size]})
+    print()
+    print(f"latency {args.latency}s, error rate {args.error_rate}, "
+          f"{args.workers} workers, {args.format} output")
+    print_results(results)
+
+    args.output.parent.mkdir(parents=True, exist_ok=True)
+    args.output.write_text(json.dumps({
+        'latency': args.latency,
+        'error_rate': args.error_rate,
+        'categories': args.categories,
+        'per_page': args.per_page,
+        'format': args.format,
+        'workers': args.workers,
+        'results': results,
+    }, indent=4))
+    print(f"Results written to {args.output}")
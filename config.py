@@ -25,4 +25,86 @@ ignore_scrapers = [
 
 webdrive_path = Path('chromedriver.exe')
 
-csv_path = Path('data.csv')
\ No newline at end of file
+# How many headless browsers JumboScraper runs at the same time
+webdriver_pool_size = 4
+
+# JumboScraper uses the browser only to pass the bot check, categories and
+# pages are fetched over HTTP with its cookies. False - every page is
+# rendered in the browser
+webdriver_hybrid = True
+
+# Scrape retailers at the same time, each one in its own worker thread
+concurrent = True
+
+# How many retailers are scraped at the same time
+max_workers = 4
+
+# Seconds one retailer may run before it is abandoned, None - no limit
+scraper_timeout = 4 * 60 * 60
+
+# How many requests to one retailer host are in flight at the same time
+max_requests_per_host = 8
+
+# Keep-alive connections per host, hosts not listed use max_requests_per_host
+# e.g. {'www.dirk.nl': 16}
+http_host_pool_sizes = {}
+
+# Default timeout of one request in seconds
+http_timeout = 30
+
+# Persistent response cache, None - responses aren't cached
+http_cache_path = Path('cache', 'http.sqlite')
+
+# Seconds a cached response is used without asking the server
+http_cache_ttl = 6 * 60 * 60
+
+# Bytes of responses kept in the cache, least recently used are evicted
+http_cache_size = 512 * 1024 * 1024
+
+# Fingerprints and products of pages from the last run, unchanged pages
+# aren't parsed again. None - every page is parsed
+crawl_state_path = Path('state', 'crawl.sqlite')
+
+# Completed pages of the current run, an interrupted run continues where
+# it stopped. None - no checkpoints
+checkpoint_path = Path('state', 'checkpoint.sqlite')
+
+# Every run saves all raw responses to a new compressed archive in this
+# directory. None - responses aren't archived
+archive_path = None
+
+# Parse the responses of an archive (file, or directory - its latest
+# archive) instead of crawling, e.g. after a fix of a scraper.
+# None - normal crawl
+replay_path = None
+
+# Latency, status and size of requests, parse time and products of pages
+# and time of handler stages per retailer and category, written at the end
+# of the run as a json report and in the Prometheus text format.
+# None - not written, no metrics are kept when both are None
+metrics_json_path = Path('state', 'metrics.json')
+metrics_prometheus_path = Path('state', 'metrics.prom')
+
+# Seconds between progress lines with products/s, pages done/total and
+# ETA, None - no progress lines. Every parsed product is logged at DEBUG level
+progress_interval = 10
+
+# Add prices in integer cents, discount in percents and unparseable prices
+# to every product
+normalize_prices = True
+
+# BeautifulSoup backend: 'lxml' or 'html.parser', None - the fastest installed
+html_parser = None
+
+# Output of products: 'csv', 'parquet' (needs pyarrow) or 'sqlite'
+output_format = 'csv'
+
+csv_path = Path('data.csv')
+
+parquet_path = Path('data.parquet')
+
+# Products in one row group of the parquet file
+parquet_row_group_size = 10000
+
+# Latest products and their price history, kept between runs
+sqlite_path = Path('data', 'products.sqlite')
\ No newline at end of file
@@ -15,14 +15,45 @@ def main() -> None:
     handler = ParserHandler(
         path_webdriver=config.webdrive_path,
         ignore_scrapers=config.ignore_scrapers,
-        logging_level=logging_level
+        logging_level=logging_level,
+        max_workers=config.max_workers,
+        scraper_timeout=config.scraper_timeout,
+        max_requests_per_host=config.max_requests_per_host,
+        http_host_pool_sizes=config.http_host_pool_sizes,
+        http_timeout=config.http_timeout,
+        http_cache_path=config.http_cache_path,
+        http_cache_ttl=config.http_cache_ttl,
+        http_cache_size=config.http_cache_size,
+        crawl_state_path=config.crawl_state_path,
+        checkpoint_path=config.checkpoint_path,
+        html_parser=config.html_parser,
+        webdriver_pool_size=config.webdriver_pool_size,
+        webdriver_hybrid=config.webdriver_hybrid,
+        normalize_prices=config.normalize_prices,
+        archive_path=config.archive_path,
+        replay_path=config.replay_path,
+        metrics_json_path=config.metrics_json_path,
+        metrics_prometheus_path=config.metrics_prometheus_path,
+        progress_interval=config.progress_interval
     )
 
-    # Get all products...
-    products = handler.get_products()
+    # Get all products, they are saved as soon as they are parsed...
+    products = handler.iter_products(concurrent=config.concurrent)
 
     # Save all products...
-    handler.save_csv(config.csv_path, products)
+    try:
+        if config.output_format == 'parquet':
+            handler.save_parquet(
+                config.parquet_path,
+                products,
+                row_group_size=config.parquet_row_group_size
+            )
+        elif config.output_format == 'sqlite':
+            handler.save_sqlite(config.sqlite_path, products)
+        else:
+            handler.save_csv(config.csv_path, products)
+    finally:
+        handler.close()
 
 
 if __name__ == "__main__":
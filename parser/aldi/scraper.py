@@ -1,35 +1,27 @@
 import logging
-import requests
 
 from bs4 import BeautifulSoup
-from typing import List
+from typing import Iterator, List
 
-from parser.exceptions import ConnectionError
+from parser.base import BaseScraper, Unit
+from parser.product import Product
+from parser.soup import class_strainer, make_soup
 
 
-class AldiScraper:
+class AldiScraper(BaseScraper):
 
     MAIN_URL = "https://www.aldi.nl"
     MAIN_CATALOG = "https://www.aldi.nl/producten.html"
 
-    def __init__(self) -> None:
-        logging.info(f"Initial {self.__class__.__name__}...")
-        logging.info(f"Try to connect {self.MAIN_URL}")
-        if not self.isAviable():
-            logging.error(f"Can't connect to {self.MAIN_URL}")
-            raise ConnectionError(f"Can't connect to {self.MAIN_URL}")
-        logging.info(f"{self.MAIN_URL} aviable!")
-        logging.info("...initial complete")
-
-    def isAviable(self) -> bool:
-        response = requests.get(self.MAIN_URL)
-        if response.status_code == 200:
-            return True
-        return False
+    # Only these parts of a page are parsed
+    CATEGORIES_STRAINER = class_strainer('div', 'tiles-grid')
+    PRODUCTS_STRAINER = class_strainer('div', 'mod-article-tile')
 
     def get_categories(self, category_url: str) -> List[dict]:
-        response = requests.get(category_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        return self.fetch_categories(category_url, self.parse_categories)
+
+    def parse_categories(self, html: str) -> List[dict]:
+        soup = make_soup(html, self.CATEGORIES_STRAINER)
         categories_container = soup.find('div', {'class': 'tiles-grid'})
         categories_html = categories_container.find_all(
             'div',
@@ -56,20 +48,23 @@ class AldiScraper:
         ))
         return categories
 
-    def collect_products(self, products_url: str) -> List[dict]:
-        response = requests.get(products_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+    def collect_products(self, products_url: str) -> List[Product]:
+        response = self.client.get(products_url)
+        return self.parse_products(response.text)
+
+    def parse_products(self, html: str) -> List[Product]:
+        soup = make_soup(html, self.PRODUCTS_STRAINER)
         products = soup.find_all(
             'div',
             {'class': 'mod-article-tile'}
         )
-        def wrapper_product_handler(product: BeautifulSoup) -> dict:
+        def wrapper_product_handler(product: BeautifulSoup) -> Product:
             try:
                 name = product.find(
                     'span',
                     {'class': 'mod-article-tile__title'}
                 ).text.strip()
-                logging.info(f'Parsing {name} product...')
+                logging.debug('Parsing %s product...', name)
                 url = self.MAIN_URL + product.find('a')['href']
                 description = product.find(
                     'span',
@@ -87,16 +82,16 @@ class AldiScraper:
                     {'class': 'price__previous'}
                 )
             except Exception:
-                return {}
+                return None
             old_price = old_price.text if old_price else price
-            product_data = {
-                'name': name,
-                'description': description,
-                'url': url,
-                'img_url': img_url,
-                'price': price.strip(),
-                'old_price': old_price.strip(),
-            }
+            product_data = Product(
+                name=name,
+                description=description,
+                url=url,
+                img_url=img_url,
+                price=price.strip(),
+                old_price=old_price.strip(),
+            )
             return product_data
 
         products_data = list(map(
@@ -104,56 +99,36 @@ class AldiScraper:
             products
         ))
         products_data = list(filter(
-            lambda x: len(x) != 0,
+            lambda x: x is not None,
             products_data
         ))
         return products_data
 
-    def get_products(
-            self,
-            to_category: str = None,
-            to_subcategory: str = None,
-            is_end: bool = False
-    ) -> List[dict]:
-        categories = self.get_categories(self.MAIN_CATALOG)
-        products = []
+    def get_products(self) -> List[Product]:
+        return list(self.iter_products())
 
-        for category in categories:
-            try:
-                if category['name'] != to_category and to_category:
-                    logging.info(
-                        f"Going to {to_category}, category {category['name']} skipped!")
-                    continue
-                else:
-                    to_category = to_category if is_end else None
-                logging.info(f"Handling {category['name']} category...")
-                category_url = category['link']
-                subcategories = self.get_categories(category_url)
-            except Exception:
+    def iter_products(self) -> Iterator[Product]:
+        leaves = []
+        subcategories = self.get_subcategories(
+            self.MAIN_CATALOG,
+            self.parse_categories,
+            self.parse_categories,
+            leaves
+        )
+        # Category without subcategories is a product list itself
+        for category, request, response in leaves:
+            unit = Unit(category['name'], category['name'], 1, request)
+            self.plan_pages(1)
+            products = self.checkpoint_get(unit)
+            if products is None:
                 try:
-                    category_products = self.collect_products(
-                        category_url)
-                    products += category_products
-                except AttributeError:
-                    pass
+                    products = self.extract(
+                        request, response, self.parse_products,
+                        unit.category)
                 except Exception as e:
+                    self.retry.lose(request, f"can't parse: {e!r}")
                     continue
-            for subcategory in subcategories:
-                if subcategory['name'] != to_subcategory and to_subcategory:
-                    logging.info(
-                        f"Going to {to_subcategory}, category {subcategory['name']} skipped!")
-                    continue
-                else:
-                    to_subcategory = to_subcategory if is_end else None
-                logging.info(f"Handling {subcategory['name']} subcategory...")
-                subcategory_url = subcategory['link']
-                try:
-                    subcategory_products = self.collect_products(
-                        subcategory_url)
-                    products += subcategory_products
-                except AttributeError:
-                    pass
-                except Exception as e:
-                    pass
-        return products
-    
\ No newline at end of file
+                self.checkpoint_add(unit, products)
+            yield from self.tag(unit, products)
+
+        yield from self.crawl(self.category_units(subcategories), self.parse_products)
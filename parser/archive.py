@@ -0,0 +1,205 @@
+import gzip
+import hashlib
+import json
+import logging
+import threading
+import time
+import uuid
+import requests
+
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+from parser.cache import build_response, stored_headers
+
+
+# Request headers which aren't part of the key: they change between runs,
+# or are added by the cache when it revalidates an entry
+UNKEYED_HEADERS = ['cookie', 'user-agent', 'if-none-match', 'if-modified-since']
+
+
+def request_key(url: str, params: dict = None, headers: dict = None) -> str:
+    """
+        return key of a request in the archive, headers scrapers vary
+        are part of it, e.g. the page of Poiesz API requests
+    """
+    headers = sorted(
+        (name.lower(), value)
+        for name, value in (headers or {}).items()
+        if name.lower() not in UNKEYED_HEADERS
+    )
+    data = json.dumps([url, sorted((params or {}).items()), headers], default=str)
+    return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+
+def index_path(path: Path) -> Path:
+    return path.with_name(path.name + '.idx')
+
+
+class ArchiveWriter:
+    """
+        Append-only archive of the raw responses of one run.
+
+        Every response is a WARC response record compressed as a gzip
+        member of its own, so one record is read by seeking to its offset.
+        Offsets are kept in a json lines index next to the archive.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        """
+            :path: archive file, <run>.warc.gz
+        """
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.lock = threading.Lock()
+        self.file = open(self.path, 'ab')
+        self.index = open(index_path(self.path), 'a', encoding='utf-8')
+        self.records = 0
+
+    @classmethod
+    def for_run(cls, directory: Path | str) -> 'ArchiveWriter':
+        """
+            return writer of a new archive in directory named by start time
+        """
+        name = datetime.now().strftime('%Y%m%d-%H%M%S-%f')
+        return cls(Path(directory, f'{name}.warc.gz'))
+
+    def record(self, response: requests.Response) -> bytes:
+        headers = ''.join(
+            f'{name}: {value}\r\n'
+            for name, value in stored_headers(response).items()
+        )
+        http = (
+            f'HTTP/1.1 {response.status_code} {response.reason or ""}\r\n'
+            f'{headers}\r\n'
+        ).encode('utf-8') + response.content
+        warc = (
+            f'WARC/1.1\r\n'
+            f'WARC-Type: response\r\n'
+            f'WARC-Record-ID: <urn:uuid:{uuid.uuid4()}>\r\n'
+            f'WARC-Date: {datetime.now(timezone.utc).strftime("%Y-%m-%dT%H:%M:%SZ")}\r\n'
+            f'WARC-Target-URI: {response.url}\r\n'
+            f'Content-Type: application/http;msgtype=response\r\n'
+            f'Content-Length: {len(http)}\r\n\r\n'
+        ).encode('utf-8')
+        return gzip.compress(warc + http + b'\r\n\r\n', compresslevel=6)
+
+    def add(
+            self,
+            url: str,
+            params: Optional[dict],
+            headers: Optional[dict],
+            response: requests.Response
+    ) -> None:
+        """
+            Append response of request url with params and headers,
+            responses of abandoned scrapers after close are dropped
+        """
+        data = self.record(response)
+        with self.lock:
+            if self.file.closed:
+                return
+            offset = self.file.tell()
+            self.file.write(data)
+            self.index.write(json.dumps({
+                'key': request_key(url, params, headers),
+                'url': response.url,
+                'status': response.status_code,
+                'offset': offset,
+                'length': len(data),
+                'stored_at': time.time(),
+            }) + '\n')
+            # Records written before a crash stay readable
+            self.file.flush()
+            self.index.flush()
+            self.records += 1
+
+    def log_stats(self) -> None:
+        logging.info(f"Archive: {self.records} responses saved to {self.path}")
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
+            self.index.close()
+
+
+class ArchiveReader:
+    """
+        Serves responses of an archive written by ArchiveWriter instead of
+        the network. When a request was archived several times the last
+        successful response is used.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        """
+            :path: archive file, or directory - its latest archive
+        """
+        path = Path(path)
+        if path.is_dir():
+            archives = sorted(path.glob('*.warc.gz'))
+            if not archives:
+                raise FileNotFoundError(f"No archives in {path}")
+            path = archives[-1]
+        self.path = path
+        self.lock = threading.Lock()
+        self.file = open(self.path, 'rb')
+        # key -> (offset, length, status)
+        self.index: Dict[str, Tuple[int, int, int]] = {}
+        with open(index_path(self.path), encoding='utf-8') as index:
+            for line in index:
+                entry = json.loads(line)
+                last = self.index.get(entry['key'])
+                if last and last[2] == 200 and entry['status'] != 200:
+                    continue
+                self.index[entry['key']] = (
+                    entry['offset'], entry['length'], entry['status'])
+        self.hits = 0
+        self.misses = 0
+
+    def read(self, offset: int, length: int) -> requests.Response:
+        with self.lock:
+            self.file.seek(offset)
+            data = gzip.decompress(self.file.read(length))
+        head, rest = data.split(b'\r\n\r\n', 1)
+        warc = dict(
+            line.split(': ', 1)
+            for line in head.decode('utf-8').split('\r\n')[1:]
+        )
+        http = rest[:int(warc['Content-Length'])]
+        head, body = http.split(b'\r\n\r\n', 1)
+        lines = head.decode('utf-8').split('\r\n')
+        _, status, reason = (lines[0] + ' ').split(' ', 2)
+        response = build_response(
+            warc['WARC-Target-URI'],
+            int(status),
+            reason.strip(),
+            dict(line.split(': ', 1) for line in lines[1:] if line),
+            body
+        )
+        response.from_archive = True
+        return response
+
+    def get(self, url: str, params: dict = None, headers: dict = None) -> requests.Response:
+        """
+            return archived response of request, 404 if it wasn't archived
+        """
+        entry = self.index.get(request_key(url, params, headers))
+        with self.lock:
+            if entry is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        if entry is None:
+            return build_response(url, 404, 'Not in archive', {}, b'')
+        return self.read(entry[0], entry[1])
+
+    def log_stats(self) -> None:
+        logging.info(
+            f"Replay of {self.path}: {self.hits} responses replayed, "
+            f"{self.misses} requests not in the archive"
+        )
+
+    def close(self) -> None:
+        with self.lock:
+            self.file.close()
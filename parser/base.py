@@ -0,0 +1,587 @@
+import hashlib
+import json
+import logging
+import time
+import requests
+
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple, Tuple, Union
+
+from parser.checkpoint import Checkpoint
+from parser.client import HttpClient
+from parser.exceptions import ConnectionError
+from parser.fetcher import AsyncFetcher, Request
+from parser.product import Product
+from parser.progress import Progress
+from parser.retry import RetryPolicy, RetryQueue
+from parser.scheduler import RateLimit
+from parser.state import CrawlState
+
+
+class Unit(NamedTuple):
+    """
+        One page of products, the smallest piece of work of a crawl
+    """
+    category: str
+    subcategory: str
+    page: int
+    request: Request
+
+
+class BaseScraper:
+
+    MAIN_URL = None
+
+    # Token bucket of MAIN_URL host, requests per second and burst
+    RATE_LIMIT = RateLimit(rate=10, burst=10)
+
+    # How many pages are fetched concurrently and kept in memory at once
+    BATCH_SIZE = 32
+
+    # How failed requests are tried again
+    RETRY_POLICY = RetryPolicy(attempts=4, base_delay=1, max_delay=60)
+
+    def __init__(
+            self,
+            client: HttpClient = None,
+            fetcher: AsyncFetcher = None,
+            crawl_state: CrawlState = None,
+            checkpoint: Checkpoint = None,
+            progress: Progress = None,
+            check: bool = True
+    ) -> None:
+        """
+            :progress: counters of crawled pages, shared by all scrapers
+            :check: make sure MAIN_URL is reachable, raise ConnectionError
+                    if it isn't
+        """
+        self.client = client if client else HttpClient()
+        self.fetcher = fetcher if fetcher else AsyncFetcher(get=self.client.get)
+        self.crawl_state = crawl_state
+        self.checkpoint = checkpoint
+        self.progress = progress if progress else Progress(interval=None)
+        self.retry = RetryQueue(self.RETRY_POLICY)
+        self.client.scheduler.configure(self.MAIN_URL, self.RATE_LIMIT)
+        if self.client.metrics is not None:
+            for url in self.urls():
+                self.client.metrics.add_retailer(url, self.__class__.__name__)
+        self.pages = {
+            'new': 0,
+            'changed': 0,
+            'unchanged': 0,
+        }
+        # Content fingerprint -> first request with it in this run
+        self.fingerprints = {}
+        self.duplicates = 0
+        if not check:
+            return
+        logging.info(f"Initial {self.__class__.__name__}...")
+        logging.info(f"Try to connect {self.MAIN_URL}")
+        if not self.isAviable():
+            logging.error(f"Can't connect to {self.MAIN_URL}")
+            raise ConnectionError(f"Can't connect to {self.MAIN_URL}")
+        logging.info(f"{self.MAIN_URL} aviable!")
+        logging.info("...initial complete")
+
+    def urls(self) -> List[str]:
+        """
+            return urls of the class, MAIN_URL, catalogs and APIs,
+            their hosts are the hosts the scraper requests
+        """
+        urls = []
+        for name in dir(self.__class__):
+            value = getattr(self.__class__, name)
+            if name.isupper() and isinstance(value, str) \
+                    and value.startswith(('http://', 'https://')):
+                urls.append(value)
+        return urls
+
+    def isAviable(self) -> bool:
+        # Tried again with backoff like every page, one 503 doesn't
+        # make the retailer unavailable. Not cached, the host is checked
+        for attempt in range(1, self.RETRY_POLICY.attempts + 1):
+            try:
+                response = self.client.request(self.MAIN_URL)
+            except requests.RequestException as e:
+                response = e
+            reason = self.retry.record(self.MAIN_URL, response)
+            if reason is None:
+                return response.status_code == 200
+            error, is_retryable = reason
+            logging.warning(f"Request to {self.MAIN_URL} failed: {error}")
+            if not is_retryable or attempt == self.RETRY_POLICY.attempts:
+                return False
+            time.sleep(self.RETRY_POLICY.delay(attempt))
+        return False
+
+    def fetch_many(
+            self,
+            requests_: Iterable[Request]
+    ) -> List[Union[requests.Response, Exception]]:
+        """
+            Fetch pages concurrently through the shared fetcher
+
+            :requests_: urls or (url, kwargs) tuples
+
+            return responses in the same order, failed requests as exceptions
+        """
+        return self.fetcher.fetch_many(requests_)
+
+    def iter_fetch(
+            self,
+            requests_: Iterable[Request]
+    ) -> Iterator[Tuple[Request, Union[requests.Response, Exception]]]:
+        """
+            Fetch pages concurrently in batches of BATCH_SIZE, so only one
+            batch of responses is kept in memory. Failed requests of a
+            batch are tried again with backoff before the batch is yielded.
+
+            :requests_: urls or (url, kwargs) tuples
+
+            yield (request, response) in the same order, requests which
+            failed every attempt as exceptions
+        """
+        batch = []
+        for request in requests_:
+            batch.append(request)
+            if len(batch) >= self.BATCH_SIZE:
+                yield from zip(batch, self.fetch_retrying(batch))
+                batch = []
+        if batch:
+            yield from zip(batch, self.fetch_retrying(batch))
+
+    def fetch_retrying(
+            self,
+            requests_: List[Request]
+    ) -> List[Union[requests.Response, Exception]]:
+        """
+            fetch_many which tries failed requests again with backoff,
+            requests which still fail are lost
+
+            return responses in the same order, failed requests as exceptions
+        """
+        responses = self.fetch_many(requests_)
+        pending = range(len(requests_))
+        for attempt in range(1, self.RETRY_POLICY.attempts + 1):
+            failed = {}
+            for i in pending:
+                url = self.request_url(requests_[i])
+                reason = self.retry.record(url, responses[i])
+                if reason is None:
+                    continue
+                error, is_retryable = reason
+                if is_retryable and attempt < self.RETRY_POLICY.attempts:
+                    failed[i] = url
+                    continue
+                if is_retryable:
+                    error = f"{error}, {attempt} attempts"
+                self.retry.lose(url, error)
+                if not isinstance(responses[i], Exception):
+                    responses[i] = requests.HTTPError(error, response=responses[i])
+            if not failed:
+                break
+            open_until = max(
+                self.retry.breaker(url).open_until for url in failed.values()
+            )
+            time.sleep(max(
+                self.RETRY_POLICY.delay(attempt),
+                open_until - time.monotonic()
+            ))
+            retried = self.fetch_many(requests_[i] for i in failed)
+            for i, response in zip(failed, retried):
+                responses[i] = response
+            pending = list(failed)
+        return responses
+
+    def fetch_categories(
+            self,
+            request: Request,
+            parse: Callable[[str], List[dict]]
+    ) -> List[dict]:
+        """
+            Fetch page of categories with retries and parse its categories,
+            a page which failed every attempt or can't be parsed is lost
+
+            :request: url or (url, kwargs) tuple
+            :parse: function which parses categories from page text
+
+            return list of categories as dict, empty if the page is lost
+        """
+        _, response = next(self.iter_fetch([request]))
+        if isinstance(response, Exception):
+            return []
+        try:
+            return parse(response.text)
+        except Exception as e:
+            self.retry.lose(self.request_url(request), f"can't parse: {e!r}")
+            return []
+
+    def get_subcategories(
+            self,
+            catalog: str,
+            parse_categories: Callable[[str], List[dict]],
+            parse_subcategories: Callable[[str], List[dict]],
+            leaves: list = None
+    ) -> List[dict]:
+        """
+            Fetch categories of the catalog page, then subcategories of
+            every category page concurrently
+
+            :catalog: url of the catalog page
+            :parse_categories: function which parses categories from
+                    the catalog page text
+            :parse_subcategories: function which parses subcategories
+                    from a category page text
+            :leaves: categories whose page has no subcategories are
+                    added to it as (category, request, response),
+                    None - such a page is lost
+
+            return list of subcategories as dict, name of their category
+            in 'category'
+        """
+        categories = self.fetch_categories(catalog, parse_categories)
+        responses = self.iter_fetch(
+            category['link'] for category in categories
+        )
+        subcategories = []
+        for category, (request, response) in zip(categories, responses):
+            logging.debug('Handling %s category...', category['name'])
+            if isinstance(response, Exception):
+                continue
+            try:
+                category_subcategories = parse_subcategories(response.text)
+            except Exception as e:
+                if leaves is not None:
+                    leaves.append((category, request, response))
+                else:
+                    self.retry.lose(
+                        self.request_url(request), f"can't parse: {e!r}")
+                continue
+            for subcategory in category_subcategories:
+                subcategory['category'] = category['name']
+            subcategories += category_subcategories
+        return subcategories
+
+    def category_units(self, subcategories: List[dict]) -> List[Unit]:
+        """
+            return units of the first pages of subcategories
+        """
+        units = []
+        for subcategory in subcategories:
+            logging.debug('Handling %s subcategory...', subcategory['name'])
+            units.append(Unit(
+                subcategory['category'],
+                subcategory['name'],
+                1,
+                subcategory['link']
+            ))
+        return units
+
+    def crawl_catalog(
+            self,
+            catalog: str,
+            parse_categories: Callable[[str], List[dict]],
+            parse_subcategories: Callable[[str], List[dict]],
+            parse_products: Callable[[str], List[Product]]
+    ) -> Iterator[Product]:
+        """
+            Crawl a catalog of categories of subcategories whose pages
+            are product lists, see get_subcategories and crawl
+
+            yield product
+        """
+        subcategories = self.get_subcategories(
+            catalog, parse_categories, parse_subcategories)
+        yield from self.crawl(self.category_units(subcategories), parse_products)
+
+    def request_url(self, request: Request) -> str:
+        if isinstance(request, str):
+            return request
+        return request[0]
+
+    def request_key(self, request: Request) -> str:
+        if isinstance(request, str):
+            return request
+        url, kwargs = request
+        return url + ' ' + json.dumps(kwargs, sort_keys=True, default=str)
+
+    def extract(
+            self,
+            request: Request,
+            response: requests.Response,
+            parse: Callable[[str], List[Product]],
+            category: str = None
+    ) -> List[Product]:
+        """
+            Extract products from page. A page with the same content as
+            another page of this run isn't parsed, it's counted as
+            a wasted request. When crawl state is kept and the page is
+            byte-for-byte the same as on the last run, products from the
+            last run are returned without parsing. Parsed products are
+            completed by complete, its requests aren't part of the parse
+            time.
+
+            :request: url or (url, kwargs) tuple of the page
+            :response: response of the page
+            :parse: function which parses products from page text
+            :category: category of the page, label of its metrics
+
+            return list of products
+        """
+        retailer = self.__class__.__name__
+        key = self.request_key(request)
+        fingerprint = hashlib.sha1(response.content).hexdigest()
+        first = self.fingerprints.setdefault(fingerprint, key)
+        if first != key:
+            self.duplicates += 1
+            self.count_page(category, 'duplicate')
+            logging.debug('%s: %s is identical to %s, skipped', retailer, key, first)
+            return []
+
+        if self.crawl_state is None:
+            return self.complete(
+                self.parse_page(response, parse, category), category)
+
+        stored = self.crawl_state.get(retailer, key)
+        if stored and stored[0] == fingerprint:
+            self.pages['unchanged'] += 1
+            self.count_page(category, 'unchanged')
+            return stored[1]
+
+        products = self.complete(
+            self.parse_page(response, parse, category), category)
+        self.crawl_state.set(retailer, key, fingerprint, products)
+        self.pages['changed' if stored else 'new'] += 1
+        return products
+
+    def parse_page(
+            self,
+            response: requests.Response,
+            parse: Callable[[str], List[Product]],
+            category: str = None
+    ) -> List[Product]:
+        """
+            Parse products from page text, observe parse time and
+            products of the page when the client keeps metrics
+        """
+        metrics = self.client.metrics
+        if metrics is None:
+            return parse(response.text)
+        labels = {
+            'retailer': self.__class__.__name__,
+            'category': category or '',
+        }
+        start = time.perf_counter()
+        try:
+            products = parse(response.text)
+        except Exception:
+            metrics.count('scraper_pages_total', result='error', **labels)
+            raise
+        metrics.observe('scraper_parse_seconds', time.perf_counter() - start, **labels)
+        metrics.observe('scraper_page_products', len(products), **labels)
+        metrics.count('scraper_pages_total', result='parsed', **labels)
+        return products
+
+    def complete(self, products: List[Product], category: str = None) -> List[Product]:
+        """
+            Complete products parsed from a page, e.g. from their product
+            pages. Products are returned as they are by default
+
+            :category: category of the page, label of its metrics
+        """
+        return products
+
+    def count_page(self, category: str, result: str) -> None:
+        if self.client.metrics is None:
+            return
+        self.client.metrics.count(
+            'scraper_pages_total',
+            retailer=self.__class__.__name__,
+            category=category or '',
+            result=result
+        )
+
+    def crawl(
+            self,
+            units: Iterable[Unit],
+            parse: Callable[[str], List[Product]]
+    ) -> Iterator[Product]:
+        """
+            Fetch and parse units, see crawl_units
+
+            yield product
+        """
+        for unit, products in self.crawl_units(units, parse):
+            yield from self.tag(unit, products)
+
+    def tag(self, unit: Unit, products: List[Product]) -> List[Product]:
+        """
+            Set retailer, category and subcategory of products of unit,
+            count unit as a done page
+        """
+        retailer = self.__class__.__name__
+        for product in products:
+            product.set_origin(retailer, unit.category, unit.subcategory)
+        self.progress.page_done(retailer, unit.subcategory, len(products))
+        return products
+
+    def plan_pages(self, pages: int) -> None:
+        """
+            Add pages which are going to be crawled to the progress total
+        """
+        self.progress.plan(self.__class__.__name__, pages)
+
+    def crawl_units(
+            self,
+            units: Iterable[Unit],
+            parse: Callable[[str], List[Product]]
+    ) -> Iterator[Tuple[Unit, List[Product]]]:
+        """
+            Fetch units concurrently in batches and parse their products.
+            Units completed by an unfinished previous run are taken from
+            the checkpoint without fetching, every new completed unit is
+            saved to the checkpoint.
+
+            :units: pages to crawl
+            :parse: function which parses products from page text
+
+            yield (unit, products of unit)
+        """
+        if hasattr(units, '__len__'):
+            self.plan_pages(len(units))
+        batch = []
+        for unit in units:
+            products = self.checkpoint_get(unit)
+            if products is not None:
+                yield unit, products
+                continue
+            url = self.request_url(unit.request)
+            if self.retry.is_open(url):
+                self.retry.defer(unit, url, 0, 'circuit open')
+                continue
+            batch.append(unit)
+            if len(batch) >= self.BATCH_SIZE:
+                yield from self.crawl_batch(batch, parse)
+                batch = []
+        if batch:
+            yield from self.crawl_batch(batch, parse)
+        yield from self.crawl_retries(parse)
+
+    def crawl_batch(
+            self,
+            batch: List[Unit],
+            parse: Callable[[str], List[Product]],
+            attempts: List[int] = None
+    ) -> Iterator[Tuple[Unit, List[Product]]]:
+        """
+            Fetch and parse batch of units, failed units are pushed
+            to the retry queue
+
+            :attempts: attempt of every unit, None - the first one
+        """
+        attempts = attempts if attempts else [0] * len(batch)
+        responses = self.fetch_many(unit.request for unit in batch)
+        for unit, attempt, response in zip(batch, attempts, responses):
+            url = self.request_url(unit.request)
+            reason = self.retry.record(url, response)
+            if reason is not None:
+                error, is_retryable = reason
+                if is_retryable:
+                    self.retry.push(unit, url, attempt + 1, error)
+                else:
+                    self.retry.lose(url, error)
+                continue
+            try:
+                products = self.extract(
+                    unit.request, response, parse, unit.category)
+            except Exception as e:
+                logging.warning(
+                    f"Can't parse {unit.category} | {unit.subcategory} | "
+                    f"page {unit.page}: {e!r}"
+                )
+                self.retry.lose(url, f"can't parse: {e!r}")
+                continue
+            self.checkpoint_add(unit, products)
+            yield unit, products
+
+    def crawl_retries(
+            self,
+            parse: Callable[[str], List[Product]]
+    ) -> Iterator[Tuple[Unit, List[Product]]]:
+        """
+            Drain the retry queue, units wait for their backoff and for
+            the circuit of their host to close
+
+            yield (unit, products of unit)
+        """
+        while len(self.retry):
+            batch = []
+            for deferred in self.retry.wait(self.BATCH_SIZE):
+                if self.retry.is_open(deferred.url):
+                    self.retry.defer(*deferred[:3], deferred.error)
+                    continue
+                batch.append(deferred)
+            if batch:
+                yield from self.crawl_batch(
+                    [deferred.item for deferred in batch],
+                    parse,
+                    [deferred.attempt for deferred in batch]
+                )
+
+    def checkpoint_get(self, unit: Unit) -> List[Product] | None:
+        if self.checkpoint is None:
+            return None
+        return self.checkpoint.get(
+            self.__class__.__name__,
+            unit.category,
+            unit.subcategory,
+            unit.page
+        )
+
+    def checkpoint_add(self, unit: Unit, products: List[Product]) -> None:
+        if self.checkpoint is None:
+            return
+        self.checkpoint.add(
+            self.__class__.__name__,
+            unit.category,
+            unit.subcategory,
+            unit.page,
+            products
+        )
+
+    def checkpoint_get_pages(self, unit: Unit) -> Dict[int, Request] | None:
+        """
+            return page number -> request of the rest of the pages of
+            the listing of unit planned by an unfinished previous run
+        """
+        if self.checkpoint is None:
+            return None
+        pages = self.checkpoint.get_pages(
+            self.__class__.__name__,
+            unit.category,
+            unit.subcategory
+        )
+        if pages is None:
+            return None
+        return {
+            page: self.restore_request(request)
+            for page, request in pages.items()
+        }
+
+    def checkpoint_add_pages(self, unit: Unit, pages: Dict[int, Request]) -> None:
+        if self.checkpoint is None:
+            return
+        self.checkpoint.add_pages(
+            self.__class__.__name__,
+            unit.category,
+            unit.subcategory,
+            pages
+        )
+
+    def restore_request(self, request: Union[str, list]) -> Request:
+        """
+            return request read from the checkpoint, (url, kwargs) are
+            stored as a list
+        """
+        if isinstance(request, str):
+            return request
+        return tuple(request)
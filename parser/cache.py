@@ -0,0 +1,209 @@
+import hashlib
+import json
+import time
+import requests
+
+from pathlib import Path
+from typing import Optional
+from requests.structures import CaseInsensitiveDict
+from requests.utils import get_encoding_from_headers
+
+from parser.storage import SqliteStore
+
+
+# Stored bodies are decoded, so encoding headers must not be replayed
+SKIP_HEADERS = ['Content-Encoding', 'Content-Length', 'Transfer-Encoding']
+
+
+def stored_headers(response: requests.Response) -> dict:
+    """
+        return headers of response which are stored with its decoded body
+    """
+    return {
+        name: value
+        for name, value in response.headers.items()
+        if name not in SKIP_HEADERS
+    }
+
+
+def build_response(
+        url: str,
+        status: int,
+        reason: str,
+        headers: dict,
+        body: bytes
+) -> requests.Response:
+    """
+        return requests.Response of a stored response
+    """
+    response = requests.Response()
+    response.url = url
+    response.status_code = status
+    response.reason = reason
+    response.headers = CaseInsensitiveDict(headers)
+    response.encoding = get_encoding_from_headers(response.headers)
+    response._content = body
+    return response
+
+
+class CacheEntry:
+
+    def __init__(
+            self,
+            url: str,
+            status: int,
+            headers: dict,
+            body: bytes,
+            stored_at: float
+    ) -> None:
+        self.url = url
+        self.status = status
+        self.headers = CaseInsensitiveDict(headers)
+        self.body = body
+        self.stored_at = stored_at
+
+    @property
+    def etag(self) -> Optional[str]:
+        return self.headers.get('ETag')
+
+    @property
+    def last_modified(self) -> Optional[str]:
+        return self.headers.get('Last-Modified')
+
+    def is_fresh(self, ttl: float) -> bool:
+        return time.time() - self.stored_at < ttl
+
+    def to_response(self) -> requests.Response:
+        response = build_response(
+            self.url, self.status, 'OK', self.headers, self.body)
+        response.from_cache = True
+        return response
+
+
+class HttpCache(SqliteStore):
+    """
+        Persistent HTTP response cache kept in a sqlite database.
+
+        Entries are keyed by url and request headers. A fresh entry (younger
+        than ttl) is returned without a request, a stale one is revalidated
+        with If-None-Match / If-Modified-Since. The least recently used
+        entries are evicted when the cache grows over max_size bytes.
+    """
+
+    def __init__(
+            self,
+            path: Path | str,
+            ttl: float = 6 * 60 * 60,
+            max_size: int = 512 * 1024 * 1024
+    ) -> None:
+        """
+            :path: sqlite database file
+            :ttl: seconds an entry is used without revalidation
+            :max_size: bytes of bodies kept in the cache
+        """
+        self.ttl = ttl
+        self.max_size = max_size
+        super().__init__(path)
+        self.connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS responses (
+                key TEXT PRIMARY KEY,
+                url TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                body BLOB NOT NULL,
+                size INTEGER NOT NULL,
+                stored_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+            '''
+        )
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS responses_accessed_at '
+            'ON responses (accessed_at)'
+        )
+        self.size = self.connection.execute(
+            'SELECT COALESCE(SUM(size), 0) FROM responses'
+        ).fetchone()[0]
+
+    def key(self, url: str, headers: dict = None, params: dict = None) -> str:
+        data = json.dumps(
+            [url, sorted((headers or {}).items()), sorted((params or {}).items())],
+            default=str
+        )
+        return hashlib.sha256(data.encode('utf-8')).hexdigest()
+
+    def get(self, key: str) -> Optional[CacheEntry]:
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT url, status, headers, body, stored_at '
+                'FROM responses WHERE key = ?',
+                (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            self.connection.execute(
+                'UPDATE responses SET accessed_at = ? WHERE key = ?',
+                (time.time(), key)
+            )
+        url, status, headers, body, stored_at = row
+        return CacheEntry(url, status, json.loads(headers), body, stored_at)
+
+    def refresh(self, key: str) -> None:
+        """
+            Mark entry as fresh again, after 304 Not Modified
+        """
+        with self.lock:
+            now = time.time()
+            self.connection.execute(
+                'UPDATE responses SET stored_at = ?, accessed_at = ? WHERE key = ?',
+                (now, now, key)
+            )
+
+    def set(self, key: str, response: requests.Response) -> None:
+        headers = stored_headers(response)
+        body = response.content
+        now = time.time()
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT size FROM responses WHERE key = ?',
+                (key,)
+            ).fetchone()
+            self.size -= row[0] if row else 0
+            self.connection.execute(
+                'INSERT OR REPLACE INTO responses '
+                'VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (
+                    key,
+                    response.url,
+                    response.status_code,
+                    json.dumps(headers),
+                    body,
+                    len(body),
+                    now,
+                    now
+                )
+            )
+            self.size += len(body)
+            self.evict()
+
+    def evict(self) -> None:
+        """
+            Remove least recently used entries until cache fits max_size,
+            must be called with the lock held
+        """
+        while self.size > self.max_size:
+            rows = self.connection.execute(
+                'SELECT key, size FROM responses ORDER BY accessed_at LIMIT 64'
+            ).fetchall()
+            if not rows:
+                self.size = 0
+                return
+            for key, size in rows:
+                self.connection.execute(
+                    'DELETE FROM responses WHERE key = ?',
+                    (key,)
+                )
+                self.size -= size
+                if self.size <= self.max_size:
+                    return
@@ -0,0 +1,184 @@
+import json
+import logging
+import time
+
+from pathlib import Path
+from typing import Dict, List, Optional
+
+from parser.product import Product
+from parser.storage import SqliteStore
+
+
+class Checkpoint(SqliteStore):
+    """
+        Durable checkpoint of a crawl kept in a sqlite database.
+
+        Every completed unit (retailer, category, subcategory, page) is saved
+        with its products as soon as it is parsed, every planned listing
+        with the requests of its pages. A run covers the whole crawl of
+        all retailers: when the last run didn't finish, completed units
+        of every retailer are replayed from the store instead of being
+        fetched again. They are cleared together when the run finishes.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        super().__init__(path)
+        # Runs of single retailers of older checkpoints
+        self.connection.execute('DROP TABLE IF EXISTS runs')
+        self.connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS crawl (
+                id INTEGER PRIMARY KEY CHECK (id = 1),
+                started_at REAL NOT NULL,
+                finished_at REAL
+            )
+            '''
+        )
+        self.connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS units (
+                retailer TEXT NOT NULL,
+                category TEXT NOT NULL,
+                subcategory TEXT NOT NULL,
+                page INTEGER NOT NULL,
+                products TEXT NOT NULL,
+                done_at REAL NOT NULL,
+                PRIMARY KEY (retailer, category, subcategory, page)
+            )
+            '''
+        )
+        self.connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS listings (
+                retailer TEXT NOT NULL,
+                category TEXT NOT NULL,
+                subcategory TEXT NOT NULL,
+                pages TEXT NOT NULL,
+                PRIMARY KEY (retailer, category, subcategory)
+            )
+            '''
+        )
+
+    def begin(self) -> None:
+        """
+            Start a run, resume the last one if it didn't finish
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT finished_at FROM crawl WHERE id = 1'
+            ).fetchone()
+            if row is not None and row[0] is None:
+                done = self.connection.execute(
+                    'SELECT retailer, COUNT(*) FROM units GROUP BY retailer'
+                ).fetchall()
+                for retailer, count in done:
+                    logging.info(f"{retailer}: resuming, {count} units already done")
+                return
+            self.connection.execute('BEGIN')
+            self.clear()
+            self.connection.execute(
+                'INSERT OR REPLACE INTO crawl VALUES (1, ?, NULL)',
+                (time.time(),)
+            )
+            self.connection.execute('COMMIT')
+
+    def finish(self) -> None:
+        """
+            Mark the run as finished and clear units of all retailers,
+            the next run starts from scratch
+        """
+        with self.lock:
+            self.connection.execute('BEGIN')
+            self.clear()
+            self.connection.execute(
+                'UPDATE crawl SET finished_at = ? WHERE id = 1',
+                (time.time(),)
+            )
+            self.connection.execute('COMMIT')
+
+    def clear(self) -> None:
+        self.connection.execute('DELETE FROM units')
+        self.connection.execute('DELETE FROM listings')
+
+    def get(
+            self,
+            retailer: str,
+            category: str,
+            subcategory: str,
+            page: int
+    ) -> Optional[List[Product]]:
+        """
+            return products of completed unit, None if unit isn't done
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT products FROM units WHERE retailer = ? '
+                'AND category = ? AND subcategory = ? AND page = ?',
+                (retailer, category, subcategory, page)
+            ).fetchone()
+        if row is None:
+            return None
+        return list(map(Product.from_dict, json.loads(row[0])))
+
+    def add(
+            self,
+            retailer: str,
+            category: str,
+            subcategory: str,
+            page: int,
+            products: List[Product]
+    ) -> None:
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO units VALUES (?, ?, ?, ?, ?, ?)',
+                (
+                    retailer,
+                    category,
+                    subcategory,
+                    page,
+                    json.dumps(
+                        [product.to_dict() for product in products],
+                        ensure_ascii=False
+                    ),
+                    time.time()
+                )
+            )
+
+    def get_pages(
+            self,
+            retailer: str,
+            category: str,
+            subcategory: str
+    ) -> Optional[Dict[int, list]]:
+        """
+            return page number -> request of the rest of the pages of
+            planned listing, None if listing isn't planned. Requests with
+            kwargs are lists
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT pages FROM listings WHERE retailer = ? '
+                'AND category = ? AND subcategory = ?',
+                (retailer, category, subcategory)
+            ).fetchone()
+        if row is None:
+            return None
+        return {int(page): request for page, request in json.loads(row[0]).items()}
+
+    def add_pages(
+            self,
+            retailer: str,
+            category: str,
+            subcategory: str,
+            pages: Dict[int, object]
+    ) -> None:
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO listings VALUES (?, ?, ?, ?)',
+                (
+                    retailer,
+                    category,
+                    subcategory,
+                    json.dumps(pages, ensure_ascii=False, default=str)
+                )
+            )
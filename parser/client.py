@@ -0,0 +1,273 @@
+import logging
+import threading
+import time
+import requests
+
+from typing import Dict
+from requests.adapters import HTTPAdapter
+from urllib3 import HTTPConnectionPool, HTTPSConnectionPool
+from urllib3.util import make_headers
+
+from parser.archive import ArchiveReader, ArchiveWriter
+from parser.cache import HttpCache
+from parser.metrics import Metrics
+from parser.scheduler import Scheduler, parse_retry_after
+
+
+class HttpStats:
+    """
+        Thread safe counters of a HttpClient
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.bytes_received = 0
+        self.bytes_decoded = 0
+        self.handshakes = 0
+        self.cache_hits = 0
+        self.not_modified = 0
+
+    def add_cache_hit(self, not_modified: bool = False) -> None:
+        with self.lock:
+            if not_modified:
+                self.not_modified += 1
+            else:
+                self.cache_hits += 1
+
+    def add_request(self, bytes_received: int, bytes_decoded: int) -> None:
+        with self.lock:
+            self.requests += 1
+            self.bytes_received += bytes_received
+            self.bytes_decoded += bytes_decoded
+
+    def add_handshake(self) -> None:
+        with self.lock:
+            self.handshakes += 1
+
+    def as_dict(self) -> dict:
+        with self.lock:
+            return {
+                'requests': self.requests,
+                'bytes_received': self.bytes_received,
+                'bytes_decoded': self.bytes_decoded,
+                'handshakes': self.handshakes,
+                'cache_hits': self.cache_hits,
+                'not_modified': self.not_modified,
+            }
+
+
+class CountingAdapter(HTTPAdapter):
+    """
+        HTTPAdapter which counts every new connection (TCP + TLS handshake)
+    """
+
+    def __init__(self, stats: HttpStats, **kwargs) -> None:
+        self.stats = stats
+        super().__init__(**kwargs)
+
+    def init_poolmanager(self, *args, **kwargs) -> None:
+        super().init_poolmanager(*args, **kwargs)
+        stats = self.stats
+
+        class CountingHTTPConnectionPool(HTTPConnectionPool):
+            def _new_conn(self):
+                stats.add_handshake()
+                return super()._new_conn()
+
+        class CountingHTTPSConnectionPool(HTTPSConnectionPool):
+            def _new_conn(self):
+                stats.add_handshake()
+                return super()._new_conn()
+
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': CountingHTTPConnectionPool,
+            'https': CountingHTTPSConnectionPool,
+        }
+
+
+class HttpClient:
+    """
+        Shared HTTP client of all scrapers.
+
+        Keeps pooled keep-alive connections per host, asks for compressed
+        responses, applies default headers and timeout, paces requests
+        per host with the scheduler and counts bytes and handshakes.
+    """
+
+    DEFAULT_HEADERS = {
+        'Accept-Encoding': make_headers(accept_encoding=True)['accept-encoding'],
+        'Connection': 'keep-alive',
+    }
+
+    def __init__(
+            self,
+            pool_size: int = 8,
+            host_pool_sizes: Dict[str, int] = None,
+            headers: dict = None,
+            timeout: float = 30,
+            cache: HttpCache = None,
+            scheduler: Scheduler = None,
+            archive: ArchiveWriter = None,
+            replay: ArchiveReader = None,
+            metrics: Metrics = None
+    ) -> None:
+        """
+            :pool_size: keep-alive connections kept per host
+            :host_pool_sizes: host -> pool size, overrides pool_size
+            :headers: headers sent with every request
+            :timeout: default timeout of a request in seconds
+            :cache: persistent response cache, None - no caching
+            :scheduler: rate limits and concurrency of requests per host
+            :archive: every response is also saved to the archive
+            :replay: responses are read from the archive, the network
+                    and the cache aren't used
+            :metrics: latency, status and size of every request are
+                    observed per retailer and host
+        """
+        self.timeout = timeout
+        self.cache = cache
+        self.archive = archive
+        self.replay = replay
+        self.metrics = metrics
+        self.scheduler = scheduler if scheduler else Scheduler(pool_size)
+        self.stats = HttpStats()
+        self.session = requests.Session()
+        self.session.headers.update(self.DEFAULT_HEADERS)
+        if headers:
+            self.session.headers.update(headers)
+
+        adapter = CountingAdapter(
+            self.stats,
+            pool_connections=16,
+            pool_maxsize=pool_size
+        )
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
+
+        host_pool_sizes = host_pool_sizes if host_pool_sizes else {}
+        for host, size in host_pool_sizes.items():
+            adapter = CountingAdapter(
+                self.stats,
+                pool_connections=1,
+                pool_maxsize=size
+            )
+            self.session.mount(f'http://{host}/', adapter)
+            self.session.mount(f'https://{host}/', adapter)
+
+    def get(self, url: str, **kwargs) -> requests.Response:
+        if self.cache is None or self.replay or kwargs.get('stream'):
+            return self.request(url, **kwargs)
+
+        key = self.cache.key(url, kwargs.get('headers'), kwargs.get('params'))
+        entry = self.cache.get(key)
+        if entry and entry.is_fresh(self.cache.ttl):
+            self.stats.add_cache_hit()
+            return self.archived(url, kwargs, entry.to_response())
+
+        if entry:
+            headers = dict(kwargs.get('headers') or {})
+            if entry.etag:
+                headers['If-None-Match'] = entry.etag
+            if entry.last_modified:
+                headers['If-Modified-Since'] = entry.last_modified
+            kwargs['headers'] = headers
+
+        response = self.request(url, **kwargs)
+        if response.status_code == 304 and entry:
+            self.stats.add_cache_hit(not_modified=True)
+            self.cache.refresh(key)
+            return self.archived(url, kwargs, entry.to_response())
+        if response.status_code == 200:
+            self.cache.set(key, response)
+        return response
+
+    def archived(self, url: str, kwargs: dict, response: requests.Response) -> requests.Response:
+        """
+            Save response of a request to the archive, return it
+        """
+        if self.archive is not None and not kwargs.get('stream'):
+            self.archive.add(
+                url, kwargs.get('params'), kwargs.get('headers'), response)
+        return response
+
+    def request(self, url: str, **kwargs) -> requests.Response:
+        if self.replay is not None:
+            return self.replay.get(
+                url, kwargs.get('params'), kwargs.get('headers'))
+        kwargs.setdefault('timeout', self.timeout)
+        state = self.scheduler.acquire(url)
+        start = time.monotonic()
+        try:
+            response = self.session.get(url, **kwargs)
+        except Exception:
+            elapsed = time.monotonic() - start
+            state.record(elapsed, None, None)
+            self.observe(url, elapsed, 'error', None)
+            raise
+        else:
+            elapsed = time.monotonic() - start
+            state.record(
+                elapsed,
+                response.status_code,
+                parse_retry_after(response.headers.get('Retry-After'))
+            )
+        finally:
+            state.release()
+        bytes_decoded = len(response.content)
+        try:
+            bytes_received = response.raw.tell()
+        except Exception:
+            bytes_received = bytes_decoded
+        self.stats.add_request(bytes_received, bytes_decoded)
+        self.observe(url, elapsed, str(response.status_code), bytes_decoded)
+        if response.status_code == 304:
+            # Revalidated by get, the cached body is archived there
+            return response
+        return self.archived(url, kwargs, response)
+
+    def observe(self, url: str, elapsed: float, status: str, size: int | None) -> None:
+        """
+            Add request to the metrics
+
+            :status: status code, error - no response
+            :size: decoded bytes of the response
+        """
+        if self.metrics is None:
+            return
+        retailer, host = self.metrics.retailer(url)
+        self.metrics.observe(
+            'scraper_http_request_seconds', elapsed,
+            retailer=retailer, host=host, status=status
+        )
+        if size is not None:
+            self.metrics.observe(
+                'scraper_http_response_bytes', size,
+                retailer=retailer, host=host
+            )
+
+    def close_archives(self) -> None:
+        """
+            Close archive and replay archive, responses aren't archived
+            nor replayed afterwards
+        """
+        if self.archive is not None:
+            self.archive.close()
+        if self.replay is not None:
+            self.replay.close()
+
+    def log_stats(self) -> None:
+        stats = self.stats.as_dict()
+        logging.info(
+            f"HTTP: {stats['requests']} requests, "
+            f"{stats['bytes_received']} bytes received "
+            f"({stats['bytes_decoded']} decoded), "
+            f"{stats['handshakes']} handshakes, "
+            f"{stats['cache_hits']} cache hits, "
+            f"{stats['not_modified']} not modified"
+        )
+        if self.archive is not None:
+            self.archive.log_stats()
+        if self.replay is not None:
+            self.replay.log_stats()
+        self.scheduler.log_stats()
@@ -1,38 +1,30 @@
-import requests
 import logging
 import json
 
-from typing import List
+from typing import Iterator, List
 from datetime import datetime
-from bs4 import BeautifulSoup
+from bs4 import BeautifulSoup, SoupStrainer
 
-from parser.exceptions import ConnectionError
+from parser.base import BaseScraper
+from parser.product import Product
+from parser.soup import make_soup
 
 
-class CoopScraper:
+class CoopScraper(BaseScraper):
 
     MAIN_URL = "https://www.coop.nl"
     MAIN_CATALOG = "https://www.coop.nl/categorie/boodschappen"
     DISCOUNTS_URL = "https://api.coop.nl/INTERSHOP/rest/WFS/COOP-COOPBase-Site/-;loc=nl_NL;cur=EUR/categories/FULL"
 
-    def __init__(self) -> None:
-        logging.info(f"Initial {self.__class__.__name__}...")
-        logging.info(f"Try to connect {self.MAIN_URL}")
-        if not self.isAviable():
-            logging.error(f"Can't connect to {self.MAIN_URL}")
-            raise ConnectionError(f"Can't connect to {self.MAIN_URL}")
-        logging.info(f"{self.MAIN_URL} aviable!")
-        logging.info("...initial complete")
-
-    def isAviable(self) -> bool:
-        response = requests.get(self.MAIN_URL)
-        if response.status_code == 200:
-            return True
-        return False
+    # Only these parts of a page are parsed
+    CATEGORIES_STRAINER = SoupStrainer('custom-category-list')
+    PRODUCTS_STRAINER = SoupStrainer('custom-product-list')
 
     def get_categories(self, url_category: str) -> List[dict]:
-        response = requests.get(url_category)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        return self.fetch_categories(url_category, self.parse_categories)
+
+    def parse_categories(self, html: str) -> List[dict]:
+        soup = make_soup(html, self.CATEGORIES_STRAINER)
         list_container = soup.find('custom-category-list')
         list_container = list_container.find('div', {'id': 'listContainer'})
         categories_html = list_container.find_all(
@@ -57,14 +49,17 @@ class CoopScraper:
         ))
         return categories_data
     
-    def collect_products(self, url_products: str) -> List[dict]:
-        resoponse = requests.get(url_products)
-        soup = BeautifulSoup(resoponse.text, 'html.parser')
+    def collect_products(self, url_products: str) -> List[Product]:
+        resoponse = self.client.get(url_products)
+        return self.parse_products(resoponse.text)
+
+    def parse_products(self, html: str) -> List[Product]:
+        soup = make_soup(html, self.PRODUCTS_STRAINER)
         product_container = soup.find('custom-product-list', {'class': 'ng-star-inserted'})
         products_html = product_container.find_all('div', {'class': 'product-list__column ng-star-inserted'})
-        def wrapper_product_handler(product: BeautifulSoup) -> dict:
+        def wrapper_product_handler(product: BeautifulSoup) -> Product:
             name = product.find('p', {'itemprop': 'name'}).text
-            logging.info(f"Product {name} parsing...")
+            logging.debug('Product %s parsing...', name)
             link = product.find('a')['href']
             link_img = product.find(
                     'img',
@@ -76,13 +71,13 @@ class CoopScraper:
             price = product.find('meta', {'itemprop': 'price'})['content']
             old_price = product.find('div', {'class': 'sticker default'})
             old_price = price
-            product_data = {
-                'name': name,
-                'url': self.MAIN_URL + link,
-                'img_url': link_img,
-                'price': price,
-                'old_price': old_price
-            }
+            product_data = Product(
+                name=name,
+                url=self.MAIN_URL + link,
+                img_url=link_img,
+                price=price,
+                old_price=old_price
+            )
             return product_data
         
         products_data = list(map(
@@ -91,42 +86,13 @@ class CoopScraper:
         ))
         return products_data
 
-    def get_products(
-            self,
-            to_category: str = None,
-            to_subcategory: str = None,
-            is_end: bool = False
-    ) -> List[dict]:
-        categories = self.get_categories(self.MAIN_CATALOG)
-        products = []
+    def get_products(self) -> List[Product]:
+        return list(self.iter_products())
 
-        for category in categories:
-            try:
-                if category['name'] != to_category and to_category:
-                    logging.info(
-                        f"Going to {to_category}, category {category['name']} skipped!")
-                    continue
-                else:
-                    to_category = to_category if is_end else None
-                logging.info(f"Handling {category['name']} category...")
-                category_url = category['link']
-                subcategories = self.get_categories(category_url)
-            except Exception:
-                continue
-            for subcategory in subcategories:
-                if subcategory['name'] != to_subcategory and to_subcategory:
-                    logging.info(
-                        f"Going to {to_subcategory}, category {subcategory['name']} skipped!")
-                    continue
-                else:
-                    to_subcategory = to_subcategory if is_end else None
-                logging.info(f"Handling {subcategory['name']} subcategory...")
-                subcategory_url = subcategory['link']
-                try:
-                    subcategory_products = self.collect_products(
-                        subcategory_url)
-                    products += subcategory_products
-                except Exception:
-                    pass
-        return products
-    
\ No newline at end of file
+    def iter_products(self) -> Iterator[Product]:
+        yield from self.crawl_catalog(
+            self.MAIN_CATALOG,
+            self.parse_categories,
+            self.parse_categories,
+            self.parse_products
+        )
@@ -0,0 +1,213 @@
+import itertools
+import time
+
+from pathlib import Path
+from typing import Iterable, List, Optional, Tuple
+
+from parser.index import product_key
+from parser.product import Product, as_text
+from parser.storage import SqliteStore
+
+
+class ProductDatabase(SqliteStore):
+    """
+        Products of every run kept in a sqlite database.
+
+        products holds the latest state of every product, keyed by retailer
+        and product key (id or normalized url). price_history is append
+        only, a row is added when price, old_price or sale of a product
+        differs from its previous run.
+    """
+
+    # Fields of products which are written to the database, in column order
+    FIELDS = [
+        'id',
+        'name',
+        'description',
+        'url',
+        'img_url',
+        'category',
+        'subcategory',
+        'price',
+        'old_price',
+        'sale',
+        'price_cents',
+        'old_price_cents',
+        'discount',
+        'price_error',
+    ]
+
+    def __init__(self, path: Path | str, batch_size: int = 500) -> None:
+        """
+            :path: sqlite file
+            :batch_size: products written in one transaction
+        """
+        self.batch_size = batch_size
+        super().__init__(path)
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS products (
+                retailer TEXT NOT NULL,
+                key TEXT NOT NULL,
+                id TEXT,
+                name TEXT,
+                description TEXT,
+                url TEXT,
+                img_url TEXT,
+                category TEXT,
+                subcategory TEXT,
+                price TEXT,
+                old_price TEXT,
+                sale TEXT,
+                price_cents INTEGER,
+                old_price_cents INTEGER,
+                discount INTEGER,
+                price_error TEXT,
+                first_seen REAL NOT NULL,
+                last_seen REAL NOT NULL,
+                PRIMARY KEY (retailer, key)
+            )
+            '''
+        )
+        self.connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS price_history (
+                retailer TEXT NOT NULL,
+                key TEXT NOT NULL,
+                price TEXT,
+                old_price TEXT,
+                sale TEXT,
+                price_cents INTEGER,
+                old_price_cents INTEGER,
+                changed_at REAL NOT NULL
+            )
+            '''
+        )
+        # Latest prices and the history of one product
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS price_history_product '
+            'ON price_history (retailer, key, changed_at DESC)'
+        )
+        # Changes of the last N days
+        self.connection.execute(
+            'CREATE INDEX IF NOT EXISTS price_history_changed_at '
+            'ON price_history (changed_at)'
+        )
+
+    def row(self, product: Product) -> Optional[tuple]:
+        """
+            return (retailer, key, *FIELDS) of product,
+            None if product has no key
+        """
+        key = product_key(product)
+        if key is None:
+            return None
+        values = [getattr(product, field) for field in self.FIELDS]
+        for field in ('id', 'price', 'old_price', 'sale'):
+            index = self.FIELDS.index(field)
+            values[index] = as_text(values[index])
+        return (product.retailer, key, *values)
+
+    def write_batch(self, products: Iterable[Product], seen_at: float) -> int:
+        """
+            Upsert products and add price changes to the history in one
+            transaction
+
+            return how many rows of price_history were added
+        """
+        # The last product wins when a key repeats in the batch
+        rows = {}
+        for product in products:
+            row = self.row(product)
+            if row is not None:
+                rows[row[:2]] = row
+        if not rows:
+            return 0
+        rows = list(rows.values())
+        # price, old_price, sale, price_cents, old_price_cents
+        price = self.FIELDS.index('price') + 2
+        history = [
+            (
+                *row[:2], *row[price:price + 5], seen_at,
+                *row[:2], *row[price:price + 3]
+            )
+            for row in rows
+        ]
+        with self.lock:
+            self.connection.execute('BEGIN')
+            try:
+                before = self.connection.total_changes
+                self.connection.executemany(
+                    '''
+                    INSERT INTO price_history
+                    SELECT ?, ?, ?, ?, ?, ?, ?, ?
+                    WHERE NOT EXISTS (
+                        SELECT 1 FROM products
+                        WHERE retailer = ? AND key = ?
+                        AND price IS ? AND old_price IS ? AND sale IS ?
+                    )
+                    ''',
+                    history
+                )
+                changes = self.connection.total_changes - before
+                columns = ', '.join(self.FIELDS)
+                self.connection.executemany(
+                    f'''
+                    INSERT INTO products (
+                        retailer, key, {columns}, first_seen, last_seen
+                    )
+                    VALUES ({', '.join('?' * (len(self.FIELDS) + 4))})
+                    ON CONFLICT (retailer, key) DO UPDATE SET
+                    {', '.join(f'{field} = excluded.{field}' for field in self.FIELDS)},
+                    last_seen = excluded.last_seen
+                    ''',
+                    [(*row, seen_at, seen_at) for row in rows]
+                )
+                self.connection.execute('COMMIT')
+            except BaseException:
+                self.connection.execute('ROLLBACK')
+                raise
+        return changes
+
+    def save(self, products: Iterable[Product]) -> Tuple[int, int]:
+        """
+            Write products of one run in batches of batch_size
+
+            return (products written, price changes)
+        """
+        seen_at = time.time()
+        products = iter(products)
+        count = 0
+        changes = 0
+        while True:
+            batch = list(itertools.islice(products, self.batch_size))
+            if not batch:
+                return count, changes
+            changes += self.write_batch(batch, seen_at)
+            count += len(batch)
+
+    def history(self, retailer: str, key: str) -> List[tuple]:
+        """
+            return (price, old_price, sale, changed_at) of product,
+            latest first
+        """
+        with self.lock:
+            return self.connection.execute(
+                'SELECT price, old_price, sale, changed_at FROM price_history '
+                'WHERE retailer = ? AND key = ? ORDER BY changed_at DESC',
+                (retailer, key)
+            ).fetchall()
+
+    def changes(self, days: float) -> List[tuple]:
+        """
+            return (retailer, key, price, old_price, sale, changed_at) of
+            every price change in the last days, latest first
+        """
+        with self.lock:
+            return self.connection.execute(
+                'SELECT retailer, key, price, old_price, sale, changed_at '
+                'FROM price_history WHERE changed_at >= ? '
+                'ORDER BY changed_at DESC',
+                (time.time() - days * 24 * 60 * 60,)
+            ).fetchall()
@@ -1,42 +1,38 @@
 import logging
-import requests
 
-from typing import List
+from typing import Iterator, List
 from bs4 import BeautifulSoup
 
-from parser.exceptions import ConnectionError
+from parser.base import BaseScraper, Unit
+from parser.prices import join_price
+from parser.product import Product
+from parser.soup import class_strainer, make_soup
 
 
-class DekaScraper:
+class DekaScraper(BaseScraper):
 
     MAIN_URL = "https://www.dekamarkt.nl"
     MAIN_CATALOG = "https://www.dekamarkt.nl/aanbiedingen"
 
-    def __init__(self) -> None:
-        logging.info(f"Initial {self.__class__.__name__}...")
-        logging.info(f"Try to connect {self.MAIN_URL}")
-        if not self.isAviable():
-            logging.error(f"Can't connect to {self.MAIN_URL}")
-            raise ConnectionError(f"Can't connect to {self.MAIN_URL}")
-        logging.info(f"{self.MAIN_URL} aviable!")
-        logging.info("...initial complete")
+    # Only these parts of a page are parsed
+    PRODUCTS_STRAINER = class_strainer('article', 'deka-product-card')
 
-    def isAviable(self) -> bool:
-        response = requests.get(self.MAIN_URL)
-        if response.status_code == 200:
-            return True
-        return False
-    
-    def get_discounts(self) -> List[dict]:
-        response = requests.get(self.MAIN_CATALOG)
-        soup = BeautifulSoup(response.text, 'html.parser')
+    def get_discounts(self) -> List[Product]:
+        return list(self.iter_discounts())
+
+    def iter_discounts(self) -> Iterator[Product]:
+        unit = Unit('aanbiedingen', 'aanbiedingen', 1, self.MAIN_CATALOG)
+        yield from self.crawl([unit], self.parse_discounts)
+
+    def parse_discounts(self, html: str) -> List[Product]:
+        soup = make_soup(html, self.PRODUCTS_STRAINER)
         products = soup.find_all('article', 'deka-product-card')
-        def wrapper_product_handler(product: BeautifulSoup) -> dict:
+        def wrapper_product_handler(product: BeautifulSoup) -> Product:
             try:
                 name = product.find('h3', {
                     'class': 'deka-product-card--info--title product-card-title-1'
                 }).text
-                logging.info(f'Parsing {name} product...')
+                logging.debug('Parsing %s product...', name)
                 url = self.MAIN_URL + product.find(
                     'a',
                     {'class': 'deka-product-card--image'}
@@ -48,7 +44,7 @@ class DekaScraper:
                 cents = product.find(
                     'span',
                     {'class': 'price--after-decimal--offer price-2'}).text
-                price = euros + cents
+                price = join_price(euros, cents)
                 euros = product.find(
                     'span',
                     {'class': 'price--before-decimal--regular price-2'})
@@ -56,25 +52,25 @@ class DekaScraper:
                     'span',
                     {'class': 'price--after-decimal--regular price-2'})
                 if euros and cents:
-                    old_price = euros.text + cents.text
+                    old_price = join_price(euros.text, cents.text)
                 else:
                     old_price = price
-                product_data = {
-                    'name': name,
-                    'url': url,
-                    'img_url': img_url,
-                    'price': price,
-                    'old_price': old_price
-                }
+                product_data = Product(
+                    name=name,
+                    url=url,
+                    img_url=img_url,
+                    price=price,
+                    old_price=old_price
+                )
             except Exception:
-                return {}
+                return None
             return product_data
         products = list(map(
             wrapper_product_handler,
             products
         ))
         products = list(filter(
-            lambda x: len(x) != 0,
+            lambda x: x is not None,
             products
         ))
         return products
@@ -1,31 +1,55 @@
-import requests
+import hashlib
+import json
 import logging
 
 from bs4 import BeautifulSoup
-from typing import List, Iterable
+from pathlib import Path
+from typing import Iterator, List, Iterable
 
-from parser.exceptions import ConnectionError
+from parser.base import BaseScraper
+from parser.prices import join_price
+from parser.product import Product
+from parser.scheduler import RateLimit
+from parser.soup import class_strainer, make_soup
+from parser.storage import JsonStore
 
 
-class DirkScraper:
+class DirkScraper(BaseScraper):
 
     MAIN_URL = "https://www.dirk.nl/"
     MAIN_CATALOG = "https://www.dirk.nl/boodschappen"
 
-    def __init__(self) -> None:
-        logging.info(f"Initial {self.__class__.__name__}...")
-        logging.info(f"Try to connect {self.MAIN_URL}")
-        if not self.isAviable():
-            logging.error(f"Can't connect to {self.MAIN_URL}")
-            raise ConnectionError(f"Can't connect to {self.MAIN_URL}")
-        logging.info(f"{self.MAIN_URL} aviable!")
-        logging.info("...initial complete")
-
-    def isAviable(self) -> bool:
-        response = requests.get(self.MAIN_URL)
-        if response.status_code == 200:
-            return True
-        return False
+    # Product pages are fetched one by one, go easy on the host
+    RATE_LIMIT = RateLimit(rate=5, burst=10)
+
+    # Only these parts of a page are parsed
+    CATEGORIES_STRAINER = class_strainer('nav', 'product-category-header__nav')
+    PRODUCT_STRAINER = class_strainer(
+        'div',
+        'product-details__info',
+        'product-details__image',
+        'product-card__price'
+    )
+    LISTING_STRAINER = class_strainer('div', 'products-list-container')
+
+    # Read products from the product cards of the subcategory page,
+    # product pages are fetched only when it's needed
+    LISTING_MODE = True
+
+    # Fingerprints of the product cards from the last run
+    PATH_LISTING = Path(
+            Path.cwd(),
+            'parser',
+            'dirk',
+            'data',
+            'listing.json'
+        )
+
+    LISTING_FIELDS = ['name', 'url', 'img_url', 'price', 'old_price']
+
+    def __init__(self, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self.listing = JsonStore(self.PATH_LISTING)
 
     def convert_categories(
             self,
@@ -54,16 +78,25 @@ class DirkScraper:
 
             :url_category: url with categories
 
+            return list of categories as dict, empty if the page is lost
+        """
+        return self.fetch_categories(url_category, self.parse_categories)
+
+    def parse_categories(self, html: str) -> List[dict]:
+        """
+            Parse categories data from html page
+
+            :html: page with categories
+
             return list of categories as dict
         """
-        html_page = requests.get(url_category).text
-        soup = BeautifulSoup(html_page, 'html.parser')
+        soup = make_soup(html, self.CATEGORIES_STRAINER)
         soup = soup.find('nav', 'product-category-header__nav')
         html_categories = soup.find_all('li')
         categories = self.convert_categories(html_categories)
         return categories
 
-    def get_product(self, url_product: str) -> dict:
+    def get_product(self, url_product: str) -> Product:
         """
             Make get request to url of product, parse data product
 
@@ -71,8 +104,19 @@ class DirkScraper:
 
             return list of categories as dict
         """
-        response = requests.get(url_product)
-        html_product = BeautifulSoup(response.text, 'html.parser')
+        response = self.client.get(url_product)
+        return self.parse_product(response.text, url_product)
+
+    def parse_product(self, html: str, url_product: str) -> Product:
+        """
+            Parse data product from html page of product
+
+            :html: product page
+            :url_product: product url
+
+            return product
+        """
+        html_product = make_soup(html, self.PRODUCT_STRAINER)
         product_name = html_product.find(
             'div', 'product-details__info').find(
             'h1', 'product-details__info__title').text
@@ -81,22 +125,22 @@ class DirkScraper:
         price_segment = html_product.find('div', 'product-card__price')
         euros = price_segment.find('span', 'product-card__price__euros').text
         cents = price_segment.find('span', 'product-card__price__cents').text
-        product_price = euros + cents
+        product_price = join_price(euros, cents)
         try:
             product_old_price = price_segment.find(
                 'div', 'product-card__price__old').text
         except AttributeError:
-            logging.info(f'{product_name} is sold without discount.')
+            logging.debug('%s is sold without discount.', product_name)
             product_old_price = product_price
 
-        product = {
-            'name': product_name,
-            'url': url_product,
-            'img_url': img_url,
-            'price': product_price,
-            'old_price': product_old_price.strip()
-        }
-        logging.info(f"{product_name} succesfully scraped!")
+        product = Product(
+            name=product_name,
+            url=url_product,
+            img_url=img_url,
+            price=product_price,
+            old_price=product_old_price.strip()
+        )
+        logging.debug('%s succesfully scraped!', product_name)
         return product
 
     def collect_product_urls(self, url_subcategory: str) -> List[str]:
@@ -107,8 +151,18 @@ class DirkScraper:
 
             return list of urls
         """
-        html_page = requests.get(url_subcategory)
-        soup = BeautifulSoup(html_page.text, 'html.parser')
+        html_page = self.client.get(url_subcategory)
+        return self.parse_product_urls(html_page.text)
+
+    def parse_product_urls(self, html: str) -> List[str]:
+        """
+            Collect all links to product from subcategory page
+
+            :html: subcategory page
+
+            return list of urls
+        """
+        soup = make_soup(html, self.LISTING_STRAINER)
         soup = soup.find(
             'div',
             'products-list-container'
@@ -122,58 +176,168 @@ class DirkScraper:
         ))
         return product_urls
 
-    def get_products(self,
-        to_category: str = None,
-        to_subcategory: str = None,
-        is_end: bool = False
-    ) -> List[dict]:
+    def parse_listing(self, html: str) -> List[Product]:
+        """
+            Parse products from product cards of subcategory page,
+            missing fields are None
+
+            :html: subcategory page
+
+            return list of products
+        """
+        soup = make_soup(html, self.LISTING_STRAINER)
+        soup = soup.find(
+            'div',
+            'products-list-container'
+        ).find('div', 'products-wrapper')
+        products = soup.find_all('div', 'product-card')
+
+        def wrapper_product_handler(product: BeautifulSoup) -> Product:
+            link = product.find('a', 'product-card__image')
+            url = self.MAIN_URL + link['href'].strip('/')
+            name = product.find(class_='product-card__name')
+            img = link.find('img')
+            price_segment = product.find('div', 'product-card__price')
+            price = None
+            old_price = None
+            if price_segment:
+                euros = price_segment.find('span', 'product-card__price__euros')
+                cents = price_segment.find('span', 'product-card__price__cents')
+                if euros and cents:
+                    price = join_price(euros.text, cents.text)
+                old_price = price_segment.find('div', 'product-card__price__old')
+                old_price = old_price.text.strip() if old_price else price
+            product_data = Product(
+                name=name.text.strip() if name else None,
+                url=url,
+                img_url=img.get('src') if img else None,
+                price=price,
+                old_price=old_price
+            )
+            return product_data
+
+        products_data = list(map(
+            wrapper_product_handler,
+            products
+        ))
+        return products_data
+
+    def listing_fingerprint(self, product: Product) -> str:
+        data = json.dumps(
+            [getattr(product, field) for field in self.LISTING_FIELDS],
+            ensure_ascii=False
+        )
+        return hashlib.sha1(data.encode('utf-8')).hexdigest()
+
+    def is_complete(self, product: Product) -> bool:
+        return all(getattr(product, field) for field in self.LISTING_FIELDS)
+
+    def parse_page_products(self, html: str) -> List[Product]:
         """
-            Main method to get all or selected products from category/subcategory.
+            Parse products of subcategory page without requests: product
+            cards in listing mode, else products with their url only.
+            Products are completed from product pages by complete
 
-            :to_category: category name | Copy from site
-            :to_subcategory: subcategory name | Copy from site
-            :is_end: if false, skips only categories at the beginning
-                    if true, parses only the selected category
+            :html: subcategory page
 
             return list of products
         """
+        if self.LISTING_MODE:
+            return self.parse_listing(html)
+        return [Product(url=url) for url in self.parse_product_urls(html)]
+
+    def complete(self, products: List[Product], category: str = None) -> List[Product]:
+        """
+            Fetch product pages of products of a subcategory page. In
+            listing mode a product page is fetched only when a field is
+            missing on the product card or the card changed since the
+            last run, else every product page is fetched.
 
-        categories = self.get_categories(self.MAIN_CATALOG)
-        products = []
+            :products: products of subcategory page
+            :category: category of the page, label of its metrics
 
-        for category in categories:
+            return list of products
+        """
+        completed = []
+        products_url = []
+        fingerprints = {}
+        for product in products:
+            if not self.LISTING_MODE:
+                products_url.append(product.url)
+                continue
+            fingerprint = self.listing_fingerprint(product)
+            last_fingerprint = self.listing.get(product.url)
+            fingerprints[product.url] = fingerprint
+            if not self.is_complete(product):
+                products_url.append(product.url)
+            elif last_fingerprint and last_fingerprint != fingerprint:
+                logging.debug('%s changed since the last run.', product.name)
+                products_url.append(product.url)
+            else:
+                self.listing.set(product.url, fingerprint)
+                completed.append(product)
+
+        product_responses = self.iter_fetch(products_url)
+        for url, product_response in product_responses:
+            if isinstance(product_response, Exception):
+                continue
             try:
-                if category['name'] != to_category and to_category:
-                    logging.info(
-                        f"Going to {to_category}, category {category['name']} skipped!")
-                    continue
-                else:
-                    to_category = to_category if is_end else None
-                logging.info(f"Handling {category['name']} category...")
-                category_url = category['link']
-                subcategories = self.get_categories(category_url)
-            except AttributeError:
+                completed += self.parse_page(
+                    product_response,
+                    lambda text, url=url: [self.parse_product(text, url)],
+                    category
+                )
+            except Exception as e:
+                self.retry.lose(url, f"can't parse: {e!r}")
                 continue
+            if url in fingerprints:
+                self.listing.set(url, fingerprints[url])
+        return completed
+
+    def collect_listing_products(self, html: str) -> List[Product]:
+        """
+            Collect products of subcategory page from product cards,
+            product pages are fetched only when it's needed
+
+            :html: subcategory page
+
+            return list of products
+        """
+        return self.complete(self.parse_listing(html))
+
+    def collect_detail_products(self, html: str) -> List[Product]:
+        """
+            Collect products of subcategory page from product pages
+
+            :html: subcategory page
+
+            return list of products
+        """
+        return self.complete(
+            [Product(url=url) for url in self.parse_product_urls(html)])
+
+    def get_products(self) -> List[Product]:
+        """
+            Main method to get all products, an unfinished previous run
+            is resumed from the checkpoint.
+
+            return list of products
+        """
+        return list(self.iter_products())
+
+    def iter_products(self) -> Iterator[Product]:
+        """
+            Same as get_products, but yields products as soon as
+            a subcategory is parsed
+
+            yield product
+        """
+        yield from self.crawl_catalog(
+            self.MAIN_CATALOG,
+            self.parse_categories,
+            self.parse_categories,
+            self.parse_page_products
+        )
 
-            for subcategory in subcategories:
-                if subcategory['name'] != to_subcategory and to_subcategory:
-                    logging.info(
-                        f"Going to {to_subcategory}, category {subcategory['name']} skipped!")
-                    continue
-                else:
-                    to_subcategory = to_subcategory if is_end else None
-                logging.info(f"Handling {subcategory['name']} subcategory...")
-                subcategory_url = subcategory['link']
-                try:
-                    products_url = self.collect_product_urls(
-                        subcategory_url
-                    )
-                    logging.info("Handling products...")
-                    products_subcategory = list(map(
-                        lambda url: self.get_product(url),
-                        products_url
-                    ))
-                    products += products_subcategory
-                except AttributeError:
-                    pass
-        return products
+        if self.LISTING_MODE:
+            self.listing.save()
@@ -1,2 +1,2 @@
 
-class ConnectionError(BaseException): ...
+class ConnectionError(Exception): ...
@@ -0,0 +1,95 @@
+import asyncio
+import logging
+import weakref
+import requests
+
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Dict, Iterable, List, Tuple, Union
+from urllib.parse import urlsplit
+
+
+Request = Union[str, Tuple[str, dict]]
+
+
+class AsyncFetcher:
+    """
+        Asyncio based engine to fetch many pages at the same time.
+
+        Every blocking get runs in the fetcher's thread pool, the number
+        of requests in flight is bounded per host by an asyncio.Semaphore.
+        A request is an url or a tuple (url, kwargs for get).
+    """
+
+    def __init__(
+            self,
+            max_per_host: int = 8,
+            max_workers: int = 32,
+            get: Callable[..., requests.Response] = requests.get
+    ) -> None:
+        self.max_per_host = max_per_host
+        self.get = get
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers,
+            thread_name_prefix='fetcher'
+        )
+        # Semaphores are bound to an event loop, keep a set per loop
+        self._semaphores = weakref.WeakKeyDictionary()
+
+    def semaphore(self, url: str) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        semaphores: Dict[str, asyncio.Semaphore] = self._semaphores.setdefault(loop, {})
+        host = urlsplit(url).netloc
+        if host not in semaphores:
+            semaphores[host] = asyncio.Semaphore(self.max_per_host)
+        return semaphores[host]
+
+    async def fetch(self, url: str, **kwargs) -> requests.Response:
+        loop = asyncio.get_running_loop()
+        async with self.semaphore(url):
+            return await loop.run_in_executor(
+                self.executor,
+                lambda: self.get(url, **kwargs)
+            )
+
+    async def fetch_all(
+            self,
+            requests_: Iterable[Request]
+    ) -> List[Union[requests.Response, Exception]]:
+        """
+            Fetch all requests concurrently
+
+            :requests_: urls or (url, kwargs) tuples
+
+            return responses in the same order, a failed request is
+            returned as its exception
+        """
+        requests_ = list(requests_)
+
+        def wrapper_request_handler(request: Request):
+            if isinstance(request, str):
+                return self.fetch(request)
+            url, kwargs = request
+            return self.fetch(url, **kwargs)
+
+        coroutines = list(map(
+            wrapper_request_handler,
+            requests_
+        ))
+        responses = await asyncio.gather(*coroutines, return_exceptions=True)
+        for request, response in zip(requests_, responses):
+            if isinstance(response, Exception):
+                url = request if isinstance(request, str) else request[0]
+                logging.warning(f"Can't fetch {url}: {response!r}")
+        return responses
+
+    def fetch_many(
+            self,
+            requests_: Iterable[Request]
+    ) -> List[Union[requests.Response, Exception]]:
+        """
+            Blocking variant of fetch_all, runs its own event loop
+        """
+        requests_ = list(requests_)
+        if not requests_:
+            return []
+        return asyncio.run(self.fetch_all(requests_))
@@ -1,8 +1,25 @@
+import asyncio
 import logging
+import queue
+import threading
+import time
 import csv
 
-from typing import List
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
 
+from parser.archive import ArchiveReader, ArchiveWriter
+from parser.cache import HttpCache
+from parser.database import ProductDatabase
+from parser.checkpoint import Checkpoint
+from parser.client import HttpClient
+from parser.fetcher import AsyncFetcher
+from parser.index import ProductIndex
+from parser.metrics import Metrics
+from parser.prices import PriceNormalizer
+from parser.product import Product
+from parser.progress import Progress
+from parser.state import CrawlState
+from parser import parquet, soup
 from parser.aldi.scraper import AldiScraper
 from parser.coop.scraper import CoopScraper
 from parser.deka.scraper import DekaScraper
@@ -28,19 +45,185 @@ class ParserHandler:
         VomarScraper,
     ]
 
-    def __init__(self, path_webdriver: str, ignore_scrapers: list, logging_level) -> None:
+    BASIC_CLASSES = [
+        'AldiScraper',
+        'CoopScraper',
+        'DirkScraper',
+        'HoogvlieScraper',
+        'JanlindersScraper',
+        'JumboScraper',
+        'PoieszScrapper',
+        'VomarScraper',
+    ]
+
+    DISCOUNT_CLASSES = [
+        'DekaScraper',
+        'JanlindersScraper',
+    ]
+
+    OFFER_CLASSES = [
+        'PoieszScrapper',
+    ]
+
+    # Products buffered between scraper threads and the consumer
+    QUEUE_SIZE = 1000
+
+    def __init__(
+            self,
+            path_webdriver: str,
+            ignore_scrapers: list,
+            logging_level,
+            max_workers: int = 4,
+            scraper_timeout: float = None,
+            max_requests_per_host: int = 8,
+            http_host_pool_sizes: Dict[str, int] = None,
+            http_timeout: float = 30,
+            http_cache_path: str = None,
+            http_cache_ttl: float = 6 * 60 * 60,
+            http_cache_size: int = 512 * 1024 * 1024,
+            crawl_state_path: str = None,
+            checkpoint_path: str = None,
+            html_parser: str = None,
+            webdriver_pool_size: int = 4,
+            webdriver_hybrid: bool = True,
+            normalize_prices: bool = True,
+            archive_path: str = None,
+            replay_path: str = None,
+            metrics_json_path: str = None,
+            metrics_prometheus_path: str = None,
+            progress_interval: float = 10
+    ) -> None:
+        """
+            :path_webdriver: path to chromedriver, used by JumboScraper
+            :ignore_scrapers: names of scraper classes to skip
+            :logging_level: logging level
+            :max_workers: how many retailers are scraped at the same time
+                    in concurrent mode
+            :scraper_timeout: wall-clock limit in seconds for one retailer
+                    in concurrent mode, None means no limit
+            :max_requests_per_host: how many requests to one host are
+                    in flight at the same time, also the default size
+                    of the keep-alive pool per host
+            :http_host_pool_sizes: host -> keep-alive pool size
+            :http_timeout: default timeout of a request in seconds
+            :http_cache_path: sqlite file of the response cache,
+                    None - responses aren't cached
+            :http_cache_ttl: seconds a cached response is used without
+                    revalidation
+            :http_cache_size: bytes of responses kept in the cache
+            :crawl_state_path: sqlite file with fingerprints and products
+                    of pages from the last run, unchanged pages aren't
+                    parsed again. None - every page is parsed
+            :checkpoint_path: sqlite file with completed pages of the
+                    current run, an interrupted run is resumed from it.
+                    None - no checkpoints
+            :html_parser: BeautifulSoup backend of scrapers,
+                    None - the fastest installed one
+            :webdriver_pool_size: how many headless browsers JumboScraper
+                    runs at the same time
+            :webdriver_hybrid: JumboScraper uses the browser only to
+                    start a session and fetches pages over HTTP
+            :normalize_prices: add prices in integer cents, discount
+                    and price errors to products
+            :archive_path: directory of response archives, every run
+                    saves all responses to a new archive in it, opened
+                    when the run starts and closed when it finishes.
+                    None - responses aren't archived
+            :replay_path: archive, or directory of archives - its latest
+                    one. Scrapers parse the archived responses instead of
+                    the network, without cache, crawl state and
+                    checkpoints. JumboScraper is skipped: it needs a browser
+            :metrics_json_path: json report of request, parse and stage
+                    metrics written at the end of the run
+            :metrics_prometheus_path: the same metrics in the Prometheus
+                    text format, e.g. for the textfile collector
+            metrics aren't kept when both paths are None
+            :progress_interval: seconds between progress lines with
+                    products/s, pages done/total and ETA, None - no lines.
+                    Every product is logged at DEBUG level
+        """
 
         logging.basicConfig(level=logging_level, format="[%(asctime)s] | %(levelname)s - %(message)s")
 
+        logging.info(f"HTML parser: {soup.set_backend(html_parser)}")
+
+        self.max_workers = max_workers
+        self.scraper_timeout = scraper_timeout
+        self.metrics_json_path = metrics_json_path
+        self.metrics_prometheus_path = metrics_prometheus_path
+        self.progress = Progress(interval=progress_interval)
+        self.metrics = None
+        if metrics_json_path or metrics_prometheus_path:
+            self.metrics = Metrics()
+        self.archive_path = None
+        replay = None
+        if replay_path:
+            replay = ArchiveReader(replay_path)
+            logging.info(f"Replay mode: responses are read from {replay.path}")
+            http_cache_path = None
+            crawl_state_path = None
+            checkpoint_path = None
+            ignore_scrapers = list(ignore_scrapers) + ['JumboScraper']
+        elif archive_path:
+            self.archive_path = archive_path
+        cache = None
+        if http_cache_path:
+            cache = HttpCache(
+                http_cache_path,
+                ttl=http_cache_ttl,
+                max_size=http_cache_size
+            )
+        self.client = HttpClient(
+            pool_size=max_requests_per_host,
+            host_pool_sizes=http_host_pool_sizes,
+            timeout=http_timeout,
+            cache=cache,
+            replay=replay,
+            metrics=self.metrics
+        )
+        self.fetcher = AsyncFetcher(
+            max_per_host=max_requests_per_host,
+            get=self.client.get
+        )
+        self.crawl_state = None
+        if crawl_state_path:
+            self.crawl_state = CrawlState(crawl_state_path)
+        self.checkpoint = None
+        if checkpoint_path:
+            self.checkpoint = Checkpoint(checkpoint_path)
+        self.prices = None
+        if normalize_prices:
+            self.prices = PriceNormalizer(metrics=self.metrics)
+
         scrapers = self.SCRAPER_CLASSES
 
         def wrapper_scraper_handler(scraper: str):
             if scraper.__name__ in ignore_scrapers:
                 return None
-            if scraper.__name__ == 'JumboScraper':
-                return scraper(path_webdriver)
-            return scraper()
-        
+            kwargs = {
+                'client': self.client,
+                'fetcher': self.fetcher,
+                'crawl_state': self.crawl_state,
+                'checkpoint': self.checkpoint,
+                'progress': self.progress,
+            }
+            if replay:
+                # MAIN_URL may not be in the archive
+                kwargs['check'] = False
+            try:
+                if scraper.__name__ == 'JumboScraper':
+                    return scraper(
+                        path_webdriver,
+                        pool_size=webdriver_pool_size,
+                        hybrid=webdriver_hybrid,
+                        **kwargs
+                    )
+                return scraper(**kwargs)
+            except Exception as e:
+                # One unreachable retailer doesn't stop the others
+                logging.error(f"{scraper.__name__} skipped, initial failed: {e!r}")
+                return None
+
         scrapers = list(map(
             wrapper_scraper_handler,
             scrapers
@@ -52,86 +235,429 @@ class ParserHandler:
 
         logging.info("ALL SCRAPERS INITIALIZED")
 
-    def get_products(self) -> List[dict]:
-        basic_classes = [
-            'AldiScraper',
-            'CoopScraper',
-            'DirkScraper',
-            'HoogvlieScraper',
-            'JanlindersScraper',
-            'JumboScraper',
-            'PoieszScrapper',
-            'VomarScraper',
-        ]
+    def get_scraper_products(self, scraper) -> List[Product]:
+        """
+            Collect products from every source of one scraper
 
-        discount_classes = [
-            'DekaScraper',
-            'JanlindersScraper',
-        ]
+            :scraper: initialized scraper
 
-        offer_classes = [
-            'PoieszScrapper',
-        ]
+            return list of products
+        """
+        return list(self.iter_scraper_products(scraper))
+
+    def iter_scraper_products(self, scraper) -> Iterator[Product]:
+        """
+            Same as get_scraper_products, but yields products as soon as
+            the scraper parses them. Offers and discounts are collected
+            first and merged into the base products as they stream in,
+            every product is yielded once. Prices are normalized in
+            batches when normalize_prices is set
+
+            yield product
+        """
+        products = self.iter_merged_products(scraper)
+        if self.prices:
+            products = self.prices.normalize(products)
+        yield from products
+
+    def iter_merged_products(self, scraper) -> Iterator[Product]:
+        """
+            yield products of scraper merged with its offers and discounts
+        """
+        class_name = scraper.__class__.__name__
+        index = ProductIndex(class_name)
+        start = time.perf_counter()
+        if class_name in self.DISCOUNT_CLASSES:
+            list(map(index.add_offer, scraper.iter_discounts()))
+        if class_name in self.OFFER_CLASSES:
+            list(map(index.add_offer, scraper.iter_offers()))
+        self.observe_stage(class_name, 'offers', start)
+        start = time.perf_counter()
+        if class_name in self.BASIC_CLASSES:
+            for product in scraper.iter_products():
+                product = index.merge(product)
+                if product is not None:
+                    yield product
+        yield from index.iter_offers()
+        # Wall time, products are streamed so it includes the consumers
+        self.observe_stage(class_name, 'products', start)
+        logging.info(
+            f"{class_name}: {index.merged} products merged with offers, "
+            f"{index.duplicates} duplicates dropped"
+        )
+
+    def observe_stage(self, retailer: str, stage: str, start: float) -> None:
+        if self.metrics is not None:
+            self.metrics.observe(
+                'scraper_stage_seconds', time.perf_counter() - start,
+                retailer=retailer, stage=stage
+            )
+
+    def get_products(self, concurrent: bool = False) -> List[Product]:
+        """
+            Collect products from all active scrapers
+
+            :concurrent: if true, every retailer is scraped in its own
+                    worker thread, else retailers are scraped one by one
+
+            return list of products
+        """
+        return list(self.iter_products(concurrent))
+
+    def iter_products(self, concurrent: bool = False) -> Iterator[Product]:
+        """
+            Same as get_products, but yields products as soon as they are
+            parsed, so the whole catalog is never kept in memory
+
+            :concurrent: if true, every retailer is scraped in its own
+                    worker thread, else retailers are scraped one by one
+
+            yield product
+        """
+        self.begin_run()
+        if not concurrent:
+            for scraper in self.scrapers:
+                class_name = scraper.__class__.__name__
+                for product in self.iter_scraper_products(scraper):
+                    self.progress.add_products(class_name)
+                    yield product
+            self.finish_run()
+            return
+
+        tasks = {
+            scraper.__class__.__name__: (
+                lambda scraper=scraper: self.iter_scraper_products(scraper)
+            )
+            for scraper in self.scrapers
+        }
+        for class_name, product in self.run_concurrently(tasks):
+            self.progress.add_products(class_name)
+            yield product
+
+        self.finish_run()
+
+    def begin_run(self) -> None:
+        """
+            Start a run of all retailers, an unfinished previous run
+            is resumed from the checkpoint
+        """
+        if self.checkpoint:
+            self.checkpoint.begin()
+        if self.archive_path:
+            self.client.archive = ArchiveWriter.for_run(self.archive_path)
+            logging.info(f"Responses are archived to {self.client.archive.path}")
+
+    def finish_run(self) -> None:
+        """
+            Log the report of the run, the checkpoint of the whole run
+            is cleared and its archive is closed
+        """
+        if self.checkpoint:
+            self.checkpoint.finish()
+        self.log_report()
+        archive, self.client.archive = self.client.archive, None
+        if archive is not None:
+            archive.close()
+
+    def close(self) -> None:
+        """
+            Close the replay archive and the sqlite stores, the handler
+            can't run afterwards
+        """
+        self.client.close_archives()
+        stores = [self.client.cache, self.crawl_state, self.checkpoint]
+        for store in stores:
+            if store is not None:
+                store.close()
+
+    async def aget_products(self) -> List[Product]:
+        """
+            Async variant of get_products to embed the crawl in an asyncio
+            application. The concurrent crawl of get_products runs in a
+            thread of its own, the event loop isn't blocked: every retailer
+            runs in a worker thread, at most max_workers at the same time,
+            and a retailer which exceeds scraper_timeout is abandoned.
+
+            return list of products
+        """
+        return await asyncio.to_thread(self.get_products, True)
+
+    def run_concurrently(
+            self,
+            tasks: Dict[str, Callable[[], Iterable]]
+    ) -> Iterator[Tuple[str, object]]:
+        """
+            Run every task in its own daemon thread, at most max_workers
+            at the same time, and yield items as soon as a task produces them.
+
+            A task that raises is logged and stopped. A task that runs longer
+            than scraper_timeout is abandoned: it is stopped at its next item
+            and its worker slot is given to the next task.
+
+            :tasks: task name -> callable without arguments returning iterable
+
+            yield (task name, item)
+        """
+        slots = threading.Semaphore(self.max_workers)
+        # Bounded, so fast scrapers wait for the consumer instead of
+        # piling products up in memory
+        results = queue.Queue(maxsize=self.QUEUE_SIZE)
+        started = {}
+        released = {}
+        abandoned = {name: threading.Event() for name in tasks}
+        lock = threading.Lock()
+
+        def release(name: str) -> None:
+            with lock:
+                if released.get(name):
+                    return
+                released[name] = True
+            slots.release()
+
+        def put(name: str, event: tuple) -> bool:
+            while not abandoned[name].is_set():
+                try:
+                    results.put(event, timeout=1)
+                    return True
+                except queue.Full:
+                    continue
+            return False
+
+        def worker(name: str, task: Callable[[], Iterable]) -> None:
+            slots.acquire()
+            started[name] = time.monotonic()
+            count = 0
+            try:
+                for item in task():
+                    if not put(name, (name, item, None, False)):
+                        return
+                    count += 1
+                logging.info(f"{name}: {count} products collected")
+                put(name, (name, None, None, True))
+            except BaseException as e:
+                put(name, (name, None, e, True))
+            finally:
+                release(name)
+
+        for name, task in tasks.items():
+            threading.Thread(
+                target=worker,
+                args=(name, task),
+                name=f'scraper-{name}',
+                daemon=True
+            ).start()
+
+        pending = set(tasks)
+        while pending:
+            try:
+                name, item, error, is_done = results.get(timeout=1)
+            except queue.Empty:
+                name = None
+                # Progress lines go on while no products arrive
+                self.progress.tick()
+
+            if name in pending:
+                if is_done:
+                    pending.discard(name)
+                    if error is not None:
+                        logging.error(f"{name} failed: {error!r}")
+                else:
+                    yield name, item
+
+            if not self.scraper_timeout:
+                continue
+            now = time.monotonic()
+            for name in list(pending):
+                start = started.get(name)
+                if start is not None and now - start > self.scraper_timeout:
+                    logging.error(
+                        f"{name} exceeded {self.scraper_timeout}s, abandoned!")
+                    pending.discard(name)
+                    abandoned[name].set()
+                    release(name)
+
+    def log_report(self) -> None:
+        """
+            Log HTTP counters, how many pages were new, changed or
+            unchanged since the last run, requests wasted on identical
+            pages and every page which was lost
+        """
+        self.progress.log_stats()
+        self.client.log_stats()
+        if self.prices:
+            self.prices.log_stats()
+        total = {
+            'new': 0,
+            'changed': 0,
+            'unchanged': 0,
+        }
+        for scraper in self.scrapers:
+            pages = getattr(scraper, 'pages', None)
+            if pages is None:
+                continue
+            logging.info(
+                f"{scraper.__class__.__name__} pages: {pages['new']} new, "
+                f"{pages['changed']} changed, {pages['unchanged']} unchanged"
+            )
+            for state, count in pages.items():
+                total[state] += count
+        logging.info(
+            f"All pages: {total['new']} new, "
+            f"{total['changed']} changed, {total['unchanged']} unchanged"
+        )
+
+        duplicates = 0
+        for scraper in self.scrapers:
+            count = getattr(scraper, 'duplicates', 0)
+            if count:
+                logging.info(
+                    f"{scraper.__class__.__name__}: {count} wasted requests, "
+                    f"identical to another page"
+                )
+            duplicates += count
+        logging.info(f"All wasted requests: {duplicates}")
+
+        lost = 0
+        for scraper in self.scrapers:
+            retry = getattr(scraper, 'retry', None)
+            if retry is None:
+                continue
+            for url, error in retry.lost:
+                logging.warning(
+                    f"{scraper.__class__.__name__} lost {url}: {error}")
+            lost += len(retry.lost)
+        logging.info(f"All lost pages: {lost}")
+        self.write_metrics()
+
+    def write_metrics(self) -> None:
+        """
+            Write metrics to metrics_json_path and metrics_prometheus_path,
+            files of an earlier call are replaced
+        """
+        if self.metrics is None:
+            return
+        if self.metrics_json_path:
+            self.metrics.write_json(self.metrics_json_path)
+            logging.info(f"Metrics report written to {self.metrics_json_path}")
+        if self.metrics_prometheus_path:
+            self.metrics.write_prometheus(self.metrics_prometheus_path)
+            logging.info(f"Metrics written to {self.metrics_prometheus_path}")
+
+    def iter_timed(self, data: Iterable[Product]) -> Iterator[Product]:
+        """
+            yield products of data, time the consumer spends on every
+            product is observed as its output time
+        """
+        if self.metrics is None:
+            yield from data
+            return
+        for product in data:
+            start = time.perf_counter()
+            yield product
+            self.metrics.observe(
+                'scraper_output_seconds', time.perf_counter() - start,
+                retailer=product.retailer or ''
+            )
+
+    def save_csv(
+            self,
+            path: str,
+            data: Iterable[Product],
+            flush_every: int = 100
+    ) -> None:
+        """
+            Write products to csv file as they arrive
+
+            :path: csv file path
+            :data: products, list or iterator
+            :flush_every: rows written between flushes, so rows written
+                    before a crash stay in the file
+        """
 
-        active_scrapers = self.scrapers
-        all_products = []
-
-        for scraper in active_scrapers:
-            class_name = scraper.__class__.__name__
-            if class_name in basic_classes:
-                products = scraper.get_products()
-                all_products += products
-            if class_name in discount_classes:
-                products = scraper.get_discounts()
-                all_products += products
-            if class_name in offer_classes:
-                products = scraper.get_offers()
-                all_products += products
-            
-        return all_products
-
-    def save_csv(self, path: str, data: List[dict]) -> None:
-        
         columns = [
-            'Product_ID', 
-            'Product_link', 
+            'Product_ID',
+            'Product_link',
             'Product_image_link',
             'Product_name',
             'Product_measure',
             'Product_price',
             'Product_old_price',
-            'Sale'
+            'Sale',
+            'Retailer',
+            'Category',
+            'Subcategory',
+            'Price_cents',
+            'Old_price_cents',
+            'Discount',
+            'Price_error',
         ]
 
-        def wrapper_unpack_product(product: dict) -> list:
-            row = []
-            name = product.get('id')
-            row.append(name)
-            url = product.get('url')
-            row.append(url)
-            img_url = product.get('img_url')
-            row.append(img_url)
-            name = product.get('name')
-            row.append(name)
-            measure = product.get('description')
-            row.append(measure)
-            price = product.get('price')
-            row.append(price)
-            old_price = product.get('old_price')
-            row.append(old_price)
-            sale = product.get('sale')
-            row.append(sale)
-
-            return row
-
-        data = list(map(
-            wrapper_unpack_product,
-            data
-        ))
+        def wrapper_unpack_product(product: Product) -> tuple:
+            return (
+                product.id,
+                product.url,
+                product.img_url,
+                product.name,
+                product.description,
+                product.price,
+                product.old_price,
+                product.sale,
+                product.retailer,
+                product.category,
+                product.subcategory,
+                product.price_cents,
+                product.old_price_cents,
+                product.discount,
+                product.price_error,
+            )
 
         with open(path, 'w', encoding='utf-8') as csvfile:
 
             writer = csv.writer(csvfile, delimiter = ",", lineterminator="\r")
 
             writer.writerow(columns)
-            writer.writerows(data)
+            for number, product in enumerate(self.iter_timed(data), 1):
+                writer.writerow(wrapper_unpack_product(product))
+                if number % flush_every == 0:
+                    csvfile.flush()
+        self.write_metrics()
+
+    def save_parquet(
+            self,
+            path: str,
+            data: Iterable[Product],
+            row_group_size: int = 10000
+    ) -> None:
+        """
+            Write products to parquet file as they arrive, needs pyarrow
+
+            :path: parquet file path
+            :data: products, list or iterator
+            :row_group_size: products written as one row group
+        """
+        count = parquet.save_parquet(path, self.iter_timed(data), row_group_size)
+        logging.info(f"{count} products saved to {path}")
+        self.write_metrics()
+
+    def save_sqlite(
+            self,
+            path: str,
+            data: Iterable[Product],
+            batch_size: int = 500
+    ) -> None:
+        """
+            Write products to sqlite database as they arrive, the latest
+            state of every product is kept and price changes are added
+            to its history
+
+            :path: sqlite file path
+            :data: products, list or iterator
+            :batch_size: products written in one transaction
+        """
+        database = ProductDatabase(path, batch_size=batch_size)
+        try:
+            count, changes = database.save(self.iter_timed(data))
+        finally:
+            database.close()
+        logging.info(f"{count} products saved to {path}, {changes} price changes")
+        self.write_metrics()
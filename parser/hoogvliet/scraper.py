@@ -1,67 +1,74 @@
 import json
 import logging
-import requests
 
-from typing import List
+from typing import Dict, Iterator, List
 
-from parser.exceptions import ConnectionError
+from parser.product import Product
+from parser.base import BaseScraper
+from parser.pagination import Listing, Paginator
 
 
-class HoogvlieScraper:
+class HoogvlieScraper(BaseScraper):
 
     MAIN_URL = "https://www.hoogvliet.com/"
 
     API_PRODUCTS = "https://navigator-group1.tweakwise.com/navigation/ed681b01"
 
-    HEADERS = "?tn_q=&tn_p=%s&tn_ps=99&tn_sort=&tn_cid=999999&CatalogPermalink=producten&CategoryPermalink=producten&format=json&tn_parameters=ae-productorrecipe=product"
-
-    def __init__(self) -> None:
-        logging.info(f"Initial {self.__class__.__name__}...")
-        logging.info(f"Try to connect {self.MAIN_URL}")
-        if not self.isAviable():
-            logging.error(f"Can't connect to {self.MAIN_URL}")
-            raise ConnectionError(f"Can't connect to {self.MAIN_URL}")
-        logging.info(f"{self.MAIN_URL} aviable!")
-        logging.info("...initial complete")
-
-    def isAviable(self) -> bool:
-        response = requests.get(self.MAIN_URL)
-        if response.status_code == 200:
-            return True
-        return False
-    
-    def get_products(self, start_page: int = 1) -> List[dict]:
-        page = start_page
-        logging.info('Start parsing products...')
-        products_data = []
+    HEADERS = "?tn_q=&tn_p=%s&tn_ps=%s&tn_sort=&tn_cid=999999&CatalogPermalink=producten&CategoryPermalink=producten&format=json&tn_parameters=ae-productorrecipe=product"
+
+    # Products on one page, the most the API returns
+    PAGE_SIZE = 99
+
+    def page_url(self, page: int) -> str:
+        return self.API_PRODUCTS + self.HEADERS % (page, self.PAGE_SIZE)
 
-        def wrapper_product_handler(product: dict) -> dict:
+    def parse_end_page(self, text: str) -> int:
+        data = json.loads(text)
+        return int(data['properties']['nrofpages'])
+
+    def parse_products(self, text: str) -> List[Product]:
+        data = json.loads(text)
+        products = data['items']
+
+        def wrapper_product_handler(product: dict) -> Product:
             name = product['title']
-            logging.info(f'Parsing {name} product...')
+            logging.debug('Parsing %s product...', name)
             url = product['url']
             img_url = product['image']
             price = product['price']
-            product_data = {
-                'name': name,
-                'url': url,
-                'img_url': img_url,
-                'price': price,
-                'old_price': price
-            }
+            product_data = Product(
+                name=name,
+                url=url,
+                img_url=img_url,
+                price=price,
+                old_price=price
+            )
             return product_data
 
-        while(page):
-            logging.info(f'Page: #{page}')
-            url = self.API_PRODUCTS + self.HEADERS % str(page)
-            response = requests.get(url)
-            data = json.loads(response.text)
-            products = data['items']
-            if len(products) == 0:
-                page = None
-                continue
-            products_data += list(map(
-                wrapper_product_handler,
-                products
-            ))
-            page += 1
-        return products_data
\ No newline at end of file
+        products_data = list(map(
+            wrapper_product_handler,
+            products
+        ))
+        return products_data
+
+    def get_products(self, start_page: int = 1) -> List[Product]:
+        return list(self.iter_products(start_page))
+
+    def iter_products(self, start_page: int = 1) -> Iterator[Product]:
+        logging.info('Start parsing products...')
+
+        def wrapper_plan_handler(text: str) -> Dict[int, str]:
+            end_page = self.parse_end_page(text)
+            return {
+                page: self.page_url(page)
+                for page in range(start_page + 1, end_page + 1)
+            }
+
+        listing = Listing(
+            'producten',
+            'producten',
+            self.page_url(start_page),
+            wrapper_plan_handler,
+            start_page
+        )
+        yield from Paginator(self).crawl([listing], self.parse_products)
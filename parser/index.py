@@ -0,0 +1,116 @@
+import re
+
+from typing import Dict, Iterator, Optional, Set
+from urllib.parse import urlsplit, urlunsplit
+
+from parser.product import Product
+
+
+def normalize_url(url: str) -> str:
+    """
+        return url without query, fragment, duplicate and trailing
+        slashes, with lower case scheme and host
+    """
+    parts = urlsplit(url.strip())
+    path = re.sub('/{2,}', '/', parts.path).rstrip('/')
+    return urlunsplit((parts.scheme.lower(), parts.netloc.lower(), path, '', ''))
+
+
+def product_key(product: Product) -> Optional[str]:
+    """
+        return key of product within its retailer: product id, or
+        normalized url when there's no id. None if it has neither
+    """
+    if product.id:
+        return f"id:{str(product.id).strip()}"
+    if product.url:
+        return f"url:{normalize_url(product.url)}"
+    return None
+
+
+class ProductIndex:
+    """
+        Index of products of one retailer by canonical key: retailer and
+        product id, or retailer and normalized url when there's no id.
+
+        Offers and discounts are added first, every base product which
+        streams in later is merged with its offer. A product seen before
+        under the same key is dropped.
+    """
+
+    # Fields of an offer which replace the fields of the base product,
+    # price only when the offer has a new price
+    OFFER_FIELDS = ['price', 'old_price', 'sale']
+
+    def __init__(self, retailer: str) -> None:
+        self.retailer = retailer
+        self.seen: Set[str] = set()
+        self.offers: Dict[str, Product] = {}
+        self.merged = 0
+        self.duplicates = 0
+
+    def key(self, product: Product) -> Optional[str]:
+        """
+            return canonical key of product, None if it has no id and url
+        """
+        key = product_key(product)
+        if key is None:
+            return None
+        return f"{self.retailer}:{key}"
+
+    def add_offer(self, product: Product) -> None:
+        key = self.key(product)
+        if key is None:
+            return
+        offer = self.offers.get(key)
+        if offer is None:
+            self.offers[key] = product
+            return
+        for field in Product.__slots__:
+            value = getattr(product, field)
+            if value:
+                setattr(offer, field, value)
+
+    def merge(self, product: Product) -> Optional[Product]:
+        """
+            return product merged with its offer, None if a product with
+            the same key was merged before
+        """
+        key = self.key(product)
+        if key is None:
+            return product
+        if key in self.seen:
+            self.duplicates += 1
+            return None
+        self.seen.add(key)
+        offer = self.offers.pop(key, None)
+        if offer is None:
+            return product
+        self.merged += 1
+        product = product.copy()
+        has_new_price = self.has_new_price(offer)
+        for field in Product.__slots__:
+            value = getattr(offer, field)
+            if field == 'price' and not has_new_price and product.price:
+                continue
+            if value and (field in self.OFFER_FIELDS or not getattr(product, field)):
+                setattr(product, field, value)
+        return product
+
+    def has_new_price(self, offer: Product) -> bool:
+        """
+            return True if price of offer differs from its old price
+        """
+        if not offer.price:
+            return False
+        return not offer.old_price or str(offer.price).strip() != str(offer.old_price).strip()
+
+    def iter_offers(self) -> Iterator[Product]:
+        """
+            yield offers which didn't match any base product
+        """
+        offers, self.offers = self.offers, {}
+        for key, offer in offers.items():
+            if key not in self.seen:
+                self.seen.add(key)
+                yield offer
@@ -1,35 +1,38 @@
 import logging
-import requests
 
-from typing import List
-from bs4 import BeautifulSoup
+from typing import Dict, Iterator, List
+from urllib.parse import parse_qsl, urlencode, urljoin, urlsplit, urlunsplit
+from bs4 import BeautifulSoup, SoupStrainer
 
-from parser.exceptions import ConnectionError
+from parser.base import BaseScraper, Unit
+from parser.pagination import Listing, Paginator
+from parser.prices import join_price
+from parser.product import Product
+from parser.soup import class_strainer, make_soup
 
 
-class JanlindersScraper:
+class JanlindersScraper(BaseScraper):
 
     MAIN_URL = "https://www.janlinders.nl"
     MAIN_CATALOG = "https://www.janlinders.nl/ons-assortiment.html"
+    DISCOUNTS_URL = "https://www.janlinders.nl/aanbiedingen/~/week/this.html"
 
-    def __init__(self) -> None:
-        logging.info(f"Initial {self.__class__.__name__}...")
-        logging.info(f"Try to connect {self.MAIN_URL}")
-        if not self.isAviable():
-            logging.error(f"Can't connect to {self.MAIN_URL}")
-            raise ConnectionError(f"Can't connect to {self.MAIN_URL}")
-        logging.info(f"{self.MAIN_URL} aviable!")
-        logging.info("...initial complete")
-
-    def isAviable(self) -> bool:
-        response = requests.get(self.MAIN_URL)
-        if response.status_code == 200:
-            return True
-        return False
+    # Only these parts of a page are parsed
+    CATEGORIES_STRAINER = class_strainer('div', 'mod_catalog_navigation')
+    SUBCATEGORIES_STRAINER = SoupStrainer('div', {'id': 'main'})
+    DISCOUNTS_STRAINER = class_strainer('div', 'offer_container')
+    PRODUCTS_STRAINER = class_strainer('div', 'catalog_list_items')
+    PAGINATION_STRAINER = class_strainer('div', 'pagination')
 
     def get_categories(self, url_categories: str, is_sub: bool = False) -> List[dict]:
-        response = requests.get(url_categories)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        return self.fetch_categories(
+            url_categories,
+            lambda html: self.parse_categories(html, is_sub=is_sub)
+        )
+
+    def parse_categories(self, html: str, is_sub: bool = False) -> List[dict]:
+        strainer = self.SUBCATEGORIES_STRAINER if is_sub else self.CATEGORIES_STRAINER
+        soup = make_soup(html, strainer)
         if not is_sub:
             categories_container = soup.find(
                 'div', {'class': 'mod_catalog_navigation'})
@@ -78,51 +81,59 @@ class JanlindersScraper:
         ))
         return categories_data
 
-    def get_discounts(self):
-        url = 'https://www.janlinders.nl/aanbiedingen/~/week/this.html'
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+    def get_discounts(self) -> List[Product]:
+        return list(self.iter_discounts())
+
+    def iter_discounts(self) -> Iterator[Product]:
+        unit = Unit('aanbiedingen', 'aanbiedingen', 1, self.DISCOUNTS_URL)
+        yield from self.crawl([unit], self.parse_discounts)
+
+    def parse_discounts(self, html: str) -> List[Product]:
+        soup = make_soup(html, self.DISCOUNTS_STRAINER)
         products = soup.find_all('div', {'class': 'offer_container'})
-        def wrapper_offers_handler(product: BeautifulSoup) -> dict:
+        def wrapper_offers_handler(product: BeautifulSoup) -> Product:
             try:
                 name = product.find('h3', {'class': 'item_header'})
                 link = name.find('a')['href']
                 name = name.find('a').text
                 img_link = product.find('img', {'class': 'error'})['src']
-                price = product.find('span', {'class': 'teaser'}).find('span', {'class': 'strikethrough'})
-                price = price.text if price else ""
-                old_price = price
+                # Only the price before the discount is shown, the current
+                # price comes from the catalog product the offer is merged into
+                old_price = product.find('span', {'class': 'teaser'}).find('span', {'class': 'strikethrough'})
+                old_price = old_price.text if old_price else None
                 sale = product.find('div', {'class': 'labels'}).text
-                product_data = {
-                        'name': name,
-                        'url': self.MAIN_URL + link,
-                        'img_url': self.MAIN_URL + img_link,
-                        'price': price,
-                        'old_price': old_price,
-                        'sale': sale.strip()
-                    }
+                product_data = Product(
+                        name=name,
+                        url=urljoin(self.MAIN_URL, link),
+                        img_url=urljoin(self.MAIN_URL, img_link),
+                        old_price=old_price,
+                        sale=sale.strip()
+                    )
                 return product_data
             except Exception:
-                return {}
+                return None
 
         products_data = list(map(
             wrapper_offers_handler,
             products
         ))
         products_data = list(filter(
-            lambda x: len(x) != 0,
+            lambda x: x is not None,
             products_data
         ))
         return products_data
 
-    def collect_products(self, subcategory_url: str) -> List[dict]:
-        response = requests.get(subcategory_url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+    def collect_products(self, subcategory_url: str) -> List[Product]:
+        response = self.client.get(subcategory_url)
+        return self.parse_products(response.text)
+
+    def parse_products(self, html: str) -> List[Product]:
+        soup = make_soup(html, self.PRODUCTS_STRAINER)
         products_container = soup.find('div', {'class': 'catalog_list_items'})
         products = products_container.find_all(
             'div', {'class': 'item_container'})
 
-        def wrapper_product_handler(product: BeautifulSoup) -> dict:
+        def wrapper_product_handler(product: BeautifulSoup) -> Product:
             try:
                 name = product.find('span', {'class': 'teaser'}).text
                 name += product.find('h3', {'class': 'item_header'}).find('a').text
@@ -132,31 +143,34 @@ class JanlindersScraper:
                     'div', {'class': 'item_imgcontainer'}).find('img')['src']
                 price = product.find('div', {'class': 'pricebox'}).find(
                     'span', {'class': 'price'})
-                price = price.contents[0] + '.' + price.contents[1].text
+                price = join_price(price.contents[0], price.contents[1].text)
                 old_price = False
-                product_data = {
-                    'name': name,
-                    'url': self.MAIN_URL + '/' + link,
-                    'img_url': link_image,
-                    'price': price,
-                    'old_price': old_price
-                }
+                product_data = Product(
+                    name=name,
+                    url=urljoin(self.MAIN_URL, link),
+                    img_url=link_image,
+                    price=price,
+                    old_price=old_price
+                )
             except Exception:
-                return {}
+                return None
             return product_data
         products_data = list(map(
             wrapper_product_handler,
             products
         ))
         products_data = list(filter(
-            lambda x: len(x) != 0,
+            lambda x: x is not None,
             products_data
         ))
         return products_data
 
     def get_pagination_len(self, url: str) -> int:
-        response = requests.get(url)
-        soup = BeautifulSoup(response.text, 'html.parser')
+        response = self.client.get(url)
+        return self.parse_pagination_len(response.text)
+
+    def parse_pagination_len(self, html: str) -> int:
+        soup = make_soup(html, self.PAGINATION_STRAINER)
         end_pagination = soup.find(
             'div',
             'pagination block'
@@ -170,52 +184,65 @@ class JanlindersScraper:
                 return 1
         return int(end_pagination.split(" ")[-1])
 
-    def get_products(
-            self,
-            to_category: str = None,
-            to_subcategory: str = None,
-            is_end: bool = False
-    ) -> List[dict]:
-        categories = self.get_categories(self.MAIN_CATALOG)
-        products = []
-
-        for category in categories:
-            try:
-                if category['name'] != to_category and to_category:
-                    logging.info(
-                        f"Going to {to_category}, category {category['name']} skipped!")
-                    continue
-                else:
-                    to_category = to_category if is_end else None
-
-                logging.info(f"Handling {category['name']} category...")
-                category_url = category['link']
-                subcategories = self.get_categories(category_url, is_sub=True)
-            except AttributeError:
-                pass
+    def parse_pages(self, html: str, url: str) -> Dict[int, str]:
+        """
+            Build urls of the rest of the pages from the links of the
+            pagination block of the first page
+
+            :html: first page
+            :url: url of the first page
+
+            return page number -> url, pages from the second one
+        """
+        end_pagination = self.parse_pagination_len(html)
+        if end_pagination == 1:
+            return {}
+        soup = make_soup(html, self.PAGINATION_STRAINER)
+        for link in soup.find_all('a', href=True):
+            number = link.get('title', '').split(' ')[-1]
+            if not number.isdigit():
                 continue
+            href = urlsplit(urljoin(url, link['href']))
+            query = parse_qsl(href.query)
+            keys = [key for key, value in query if value == number]
+            if not keys:
+                continue
+
+            def wrapper_page_handler(page: int) -> str:
+                page_query = [
+                    (key, str(page) if key == keys[0] else value)
+                    for key, value in query
+                ]
+                return urlunsplit(href._replace(query=urlencode(page_query)))
+
+            return {
+                page: wrapper_page_handler(page)
+                for page in range(2, end_pagination + 1)
+            }
+        logging.warning(f"Can't read pagination links of {url}")
+        return {}
 
+    def get_products(self) -> List[Product]:
+        return list(self.iter_products())
+
+    def iter_products(self) -> Iterator[Product]:
+        subcategories = self.get_subcategories(
+            self.MAIN_CATALOG,
+            self.parse_categories,
+            lambda html: self.parse_categories(html, is_sub=True)
+        )
+
+        def wrapper_listings_handler() -> Iterator[Listing]:
             for subcategory in subcategories:
-                if subcategory['name'] != to_subcategory and to_subcategory:
-                    logging.info(
-                        f"Going to {to_subcategory}, category {subcategory['name']} skipped!")
-                    continue
-                else:
-                    to_subcategory = to_subcategory if is_end else None
-
-                logging.info(f"Handling {subcategory['name']} subcategory...")
-                subcategory_url = subcategory['link']
-
-                try:
-                    end_pagination = self.get_pagination_len(subcategory_url)
-                    for page in range(1, end_pagination + 1):
-                        logging.info(
-                            f"{subcategory['name']} | Pagination: {page}/{end_pagination}")
-                        url = subcategory_url + f'#!page={page}'
-                        subcategory_products = self.collect_products(
-                            url)
-                        products += subcategory_products
-                except AttributeError:
-                    pass
-
-        return products
+                logging.debug('Handling %s subcategory...', subcategory['name'])
+                yield Listing(
+                    subcategory['category'],
+                    subcategory['name'],
+                    subcategory['link'],
+                    lambda html, url=subcategory['link']: self.parse_pages(html, url)
+                )
+
+        yield from Paginator(self).crawl(
+            wrapper_listings_handler(),
+            self.parse_products
+        )
@@ -0,0 +1,171 @@
+import logging
+import queue
+import threading
+
+from pathlib import Path
+from typing import Any, Callable, Iterable, Iterator
+
+from selenium import webdriver
+from selenium.common.exceptions import WebDriverException
+from selenium.webdriver.chrome.service import Service
+
+
+class DriverPool:
+    """
+        Pool of headless Chrome drivers which share a queue of work.
+
+        Every worker thread owns one driver while it works, drivers are
+        kept between runs until close. A driver which crashes is quit and
+        replaced by a new one, its item is tried again.
+    """
+
+    # Resources which aren't loaded with block_resources,
+    # products are read from the html only
+    BLOCKED_URLS = [
+        '*.png', '*.jpg', '*.jpeg', '*.gif', '*.webp', '*.svg', '*.ico',
+        '*.woff', '*.woff2', '*.ttf', '*.otf',
+        '*.css',
+    ]
+
+    def __init__(
+            self,
+            driver_path: Path | str,
+            size: int = 4,
+            block_resources: bool = True,
+            page_timeout: float = 60,
+            attempts: int = 3
+    ) -> None:
+        """
+            :driver_path: path to chromedriver
+            :size: how many drivers work at the same time
+            :block_resources: don't load images, fonts and css
+            :page_timeout: seconds one page may load
+            :attempts: how often an item is tried on a fresh driver
+        """
+        self.driver_path = driver_path
+        self.size = size
+        self.block_resources = block_resources
+        self.page_timeout = page_timeout
+        self.attempts = attempts
+        self.lock = threading.Lock()
+        self.drivers = []
+        self.idle = queue.LifoQueue()
+
+    def make_driver(self) -> webdriver.Chrome:
+        options = webdriver.ChromeOptions()
+        options.add_argument('--headless=new')
+        options.add_argument('--disable-gpu')
+        options.add_argument('--disable-extensions')
+        if self.block_resources:
+            options.add_experimental_option('prefs', {
+                'profile.managed_default_content_settings.images': 2,
+            })
+        driver = webdriver.Chrome(
+            service=Service(str(self.driver_path)),
+            options=options
+        )
+        driver.set_page_load_timeout(self.page_timeout)
+        if self.block_resources:
+            driver.execute_cdp_cmd('Network.enable', {})
+            driver.execute_cdp_cmd(
+                'Network.setBlockedURLs',
+                {'urls': self.BLOCKED_URLS}
+            )
+        with self.lock:
+            self.drivers.append(driver)
+        return driver
+
+    def quit_driver(self, driver: webdriver.Chrome) -> None:
+        with self.lock:
+            if driver in self.drivers:
+                self.drivers.remove(driver)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def run(self, func: Callable[[webdriver.Chrome, Any], Any], item: Any) -> Any:
+        """
+            Run func on one item, return its result, None if it failed
+        """
+        return next(self.map(func, [item], size=1), None)
+
+    def map(
+            self,
+            func: Callable[[webdriver.Chrome, Any], Any],
+            items: Iterable[Any],
+            size: int = None
+    ) -> Iterator[Any]:
+        """
+            Run func(driver, item) for every item on the drivers of the pool
+
+            :func: work on one item, gets a driver of its worker
+            :items: work queue
+            :size: how many drivers work, None - size of the pool
+
+            yield results as soon as they are ready, not in items order.
+            Items which fail every attempt are logged and skipped
+        """
+        tasks = queue.Queue()
+        for item in items:
+            tasks.put(item)
+        results = queue.Queue()
+        size = min(size if size else self.size, tasks.qsize())
+        done = object()
+
+        def wrapper_worker_handler() -> None:
+            try:
+                driver = self.idle.get_nowait()
+            except queue.Empty:
+                driver = None
+            try:
+                while True:
+                    try:
+                        item = tasks.get_nowait()
+                    except queue.Empty:
+                        return
+                    for attempt in range(1, self.attempts + 1):
+                        try:
+                            if driver is None:
+                                driver = self.make_driver()
+                            results.put(func(driver, item))
+                            break
+                        except WebDriverException as e:
+                            logging.warning(
+                                f"Webdriver failed on {item} "
+                                f"({attempt}/{self.attempts}), recycling it: "
+                                f"{e.msg}"
+                            )
+                            if driver is not None:
+                                self.quit_driver(driver)
+                            driver = None
+                        except Exception as e:
+                            logging.warning(f"Can't handle {item}: {e!r}")
+                            break
+            finally:
+                if driver is not None:
+                    self.idle.put(driver)
+                results.put(done)
+
+        workers = [
+            threading.Thread(target=wrapper_worker_handler, daemon=True)
+            for _ in range(size)
+        ]
+        for worker in workers:
+            worker.start()
+
+        finished = 0
+        while finished < size:
+            result = results.get()
+            if result is done:
+                finished += 1
+                continue
+            yield result
+
+    def close(self) -> None:
+        while not self.idle.empty():
+            self.idle.get_nowait()
+        with self.lock:
+            drivers = list(self.drivers)
+        for driver in drivers:
+            self.quit_driver(driver)
@@ -2,38 +2,164 @@ import json
 import logging
 import requests
 
-from typing import List
+from typing import Dict, Iterable, Iterator, List, Tuple, Union
 from pathlib import Path
+from urllib.parse import urlencode
 
 from bs4 import BeautifulSoup
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 
+from parser.base import BaseScraper, Unit
+from parser.exceptions import ConnectionError
+from parser.fetcher import Request
+from parser.jumbo.pool import DriverPool
+from parser.pagination import Listing, Paginator
+from parser.prices import join_price
+from parser.product import Product
+from parser.soup import class_strainer, make_soup
+
+
+class JumboScraper(BaseScraper):
 
-class JumboScraper:
-    
     MAIN_URL = 'https://www.jumbo.com'
     API_CATEGORIES = 'https://www.jumbo.com/api/category-search-api/categories/tree'
 
-    def __init__(self, driver_path: Path | str) -> None:
+    # Only these parts of a page are parsed
+    PRODUCTS_STRAINER = class_strainer('div', 'jum-card-grid')
+    PAGES_STRAINER = class_strainer('div', 'pages-grid')
+
+    # Products on one page of a subcategory
+    PAGE_SIZE = 24
+
+    # Pass the bot check in the browser once, then fetch categories and
+    # product pages over plain HTTP with the cookies of the browser
+    HYBRID_MODE = True
+
+    # Statuses which mean the browser session expired
+    EXPIRED_STATUSES = (401, 403)
+
+    def __init__(
+            self,
+            driver_path: Path | str,
+            pool_size: int = 4,
+            hybrid: bool = None,
+            **kwargs
+    ) -> None:
+        """
+            :driver_path: path to chromedriver
+            :pool_size: how many headless browsers load pages at once
+            :hybrid: use the browser only for the session, None - HYBRID_MODE
+            :kwargs: client, fetcher, crawl_state and checkpoint
+                    of BaseScraper
+        """
+        super().__init__(check=False, **kwargs)
         logging.info(f"Initial {self.__class__.__name__}...")
-        logging.info('Starting webdriver...')
-        self.driver = webdriver.Chrome(driver_path)
-        logging.info('Webdriver started')
+        self.pool = DriverPool(driver_path, size=pool_size)
+        self.hybrid = self.HYBRID_MODE if hybrid is None else hybrid
+        # Shared by all requests, updated in place by bootstrap
+        self.headers = {}
+        if self.hybrid:
+            self.bootstrap()
         self.categories = self.get_categories()
+        logging.info("...initial complete")
+
+    def bootstrap(self) -> None:
+        """
+            Open MAIN_URL in the browser to pass the bot check, take over
+            its cookies and user agent for plain HTTP requests
+        """
+        logging.info('Starting browser session...')
+
+        def wrapper_session_handler(driver: webdriver.Chrome, url: str) -> Tuple[List[dict], str]:
+            driver.get(url)
+            user_agent = driver.execute_script('return navigator.userAgent')
+            return driver.get_cookies(), user_agent
+
+        session = self.pool.run(wrapper_session_handler, self.MAIN_URL)
+        self.pool.close()
+        if session is None:
+            logging.error(f"Can't connect to {self.MAIN_URL}")
+            raise ConnectionError(f"Can't connect to {self.MAIN_URL}")
+        cookies, user_agent = session
+        for cookie in cookies:
+            self.client.session.cookies.set(
+                cookie['name'],
+                cookie['value'],
+                domain=cookie.get('domain'),
+                path=cookie.get('path', '/')
+            )
+        self.headers.update({
+            'User-Agent': user_agent,
+            'Accept': 'text/html,application/json',
+        })
+        logging.info(f"Browser session started, {len(cookies)} cookies")
+
+    def request(self, url: str) -> Request:
+        return url, {'headers': self.headers}
+
+    def restore_request(self, request: Union[str, list]) -> Request:
+        # Requests share the headers of the browser session
+        return self.request(super().restore_request(request)[0])
+
+    def is_expired(self, response: Union[requests.Response, Exception]) -> bool:
+        return not isinstance(response, Exception) \
+            and response.status_code in self.EXPIRED_STATUSES
+
+    def fetch_many(
+            self,
+            requests_: Iterable[Request]
+    ) -> List[Union[requests.Response, Exception]]:
+        """
+            fetch_many which starts a new browser session when the
+            current one expired and fetches expired requests again
+        """
+        requests_ = list(requests_)
+        responses = super().fetch_many(requests_)
+        expired = [
+            i for i, response in enumerate(responses)
+            if self.is_expired(response)
+        ]
+        if not self.hybrid or not expired:
+            return responses
+        logging.info(f"{self.__class__.__name__}: browser session expired")
+        self.bootstrap()
+        retried = super().fetch_many(requests_[i] for i in expired)
+        for i, response in zip(expired, retried):
+            responses[i] = response
+        return responses
 
     def get_categories(self) -> List[dict]:
         logging.info('Try to get categories...')
-        self.driver.get(self.API_CATEGORIES)
-        response = self.driver.find_element(By.TAG_NAME, 'body')
-        data = json.loads(str(response.text))
-        categroies = data['data']['subpages']
-        return categroies
-
-    def collect_products(self, url_products: str) -> List[dict]:
-        self.driver.get(url_products)
-        page_html = self.driver.page_source
-        soup = BeautifulSoup(page_html, 'html.parser')
+        if self.hybrid:
+            _, response = next(self.iter_fetch([self.request(self.API_CATEGORIES)]))
+            if isinstance(response, Exception):
+                return []
+            return response.json()['data']['subpages']
+
+        def wrapper_categories_handler(driver: webdriver.Chrome, url: str) -> List[dict]:
+            driver.get(url)
+            response = driver.find_element(By.TAG_NAME, 'body')
+            data = json.loads(str(response.text))
+            return data['data']['subpages']
+
+        categories = self.pool.run(
+            wrapper_categories_handler, self.API_CATEGORIES)
+        return categories if categories else []
+
+    def page_url(self, link: str, offset: int) -> str:
+        """
+            return url of the page of subcategory which starts at offset
+        """
+        query = urlencode({'offSet': offset, 'pageSize': self.PAGE_SIZE})
+        return f"{self.MAIN_URL}{link}?{query}"
+
+    def collect_products(self, driver: webdriver.Chrome, url_products: str) -> List[Product]:
+        driver.get(url_products)
+        return self.parse_products(driver.page_source)
+
+    def parse_products(self, page_html: str) -> List[Product]:
+        soup = make_soup(page_html, self.PRODUCTS_STRAINER)
         product_container = soup.find(
             'div',
             {'class': 'jum-card-grid'}
@@ -43,7 +169,7 @@ class JumboScraper:
             {'class': 'product-container'}
         )
 
-        def wrapper_product_handler(product: BeautifulSoup) -> dict:
+        def wrapper_product_handler(product: BeautifulSoup) -> Product:
             try:
                 name = product.find('a', {'class': 'title-link'}).text
                 link = self.MAIN_URL + product.find(
@@ -55,59 +181,141 @@ class JumboScraper:
                     {'class': 'image'}
                 )['src']
                 description = ' '.join(
-                    product.find('div', {'class': 'subtitle'}).find_all('a').text
+                    link.text for link in
+                    product.find('div', {'class': 'subtitle'}).find_all('a')
                 )
                 price = product.find(
                     'div',
                     {'class': 'current-price'}
                 )
-                price = price.find('span').text + '.' + price.findt('sup').text
+                price = join_price(price.find('span').text, price.find('sup').text)
                 old_price = price
                 sale = product.find('span', {'class': 'jum-tag prominent'})
                 if sale:
                     sale = sale.text
-                product_data = {
-                    'name': name,
-                    'url': link,
-                    'img_url': img_link,
-                    'description': description,
-                    'price': price,
-                    'old_price': old_price,
-                    'sale': sale
-                }
+                product_data = Product(
+                    name=name,
+                    url=link,
+                    img_url=img_link,
+                    description=description,
+                    price=price,
+                    old_price=old_price,
+                    sale=sale
+                )
                 return product_data
             except Exception:
-                return {}
+                return None
         
         products_data = list(map(
                 wrapper_product_handler,
                 product_cards
             ))
+        products_data = list(filter(
+            lambda x: x is not None,
+            products_data
+        ))
         return products_data
 
-    def get_products(self) -> List[dict]:
-        categories = self.categories
-        products_data = []
-        for category in categories:
-            logging.info(f'Parsing {category["title"]} category...')
-            subcategories = category['subpages']
-            for subcategory in subcategories:
-                url = self.MAIN_URL + subcategory['link']
-                logging.info(f'Parsing {subcategory["title"]} subcategory...')
-                try:
-                    self.driver.get(url)
-                    html_page = self.driver.page_source
-                    soup = BeautifulSoup(html_page, 'html.parser')
-                    soup = soup.find('div', {'class': 'pages-grid'})
-                    page_end = soup.find('span', {'class': 'page-text'}).text
-                    offset_end = 24 * int(page_end)
-                except Exception:
-                    continue
-                for offset_number in range(0, offset_end, 24):
-                    logging.info(f'{offset_number} pagination offset')
-                    headers = f'?offSet={offset_number}&pageSize=24'
-                    url += headers
-                    print(url)
-                    products = self.collect_products(url)
-                    products_data += products
-        return products_data
+    def get_products(self) -> List[Product]:
+        return list(self.iter_products())
+
+    def parse_end_page(self, page_html: str) -> int:
+        soup = make_soup(page_html, self.PAGES_STRAINER)
+        soup = soup.find('div', {'class': 'pages-grid'})
+        return int(soup.find('span', {'class': 'page-text'}).text)
+
+    def iter_products(self) -> Iterator[Product]:
+        if not self.hybrid:
+            yield from self.iter_browser_products()
+            return
+
+        subcategories = []
+        for category in self.categories:
+            for subcategory in category['subpages']:
+                subcategories.append((category['title'], subcategory))
+
+        def wrapper_listings_handler() -> Iterator[Listing]:
+            for category_name, subcategory in subcategories:
+                link = subcategory['link']
+
+                def wrapper_plan_handler(html: str, link: str = link) -> Dict[int, Request]:
+                    end_page = self.parse_end_page(html)
+                    return {
+                        page: self.request(self.page_url(
+                            link, (page - 1) * self.PAGE_SIZE))
+                        for page in range(2, end_page + 1)
+                    }
+
+                logging.debug('Parsing %s subcategory...', subcategory['title'])
+                yield Listing(
+                    category_name,
+                    subcategory['title'],
+                    self.request(self.page_url(link, 0)),
+                    wrapper_plan_handler
+                )
+
+        yield from Paginator(self).crawl(
+            wrapper_listings_handler(),
+            self.parse_products
+        )
+
+    def iter_browser_products(self) -> Iterator[Product]:
+        """
+            Load the first page of every subcategory, then the rest of
+            the pages, both on all drivers of the pool
+
+            yield product
+        """
+        subcategories = []
+        for category in self.categories:
+            for subcategory in category['subpages']:
+                subcategories.append((category['title'], subcategory))
+
+        def wrapper_first_page_handler(
+                driver: webdriver.Chrome,
+                subcategory: Tuple[str, dict]
+        ) -> Tuple[Unit, dict, int, List[Product]]:
+            category_name, subcategory = subcategory
+            logging.debug('Parsing %s subcategory...', subcategory['title'])
+            unit = Unit(
+                category_name,
+                subcategory['title'],
+                1,
+                self.page_url(subcategory['link'], 0)
+            )
+            driver.get(unit.request)
+            html_page = driver.page_source
+            return (
+                unit,
+                subcategory,
+                self.parse_end_page(html_page),
+                self.parse_products(html_page)
+            )
+
+        def wrapper_page_handler(
+                driver: webdriver.Chrome,
+                unit: Unit
+        ) -> Tuple[Unit, List[Product]]:
+            logging.debug('Parsing %s...', unit.request)
+            return unit, self.collect_products(driver, unit.request)
+
+        self.plan_pages(len(subcategories))
+        try:
+            units = []
+            for unit, subcategory, end_page, products in self.pool.map(
+                    wrapper_first_page_handler, subcategories):
+                yield from self.tag(unit, products)
+                for page in range(2, end_page + 1):
+                    units.append(unit._replace(
+                        page=page,
+                        request=self.page_url(
+                            subcategory['link'],
+                            (page - 1) * self.PAGE_SIZE
+                        )
+                    ))
+
+            self.plan_pages(len(units))
+            for unit, products in self.pool.map(wrapper_page_handler, units):
+                yield from self.tag(unit, products)
+        finally:
+            self.pool.close()
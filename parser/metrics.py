@@ -0,0 +1,195 @@
+import bisect
+import json
+import math
+import os
+import threading
+
+from pathlib import Path
+from typing import Dict, List, Tuple
+from urllib.parse import urlsplit
+
+
+# Bucket bounds of histograms
+SECONDS_BUCKETS = [
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025,
+    0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300,
+]
+BYTES_BUCKETS = [2 ** power for power in range(10, 25, 2)]
+COUNT_BUCKETS = [0, 1, 5, 10, 25, 50, 100, 250, 500, 1000]
+
+# Name -> (type, help, buckets) of every metric
+METRICS = {
+    'scraper_http_request_seconds': (
+        'histogram', 'Latency of HTTP requests', SECONDS_BUCKETS),
+    'scraper_http_response_bytes': (
+        'histogram', 'Decoded size of HTTP responses', BYTES_BUCKETS),
+    'scraper_parse_seconds': (
+        'histogram', 'Time of parsing one page', SECONDS_BUCKETS),
+    'scraper_page_products': (
+        'histogram', 'Products extracted from one page', COUNT_BUCKETS),
+    'scraper_pages_total': (
+        'counter', 'Pages by result of extraction', None),
+    'scraper_stage_seconds': (
+        'histogram', 'Time of one pass of a stage of the handler', SECONDS_BUCKETS),
+    'scraper_output_seconds': (
+        'histogram', 'Time of writing one product', SECONDS_BUCKETS),
+}
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+class Histogram:
+
+    def __init__(self, buckets: List[float]) -> None:
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """
+            return (upper bound, observations up to it) of every bucket
+        """
+        total = 0
+        result = []
+        for bound, count in zip(self.buckets + [math.inf], self.counts):
+            total += count
+            result.append(('+Inf' if bound == math.inf else repr(bound), total))
+        return result
+
+    def quantile(self, q: float) -> float | None:
+        """
+            return upper bound of the bucket of quantile q,
+            None - it's above the last bucket
+        """
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(self.buckets, self.counts):
+            total += count
+            if total >= rank and count:
+                return bound
+        return None
+
+
+class Metrics:
+    """
+        Thread safe registry of histograms and counters labeled by
+        retailer, category, stage, etc.
+
+        Exported at the end of a run as a json report and as a file in
+        the Prometheus text format.
+    """
+
+    def __init__(self) -> None:
+        self.lock = threading.Lock()
+        self.series: Dict[Tuple[str, Labels], object] = {}
+        # host -> retailer, so requests of the shared client are
+        # counted for their retailer
+        self.retailers: Dict[str, str] = {}
+
+    def add_retailer(self, url: str, retailer: str) -> None:
+        self.retailers[urlsplit(url).netloc] = retailer
+
+    def retailer(self, url: str) -> Tuple[str, str]:
+        """
+            return (retailer, host) of url
+        """
+        host = urlsplit(url).netloc
+        return self.retailers.get(host, ''), host
+
+    def observe(self, name: str, value: float, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            histogram = self.series.get(key)
+            if histogram is None:
+                histogram = self.series[key] = Histogram(METRICS[name][2])
+            histogram.observe(value)
+
+    def count(self, name: str, value: float = 1, **labels: str) -> None:
+        key = (name, tuple(sorted(labels.items())))
+        with self.lock:
+            self.series[key] = self.series.get(key, 0) + value
+
+    def to_dict(self) -> dict:
+        """
+            return report: metric -> type, help and series with labels,
+            count, sum, mean, p50, p90, p99 and buckets of histograms
+        """
+        report = {}
+        with self.lock:
+            series = sorted(self.series.items())
+            for (name, labels), value in series:
+                kind, help_, _ = METRICS[name]
+                metric = report.setdefault(
+                    name, {'type': kind, 'help': help_, 'series': []})
+                item = {'labels': dict(labels)}
+                if isinstance(value, Histogram):
+                    item.update({
+                        'count': value.count,
+                        'sum': value.sum,
+                        'mean': value.sum / value.count if value.count else None,
+                        'p50': value.quantile(0.5),
+                        'p90': value.quantile(0.9),
+                        'p99': value.quantile(0.99),
+                        'buckets': dict(value.cumulative()),
+                    })
+                else:
+                    item['value'] = value
+                metric['series'].append(item)
+        return report
+
+    def to_prometheus(self) -> str:
+        lines = []
+        with self.lock:
+            series = sorted(self.series.items())
+            last = None
+            for (name, labels), value in series:
+                kind, help_, _ = METRICS[name]
+                if name != last:
+                    lines.append(f"# HELP {name} {help_}")
+                    lines.append(f"# TYPE {name} {kind}")
+                    last = name
+                if not isinstance(value, Histogram):
+                    lines.append(f"{name}{format_labels(labels)} {value}")
+                    continue
+                for bound, count in value.cumulative():
+                    lines.append(
+                        f"{name}_bucket{format_labels(labels + (('le', bound),))} {count}")
+                lines.append(f"{name}_sum{format_labels(labels)} {value.sum}")
+                lines.append(f"{name}_count{format_labels(labels)} {value.count}")
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path: Path | str) -> None:
+        write_atomic(path, json.dumps(self.to_dict(), indent=4))
+
+    def write_prometheus(self, path: Path | str) -> None:
+        write_atomic(path, self.to_prometheus())
+
+
+def format_labels(labels: Labels) -> str:
+    if not labels:
+        return ''
+    values = ','.join(
+        f'{name}="{escape(str(value))}"' for name, value in labels
+    )
+    return '{' + values + '}'
+
+
+def escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def write_atomic(path: Path | str, text: str) -> None:
+    """
+        Replace file with text, a reader never sees a half written file
+    """
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path_tmp = path.with_suffix(path.suffix + '.tmp')
+    path_tmp.write_text(text, encoding='utf-8')
+    os.replace(path_tmp, path)
@@ -0,0 +1,92 @@
+import logging
+
+from typing import Callable, Dict, Iterable, Iterator, List, NamedTuple
+
+from parser.base import BaseScraper, Unit
+from parser.fetcher import Request
+from parser.product import Product
+
+
+class Listing(NamedTuple):
+    """
+        Paginated list of products.
+
+        plan gets the text of the first page and returns requests of the
+        rest of the pages, page number -> request
+    """
+    category: str
+    subcategory: str
+    request: Request
+    plan: Callable[[str], Dict[int, Request]]
+    page: int = 1
+
+
+class Paginator:
+    """
+        Crawls paginated listings of a scraper.
+
+        The first pages of all listings are fetched concurrently, every
+        first page tells how many pages its listing has and its products
+        are taken from the same response. The rest of the pages are
+        crawled concurrently as units of the scraper. A listing first_pages
+        by an unfinished previous run isn't fetched again, its pages
+        are read from the checkpoint.
+    """
+
+    def __init__(self, scraper: BaseScraper) -> None:
+        self.scraper = scraper
+
+    def crawl(
+            self,
+            listings: Iterable[Listing],
+            parse: Callable[[str], List[Product]]
+    ) -> Iterator[Product]:
+        """
+            :listings: listings to crawl
+            :parse: function which parses products from page text
+
+            yield product
+        """
+        listings = list(listings)
+        scraper = self.scraper
+        scraper.plan_pages(len(listings))
+        units = []
+        first_pages = []
+        for listing in listings:
+            unit = Unit(listing.category, listing.subcategory, listing.page, listing.request)
+            pages = scraper.checkpoint_get_pages(unit)
+            products = scraper.checkpoint_get(unit) if pages is not None else None
+            if products is None:
+                first_pages.append(listing)
+                continue
+            yield from scraper.tag(unit, products)
+            units += [
+                Unit(listing.category, listing.subcategory, page, page_request)
+                for page, page_request in pages.items()
+            ]
+
+        responses = scraper.iter_fetch(listing.request for listing in first_pages)
+        for listing, (request, response) in zip(first_pages, responses):
+            if isinstance(response, Exception):
+                continue
+            url = scraper.request_url(request)
+            unit = Unit(listing.category, listing.subcategory, listing.page, request)
+            try:
+                pages = listing.plan(response.text)
+                products = scraper.extract(
+                    request, response, parse, listing.category)
+                scraper.checkpoint_add_pages(unit, pages)
+                scraper.checkpoint_add(unit, products)
+            except Exception as e:
+                scraper.retry.lose(url, f"can't parse: {e!r}")
+                continue
+            logging.debug(
+                '%s | %s: %d pages',
+                listing.category, listing.subcategory, len(pages) + 1
+            )
+            yield from scraper.tag(unit, products)
+            units += [
+                Unit(listing.category, listing.subcategory, page, page_request)
+                for page, page_request in pages.items()
+            ]
+        yield from scraper.crawl(units, parse)
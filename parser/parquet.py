@@ -0,0 +1,140 @@
+from pathlib import Path
+from typing import Iterable, Iterator, List
+
+from parser.product import Product, as_text
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = None
+    pq = None
+
+
+# Columns with few distinct values, stored once per row group
+DICTIONARY_COLUMNS = ['retailer', 'category', 'subcategory', 'sale']
+
+# Raw values of scrapers which aren't always strings (numbers from JSON,
+# False from Janlinders), written as text
+TEXT_COLUMNS = ['id', 'price', 'old_price']
+
+
+def require_pyarrow() -> None:
+    if pa is None:
+        raise ImportError("pyarrow is needed for parquet files: pip install pyarrow")
+
+
+def schema() -> 'pa.Schema':
+    require_pyarrow()
+    category = pa.dictionary(pa.int32(), pa.string())
+    return pa.schema([
+        ('id', pa.string()),
+        ('name', pa.string()),
+        ('description', pa.string()),
+        ('url', pa.string()),
+        ('img_url', pa.string()),
+        ('price', pa.string()),
+        ('old_price', pa.string()),
+        ('sale', category),
+        ('retailer', category),
+        ('category', category),
+        ('subcategory', category),
+        ('price_cents', pa.int32()),
+        ('old_price_cents', pa.int32()),
+        ('discount', pa.int8()),
+        ('price_error', pa.string()),
+    ])
+
+
+class ParquetWriter:
+    """
+        Writes products to a parquet file with typed columns.
+
+        Rows are buffered by column and written as a row group every
+        row_group_size products, so memory doesn't grow with the crawl.
+        The file is readable after close.
+    """
+
+    def __init__(self, path: Path | str, row_group_size: int = 10000) -> None:
+        """
+            :path: parquet file path
+            :row_group_size: products in one row group
+        """
+        require_pyarrow()
+        self.schema = schema()
+        self.row_group_size = row_group_size
+        self.writer = pq.ParquetWriter(
+            str(path),
+            self.schema,
+            compression='zstd',
+            use_dictionary=DICTIONARY_COLUMNS
+        )
+        self.columns = {name: [] for name in self.schema.names}
+        self.rows = 0
+
+    def write(self, product: Product) -> None:
+        for name, column in self.columns.items():
+            value = getattr(product, name)
+            if name in TEXT_COLUMNS:
+                value = as_text(value)
+            column.append(value)
+        self.rows += 1
+        if self.rows % self.row_group_size == 0:
+            self.flush()
+
+    def flush(self) -> None:
+        """
+            Write buffered products as one row group
+        """
+        if not self.columns['name']:
+            return
+        table = pa.Table.from_pydict(self.columns, schema=self.schema)
+        self.writer.write_table(table, row_group_size=self.row_group_size)
+        self.columns = {name: [] for name in self.schema.names}
+
+    def close(self) -> None:
+        self.flush()
+        self.writer.close()
+
+    def __enter__(self) -> 'ParquetWriter':
+        return self
+
+    def __exit__(self, *args) -> None:
+        self.close()
+
+
+def save_parquet(
+        path: Path | str,
+        data: Iterable[Product],
+        row_group_size: int = 10000
+) -> int:
+    """
+        Write products to parquet file as they arrive
+
+        return how many products were written
+    """
+    with ParquetWriter(path, row_group_size) as writer:
+        for product in data:
+            writer.write(product)
+    return writer.rows
+
+
+def read_parquet(path: Path | str, columns: List[str] = None) -> 'pa.Table':
+    """
+        Read products saved by ParquetWriter as arrow table
+
+        :path: parquet file path
+        :columns: columns to read, None - all columns
+    """
+    require_pyarrow()
+    return pq.read_table(str(path), columns=columns)
+
+
+def iter_parquet_products(path: Path | str) -> Iterator[Product]:
+    """
+        yield products saved by ParquetWriter, one row group at a time
+    """
+    require_pyarrow()
+    for batch in pq.ParquetFile(str(path)).iter_batches():
+        for row in batch.to_pylist():
+            yield Product.from_dict(row)
@@ -1,22 +1,27 @@
 import json
 import logging
-import requests
-import traceback
 
 from pathlib import Path
-from typing import List
+from typing import Dict, Iterator, List
 from bs4 import BeautifulSoup
 
-# from parser.exceptions import ConnectionError
+from parser.base import BaseScraper, Unit
+from parser.pagination import Listing, Paginator
+from parser.product import Product
 
 
-class PoieszScrapper:
+class PoieszScrapper(BaseScraper):
 
     MAIN_URL = "https://www.poiesz-supermarkten.nl/"
     API_URL = "https://api.poiesz-supermarkten.nl/api/v1.0/products/%s/%s/products"
 
     API_OFFERS = "https://api.poiesz-supermarkten.nl/api/v1.0/offers?storeNumber=null"
 
+    # Products asked for on one page of a subcategory, large pages take
+    # fewer requests. The number of pages is read from the first page,
+    # so pagination stays right when the API serves smaller pages
+    PAGE_SIZE = 100
+
     PATH_DATA = Path(
             Path.cwd(),
             'parser',
@@ -25,54 +30,45 @@ class PoieszScrapper:
             'data.json'
         )
 
-    def __init__(self) -> None:
-        logging.info(f"Initial {self.__class__.__name__}...")
-        logging.info(f"Try to connect {self.MAIN_URL}")
-        if not self.isAviable():
-            logging.error(f"Can't connect to {self.MAIN_URL}")
-            raise ConnectionError(f"Can't connect to {self.MAIN_URL}")
-        logging.info(f"{self.MAIN_URL} aviable!")
-        logging.info("...initial complete")
-
-    def isAviable(self) -> bool:
-        response = requests.get(self.MAIN_URL)
-        if response.status_code == 200:
-            return True
-        return False
-
     def get_end_page(self, url: str, headers: dict) -> int:
-        response = requests.get(
+        response = self.client.get(
             url=url,
             headers=headers
         )
-        data = json.loads(response.text)
+        return self.parse_end_page(response.text)
+
+    def parse_end_page(self, text: str) -> int:
+        data = json.loads(text)
         end_page = int(data['paging']['pages'])
         return end_page
 
-    def collect_products(self, url: str, headers: dict) -> List[dict]:
-        response = requests.get(
+    def collect_products(self, url: str, headers: dict) -> List[Product]:
+        response = self.client.get(
             url=url,
             headers=headers
         )
-        data = json.loads(response.text)
+        return self.parse_products(response.text)
+
+    def parse_products(self, text: str) -> List[Product]:
+        data = json.loads(text)
         products = data['items']
-        def wrapper_product_handler(product: dict) -> dict:
+        def wrapper_product_handler(product: dict) -> Product:
             name = product['name']
-            logging.info(f'Parsing {name} product...')
+            logging.debug('Parsing %s product...', name)
             url = "https://webwinkel.poiesz-supermarkten.nl/boodschappen/producten/" + str(product['id'])
             img_url = product['image']
             price = product['price']
             old_price = price
-            product_data = {
-                'id': str(product['id']),
-                'name': name,
-                'url': url,
-                'description': product['description'],
-                'img_url': img_url,
-                'price': price,
-                'old_price': old_price,
-                'sale': '0%'
-            }
+            product_data = Product(
+                id=str(product['id']),
+                name=name,
+                url=url,
+                description=product['description'],
+                img_url=img_url,
+                price=price,
+                old_price=old_price,
+                sale='0%'
+            )
             return product_data
 
         products = list(map(
@@ -81,22 +77,28 @@ class PoieszScrapper:
         ))
         return products
 
-    def get_offers(self) -> List[dict]:
-        response = requests.get(self.API_OFFERS)
-        data = json.loads(response.text)
+    def get_offers(self) -> List[Product]:
+        return list(self.iter_offers())
+
+    def iter_offers(self) -> Iterator[Product]:
+        unit = Unit('offers', 'offers', 1, self.API_OFFERS)
+        yield from self.crawl([unit], self.parse_offers)
+
+    def parse_offers(self, text: str) -> List[Product]:
+        data = json.loads(text)
         logging.info('Parsing offers...')
         categories = data['categories']
         products_data = []
 
         for category in categories:
-            logging.info(f'Parsing {category["name"]} category...')
+            logging.debug('Parsing %s category...', category['name'])
             offers = category['offers']
 
             for product in offers:
                 def wrapper_product_handler(product_id: int):
                     product_id = str(product_id)
                     name = product['commercialTextLine1']
-                    logging.info(f'Parsing {name} product')
+                    logging.debug('Parsing %s product', name)
                     url = 'https://webwinkel.poiesz-supermarkten.nl/boodschappen/producten/' + product_id
                     img_url = f'https://webwinkel.poiesz-supermarkten.nl/artikelen/{product_id}.png'
                     desc_1 = product['commercialTextDetailsLine1']
@@ -115,16 +117,16 @@ class PoieszScrapper:
                     sale_3 = product['offerTypeLine3']
                     sale_3 = sale_3 if sale_3 else ""
                     sale = sale_1 + sale_2 + sale_3
-                    product_data = {
-                        'id': product_id,
-                        'name': name,
-                        'description': description,
-                        'url': url,
-                        'img_url': img_url,
-                        'price': price,
-                        'old_price': old_price,
-                        'sale': sale
-                    }
+                    product_data = Product(
+                        id=product_id,
+                        name=name,
+                        description=description,
+                        url=url,
+                        img_url=img_url,
+                        price=price,
+                        old_price=old_price,
+                        sale=sale
+                    )
                     return product_data
                 
                 offer_products_data = list(map(
@@ -134,46 +136,50 @@ class PoieszScrapper:
                 products_data += offer_products_data
         return products_data
 
-    def get_products(self) -> List[dict]:
+    def get_products(self) -> List[Product]:
+        return list(self.iter_products())
+
+    def iter_products(self) -> Iterator[Product]:
         with open(self.PATH_DATA, 'r', encoding='utf-8') as file:
             categories = json.load(file)
-        products = []
 
+        subcategories = []
         for category in categories:
-            category_name = category['name']
-            logging.info(f'Parsing {category_name} category...')
-            subcategories = category['subcategories']
-            
+            for subcategory in category['subcategories']:
+                subcategories.append((category['name'], subcategory))
+
+        def wrapper_request_handler(url: str, page: int) -> tuple:
+            headers = {
+                'page': str(page),
+                'pageSize': str(self.PAGE_SIZE),
+                'storeNumber': 'null'
+            }
+            return url, {'headers': headers}
+
+        def wrapper_listings_handler() -> Iterator[Listing]:
             for subcategory in subcategories:
-                subcategory_name = subcategory
-                logging.info(f'Parsing {subcategory_name} subcategory...')
-
-                url = self.API_URL % (category_name, subcategory_name)
-                headers = {
-                    'page': "1",
-                    'storeNumber': 'null'
-                }
-                try:
-                    end_page = self.get_end_page(url, headers)
-                except json.JSONDecodeError:
-                    logging.warning(
-                        f"JSONDecodeError : {url}"
-                    )
+                category_name, subcategory_name = subcategory
+                url = self.API_URL % subcategory
+
+                def wrapper_plan_handler(text: str, url: str = url) -> Dict[int, tuple]:
+                    end_page = self.parse_end_page(text)
+                    return {
+                        page: wrapper_request_handler(url, page)
+                        for page in range(2, end_page + 1)
+                    }
 
-                for page in range(1, end_page + 1):
-                    logging.info(f'Parsing {page}/{end_page} page products...')
-                    headers['page'] = str(page)
-                    try:
-                        page_products = self.collect_products(
-                            url=url,
-                            headers=headers
-                        )
-                        products += page_products
-                    except Exception as e:
-                        logging.error(traceback.format_exc())
+                yield Listing(
+                    category_name,
+                    subcategory_name,
+                    wrapper_request_handler(url, 1),
+                    wrapper_plan_handler
+                )
+
+        yield from Paginator(self).crawl(
+            wrapper_listings_handler(),
+            self.parse_products
+        )
 
-        return products
-        
 
 if __name__ == "__main__":
     pass
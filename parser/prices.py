@@ -0,0 +1,167 @@
+import itertools
+import logging
+import re
+import threading
+import time
+
+from decimal import ROUND_HALF_UP, Decimal
+from typing import Any, Dict, Iterable, Iterator, Optional, Tuple
+
+from parser.metrics import Metrics
+from parser.product import Product
+
+
+# Euros with optional cents: '1.29', '1,29', '€ 1,29', '1.-', '3'
+PRICE_RE = re.compile(r'(?:€|eur)?\s*(\d+)(?:\s*[.,]\s*(\d{1,2}|-{1,2}))?\s*(?:€|eur)?', re.I)
+
+
+class PriceError(ValueError):
+    pass
+
+
+def join_price(euros: str, cents: str) -> str:
+    """
+        Join euros and cents rendered in separate tags, with or without
+        a separator after the euros, to 'euros.cents'
+    """
+    return f"{euros.strip().rstrip('.,')}.{cents.strip()}"
+
+
+def parse_cents(value: Any) -> Optional[int]:
+    """
+        Parse price of a scraper to integer cents
+
+        :value: number of euros, price text or empty value
+
+        return cents, None if there's no price.
+        Raise PriceError if value isn't a price
+    """
+    if value is None or value is False or value == '':
+        return None
+    if isinstance(value, bool):
+        raise PriceError(f"can't parse {value!r}")
+    if isinstance(value, (int, float)):
+        if value < 0:
+            raise PriceError(f"negative price {value!r}")
+        # str() gives the shortest text of a float, 1.005 and not
+        # 1.00499999999999989..., so it's rounded as it's written
+        euros = Decimal(str(value))
+        if not euros.is_finite():
+            raise PriceError(f"can't parse {value!r}")
+        return int(euros.quantize(Decimal('0.01'), rounding=ROUND_HALF_UP) * 100)
+    if not isinstance(value, str):
+        raise PriceError(f"can't parse {value!r}")
+    text = ' '.join(value.split())
+    if not text:
+        return None
+    match = PRICE_RE.fullmatch(text)
+    if match is None:
+        raise PriceError(f"can't parse {value!r}")
+    euros, cents = match.groups()
+    if not cents or cents.startswith('-'):
+        cents = '00'
+    return int(euros) * 100 + int(cents.ljust(2, '0'))
+
+
+def discount(price: Optional[int], old_price: Optional[int]) -> Optional[int]:
+    """
+        return discount of price in whole percents of old_price
+    """
+    if price is None or old_price is None:
+        return None
+    if not old_price or price >= old_price:
+        return 0
+    return round((old_price - price) * 100 / old_price)
+
+
+class PriceNormalizer:
+    """
+        Turns price and old_price of products into integer cents and
+        computes their discount.
+
+        Products are handled in batches, every distinct price text of a
+        batch is parsed once. A value which isn't a price is reported in
+        price_error of its product, raw values are kept as they are.
+    """
+
+    def __init__(self, batch_size: int = 500, metrics: Metrics = None) -> None:
+        """
+            :batch_size: products normalized at once
+            :metrics: time of every batch is observed per retailer
+        """
+        self.batch_size = batch_size
+        self.metrics = metrics
+        self.lock = threading.Lock()
+        self.normalized = 0
+        self.errors = 0
+
+    def parse_batch(self, values: Iterable[Any]) -> Dict[Any, Tuple[Optional[int], Optional[str]]]:
+        """
+            return value -> (cents, error) for every distinct value
+        """
+        parsed = {}
+        for value in values:
+            key = (type(value), value)
+            if key in parsed:
+                continue
+            try:
+                parsed[key] = parse_cents(value), None
+            except PriceError as e:
+                parsed[key] = None, str(e)
+        return parsed
+
+    def apply(self, product: Product, parsed: dict) -> None:
+        price, price_error = parsed[type(product.price), product.price]
+        old_price, old_price_error = parsed[type(product.old_price), product.old_price]
+        errors = []
+        if price_error:
+            errors.append(f"price: {price_error}")
+        if old_price_error:
+            errors.append(f"old_price: {old_price_error}")
+        if old_price is None and not old_price_error:
+            old_price = price
+        product.price_cents = price
+        product.old_price_cents = old_price
+        product.discount = discount(price, old_price)
+        product.price_error = '; '.join(errors) or None
+
+    def normalize(self, products: Iterable[Product]) -> Iterator[Product]:
+        """
+            :products: products with raw prices
+
+            yield the same products with price_cents, old_price_cents,
+            discount and price_error set
+        """
+        products = iter(products)
+        while True:
+            batch = list(itertools.islice(products, self.batch_size))
+            if not batch:
+                return
+            start = time.perf_counter()
+            parsed = self.parse_batch(itertools.chain.from_iterable(
+                (product.price, product.old_price) for product in batch
+            ))
+            errors = 0
+            for product in batch:
+                self.apply(product, parsed)
+                if product.price_error:
+                    errors += 1
+                    logging.warning(
+                        f"{product.retailer} | {product.name}: "
+                        f"{product.price_error}"
+                    )
+            with self.lock:
+                self.normalized += len(batch)
+                self.errors += errors
+            if self.metrics is not None:
+                self.metrics.observe(
+                    'scraper_stage_seconds', time.perf_counter() - start,
+                    retailer=batch[0].retailer or '', stage='normalize'
+                )
+            yield from batch
+
+    def log_stats(self) -> None:
+        logging.info(
+            f"Prices: {self.normalized} products normalized, "
+            f"{self.errors} with unparseable prices"
+        )
@@ -0,0 +1,120 @@
+import sys
+
+from typing import Any, Optional
+
+
+def intern(value: Any) -> Any:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def as_text(value: Any) -> Optional[str]:
+    """
+        return raw value of a scraper (number from JSON, False from
+        Janlinders) as text, None if there's no value
+    """
+    if value is None or value is False:
+        return None
+    return value if isinstance(value, str) else str(value)
+
+
+class Product:
+    """
+        Product of a retailer produced by all scrapers.
+
+        Fields are kept in __slots__ instead of a dict per product.
+        Retailer, category and subcategory are interned, so products
+        of one category share the same strings. price_cents,
+        old_price_cents, discount and price_error are set by
+        parser.prices.PriceNormalizer.
+    """
+
+    __slots__ = (
+        'id',
+        'name',
+        'description',
+        'url',
+        'img_url',
+        'price',
+        'old_price',
+        'sale',
+        'retailer',
+        'category',
+        'subcategory',
+        'price_cents',
+        'old_price_cents',
+        'discount',
+        'price_error',
+    )
+
+    def __init__(
+            self,
+            name: str = None,
+            url: str = None,
+            img_url: str = None,
+            price: Any = None,
+            old_price: Any = None,
+            sale: str = None,
+            description: str = None,
+            id: str = None,
+            retailer: str = None,
+            category: str = None,
+            subcategory: str = None,
+            price_cents: int = None,
+            old_price_cents: int = None,
+            discount: int = None,
+            price_error: str = None
+    ) -> None:
+        self.id = id
+        self.name = name
+        self.description = description
+        self.url = url
+        self.img_url = img_url
+        self.price = price
+        self.old_price = old_price
+        self.sale = sale
+        self.retailer = intern(retailer)
+        self.category = intern(category)
+        self.subcategory = intern(subcategory)
+        self.price_cents = price_cents
+        self.old_price_cents = old_price_cents
+        self.discount = discount
+        self.price_error = price_error
+
+    def set_origin(self, retailer: str, category: str = None, subcategory: str = None) -> None:
+        """
+            Set retailer and category of product, fields which are
+            already set are kept
+        """
+        if self.retailer is None:
+            self.retailer = intern(retailer)
+        if self.category is None:
+            self.category = intern(category)
+        if self.subcategory is None:
+            self.subcategory = intern(subcategory)
+
+    def copy(self) -> 'Product':
+        return Product.from_dict(self.to_dict())
+
+    def to_dict(self) -> dict:
+        return {field: getattr(self, field) for field in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, data: dict) -> 'Product':
+        return cls(**{
+            field: value for field, value in data.items()
+            if field in cls.__slots__
+        })
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, Product):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    # Equal products have equal fields, but fields are changed after the
+    # product is built (set_origin, PriceNormalizer), so a hash of them
+    # would go stale in a set or dict. Products are unhashable, key them
+    # by parser.index.product_key instead
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        return f"Product({self.retailer}, {self.name!r}, {self.price!r})"
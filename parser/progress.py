@@ -0,0 +1,113 @@
+import logging
+import threading
+import time
+
+from datetime import timedelta
+from typing import Dict
+
+
+class RetailerProgress:
+    """
+        Counters of one retailer
+    """
+
+    def __init__(self) -> None:
+        self.products = 0
+        self.pages = 0
+        self.pages_planned = 0
+        # Subcategory -> products parsed from its pages
+        self.subcategories: Dict[str, int] = {}
+
+
+class Progress:
+    """
+        Cheap progress counters of a crawl per retailer and subcategory,
+        a summary line is logged at most every interval seconds instead
+        of a line per product.
+
+        Every counter has one writer, so they aren't locked: pages are
+        counted by the scraper of the retailer, products by the consumer
+        of the handler, which also logs the summary lines.
+    """
+
+    def __init__(self, interval: float = 10) -> None:
+        """
+            :interval: seconds between summary lines, None or 0 - only
+                    counters are kept
+        """
+        self.interval = interval
+        self.lock = threading.Lock()
+        self.retailers: Dict[str, RetailerProgress] = {}
+        self.start = time.monotonic()
+        self.next_report = self.start + (interval or 0)
+        self.last_time = self.start
+        self.last_products = 0
+        self.products = 0
+
+    def retailer(self, name: str) -> RetailerProgress:
+        progress = self.retailers.get(name)
+        if progress is None:
+            with self.lock:
+                progress = self.retailers.setdefault(name, RetailerProgress())
+        return progress
+
+    def plan(self, retailer: str, pages: int) -> None:
+        """
+            Add pages retailer is going to crawl to the total
+        """
+        self.retailer(retailer).pages_planned += pages
+
+    def page_done(self, retailer: str, subcategory: str, products: int) -> None:
+        progress = self.retailer(retailer)
+        progress.pages += 1
+        progress.subcategories[subcategory] = \
+            progress.subcategories.get(subcategory, 0) + products
+
+    def add_products(self, retailer: str, count: int = 1) -> None:
+        self.retailer(retailer).products += count
+        self.products += count
+        self.tick()
+
+    def tick(self) -> None:
+        """
+            Log the summary line when interval has passed since the last one
+        """
+        if not self.interval:
+            return
+        now = time.monotonic()
+        if now < self.next_report:
+            return
+        self.next_report = now + self.interval
+        self.report(now)
+
+    def report(self, now: float) -> None:
+        rate = (self.products - self.last_products) / (now - self.last_time)
+        self.last_time = now
+        self.last_products = self.products
+        retailers = list(self.retailers.values())
+        pages = sum(progress.pages for progress in retailers)
+        planned = sum(progress.pages_planned for progress in retailers)
+        eta = '?'
+        if pages and planned >= pages:
+            seconds = (planned - pages) * (now - self.start) / pages
+            eta = str(timedelta(seconds=int(seconds)))
+        logging.info(
+            'Progress: %d products, %.1f products/s, pages %d/%d, ETA %s',
+            self.products, rate, pages, max(planned, pages), eta
+        )
+
+    def log_stats(self) -> None:
+        elapsed = time.monotonic() - self.start
+        logging.info(
+            'Progress: %d products in %s, %.1f products/s',
+            self.products, timedelta(seconds=int(elapsed)),
+            self.products / elapsed if elapsed else 0
+        )
+        for name, progress in sorted(self.retailers.items()):
+            logging.info(
+                '%s: %d products, %d pages of %d subcategories',
+                name, progress.products, progress.pages,
+                len(progress.subcategories)
+            )
+            for subcategory, count in sorted(progress.subcategories.items()):
+                logging.debug('%s | %s: %d products', name, subcategory, count)
@@ -0,0 +1,191 @@
+import logging
+import random
+import threading
+import time
+
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+from urllib.parse import urlsplit
+
+
+class RetryPolicy(NamedTuple):
+    """
+        How often and how late a failed request is tried again
+    """
+    attempts: int = 4
+    base_delay: float = 1
+    max_delay: float = 60
+
+    def delay(self, attempt: int) -> float:
+        """
+            return seconds before the attempt, exponential backoff
+            with full jitter
+        """
+        return random.uniform(
+            0, min(self.max_delay, self.base_delay * 2 ** attempt))
+
+
+class Deferred(NamedTuple):
+    """
+        Failed item waiting in the retry queue
+    """
+    item: Any
+    url: str
+    attempt: int
+    ready_at: float
+    error: str
+
+
+class CircuitBreaker:
+    """
+        Stops requests to a host after threshold failures in a row.
+        After cooldown requests are let through again, a success closes
+        the circuit, a failure opens it at once for twice as long.
+    """
+
+    def __init__(
+            self,
+            host: str,
+            threshold: int = 5,
+            cooldown: float = 30,
+            max_cooldown: float = 300
+    ) -> None:
+        self.host = host
+        self.threshold = threshold
+        self.min_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.failures = 0
+        self.open_until = 0.0
+
+    def is_open(self) -> bool:
+        return time.monotonic() < self.open_until
+
+    def success(self) -> None:
+        self.failures = 0
+        self.cooldown = self.min_cooldown
+
+    def failure(self) -> None:
+        self.failures += 1
+        if self.failures >= self.threshold and not self.is_open():
+            self.open_until = time.monotonic() + self.cooldown
+            logging.warning(
+                f"Circuit {self.host}: open for {self.cooldown:.0f}s "
+                f"after {self.failures} failures"
+            )
+            self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+
+
+def failure_reason(response) -> Optional[Tuple[str, bool]]:
+    """
+        :response: response or exception of a request
+
+        return (reason, is retryable) of a failed request, None on success
+    """
+    if isinstance(response, Exception):
+        return repr(response), True
+    if response.status_code == 429 or response.status_code >= 500:
+        return f"HTTP {response.status_code}", True
+    if response.status_code >= 400:
+        return f"HTTP {response.status_code}", False
+    return None
+
+
+class RetryQueue:
+    """
+        Failed requests of a scraper which are tried again later.
+
+        Every host has a circuit breaker, an item of a host with an open
+        circuit waits until it closes. Items which run out of attempts or
+        fail permanently are kept in lost with the reason.
+    """
+
+    def __init__(self, policy: RetryPolicy = RetryPolicy()) -> None:
+        self.policy = policy
+        self.lock = threading.Lock()
+        self.items: List[Deferred] = []
+        self.breakers: Dict[str, CircuitBreaker] = {}
+        self.lost: List[Tuple[str, str]] = []
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def breaker(self, url: str) -> CircuitBreaker:
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.breakers:
+                self.breakers[host] = CircuitBreaker(host)
+            return self.breakers[host]
+
+    def is_open(self, url: str) -> bool:
+        return self.breaker(url).is_open()
+
+    def record(self, url: str, response) -> Optional[Tuple[str, bool]]:
+        """
+            Count response in the circuit breaker of its host
+
+            return failure_reason of response
+        """
+        reason = failure_reason(response)
+        breaker = self.breaker(url)
+        with self.lock:
+            if reason is None:
+                breaker.success()
+            elif reason[1]:
+                breaker.failure()
+        return reason
+
+    def push(self, item: Any, url: str, attempt: int, error: str) -> None:
+        """
+            Put item back to the queue, item is lost when it ran out
+            of attempts
+
+            :attempt: number of the next attempt, from 1
+        """
+        if attempt >= self.policy.attempts:
+            self.lose(url, f"{error}, {attempt} attempts")
+            return
+        ready_at = max(
+            time.monotonic() + self.policy.delay(attempt),
+            self.breaker(url).open_until
+        )
+        logging.info(f"Retry {url} in {ready_at - time.monotonic():.1f}s: {error}")
+        with self.lock:
+            self.items.append(Deferred(item, url, attempt, ready_at, error))
+
+    def defer(self, item: Any, url: str, attempt: int, error: str) -> None:
+        """
+            Put item back to the queue until the circuit of its host
+            closes, the attempt isn't counted
+        """
+        ready_at = self.breaker(url).open_until
+        with self.lock:
+            self.items.append(Deferred(item, url, attempt, ready_at, error))
+
+    def lose(self, url: str, error: str) -> None:
+        logging.warning(f"Lost {url}: {error}")
+        with self.lock:
+            self.lost.append((url, error))
+
+    def wait(self, limit: int) -> List[Deferred]:
+        """
+            Block until items are ready to be tried again
+
+            :limit: the most items returned
+
+            return ready items, removed from the queue
+        """
+        with self.lock:
+            if not self.items:
+                return []
+            self.items.sort(key=lambda deferred: deferred.ready_at)
+            ready_at = self.items[0].ready_at
+        time.sleep(max(0.0, ready_at - time.monotonic()))
+        now = time.monotonic()
+        with self.lock:
+            ready = [
+                deferred for deferred in self.items
+                if deferred.ready_at <= now
+            ][:limit]
+            for deferred in ready:
+                self.items.remove(deferred)
+        return ready
@@ -0,0 +1,209 @@
+import logging
+import threading
+import time
+
+from email.utils import parsedate_to_datetime
+from typing import Dict, NamedTuple, Optional
+from urllib.parse import urlsplit
+
+
+class RateLimit(NamedTuple):
+    """
+        Token bucket of a host: rate requests per second on average,
+        at most burst requests at once
+    """
+    rate: float
+    burst: int
+
+
+class HostState:
+    """
+        Token bucket and adaptive concurrency limit of one host
+    """
+
+    def __init__(self, host: str, rate_limit: RateLimit, max_concurrency: int) -> None:
+        self.host = host
+        self.rate_limit = rate_limit
+        self.max_concurrency = max_concurrency
+        self.condition = threading.Condition()
+        self.tokens = float(rate_limit.burst)
+        self.refilled_at = time.monotonic()
+        self.paused_until = 0.0
+        self.limit = max(1.0, max_concurrency / 2)
+        self.in_flight = 0
+        self.latency = None
+        self.baseline = None
+        self.decreased_at = 0.0
+        self.throttled = 0
+
+    def refill(self, now: float) -> None:
+        self.tokens = min(
+            self.rate_limit.burst,
+            self.tokens + (now - self.refilled_at) * self.rate_limit.rate
+        )
+        self.refilled_at = now
+
+    def acquire(self) -> None:
+        """
+            Block until the host has a free slot and a token
+        """
+        with self.condition:
+            while True:
+                now = time.monotonic()
+                self.refill(now)
+                if now < self.paused_until:
+                    wait = self.paused_until - now
+                elif self.in_flight >= int(self.limit):
+                    wait = None
+                elif self.tokens < 1:
+                    wait = (1 - self.tokens) / self.rate_limit.rate
+                else:
+                    self.tokens -= 1
+                    self.in_flight += 1
+                    return
+                self.condition.wait(wait)
+
+    def release(self) -> None:
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+    def set_limit(self, limit: float, reason: str) -> None:
+        limit = min(max(limit, 1.0), self.max_concurrency)
+        if int(limit) != int(self.limit):
+            logging.info(
+                f"Scheduler {self.host}: concurrency "
+                f"{int(self.limit)} -> {int(limit)} ({reason})"
+            )
+        self.limit = limit
+        self.condition.notify_all()
+
+    def record(
+            self,
+            latency: float,
+            status_code: Optional[int],
+            retry_after: Optional[float]
+    ) -> None:
+        """
+            Adjust concurrency after a response: additive increase while
+            latency is stable, multiplicative decrease on throttling,
+            failed requests or rising latency
+
+            :latency: seconds of the request
+            :status_code: status of the response, None - request failed
+            :retry_after: seconds of Retry-After header
+        """
+        with self.condition:
+            now = time.monotonic()
+            if status_code is None or status_code in (429, 503):
+                if status_code is not None:
+                    self.throttled += 1
+                if retry_after:
+                    self.paused_until = max(self.paused_until, now + retry_after)
+                    logging.info(
+                        f"Scheduler {self.host}: {status_code}, "
+                        f"paused for {retry_after:.1f}s (Retry-After)"
+                    )
+                if now - self.decreased_at > (self.latency or 0):
+                    self.decreased_at = now
+                    reason = f"HTTP {status_code}" if status_code else 'request failed'
+                    self.set_limit(self.limit / 2, reason)
+                return
+
+            if status_code != 200:
+                return
+
+            # Fast and slow moving averages, latency rises when the fast
+            # one gets well above the slow one
+            if self.latency is None:
+                self.latency = self.baseline = latency
+            self.latency = 0.7 * self.latency + 0.3 * latency
+            self.baseline = 0.95 * self.baseline + 0.05 * latency
+
+            if self.latency > 1.5 * self.baseline:
+                if now - self.decreased_at > self.latency:
+                    self.decreased_at = now
+                    self.set_limit(
+                        self.limit * 0.75,
+                        f"latency {self.latency:.2f}s, "
+                        f"usual {self.baseline:.2f}s"
+                    )
+            else:
+                self.set_limit(
+                    self.limit + 1 / self.limit,
+                    f"latency {self.latency:.2f}s stable"
+                )
+
+
+class Scheduler:
+    """
+        Schedules requests of HttpClient per host.
+
+        Every host has a token bucket (RateLimit set by the scraper of
+        the host, DEFAULT_RATE_LIMIT for other hosts) and a concurrency
+        limit which is adjusted by AIMD: it grows while latency is stable
+        and is cut on 429/503, Retry-After or rising latency.
+    """
+
+    DEFAULT_RATE_LIMIT = RateLimit(rate=10, burst=10)
+
+    def __init__(self, max_concurrency: int = 8) -> None:
+        """
+            :max_concurrency: upper bound of requests in flight per host
+        """
+        self.max_concurrency = max_concurrency
+        self.lock = threading.Lock()
+        self.hosts: Dict[str, HostState] = {}
+        self.rate_limits: Dict[str, RateLimit] = {}
+
+    def configure(self, url: str, rate_limit: RateLimit) -> None:
+        """
+            Set rate limit of the host of url
+        """
+        host = urlsplit(url).netloc
+        with self.lock:
+            self.rate_limits[host] = rate_limit
+            if host in self.hosts:
+                self.hosts[host].rate_limit = rate_limit
+
+    def host(self, url: str) -> HostState:
+        host = urlsplit(url).netloc
+        with self.lock:
+            if host not in self.hosts:
+                self.hosts[host] = HostState(
+                    host,
+                    self.rate_limits.get(host, self.DEFAULT_RATE_LIMIT),
+                    self.max_concurrency
+                )
+            return self.hosts[host]
+
+    def acquire(self, url: str) -> HostState:
+        state = self.host(url)
+        state.acquire()
+        return state
+
+    def log_stats(self) -> None:
+        with self.lock:
+            hosts = list(self.hosts.values())
+        for state in hosts:
+            latency = f"{state.latency:.2f}s" if state.latency else '-'
+            logging.info(
+                f"Scheduler {state.host}: concurrency {int(state.limit)}, "
+                f"latency {latency}, {state.throttled} throttled"
+            )
+
+
+def parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+        return seconds of Retry-After header, seconds or HTTP date
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
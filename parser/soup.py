@@ -0,0 +1,82 @@
+import logging
+import re
+
+from bs4 import BeautifulSoup, SoupStrainer
+
+
+# Parser backends of BeautifulSoup, the fastest available one is used
+# unless another one is configured
+BACKENDS = [
+    'lxml',
+    'html.parser',
+]
+
+backend = 'html.parser'
+
+# make_soup builds the tree only of the parts matched by the strainer,
+# False - the whole page, to compare both
+strainers = True
+
+
+def is_available(name: str) -> bool:
+    try:
+        BeautifulSoup('', name)
+    except Exception:
+        return False
+    return True
+
+
+def set_backend(name: str = None) -> str:
+    """
+        Select parser backend used by make_soup
+
+        :name: backend name, None - the fastest available one
+
+        return selected backend
+    """
+    global backend
+    if name is None:
+        name = next(filter(is_available, BACKENDS))
+    elif not is_available(name):
+        fallback = next(filter(is_available, BACKENDS))
+        logging.warning(
+            f"HTML parser {name} is not installed, {fallback} is used")
+        name = fallback
+    backend = name
+    return backend
+
+
+def set_strainers(enabled: bool) -> None:
+    global strainers
+    strainers = enabled
+
+
+def class_strainer(name: str, *classes: str) -> SoupStrainer:
+    """
+        Strainer of tags which have any of css classes, also when the tag
+        has several classes (class="pagination block")
+
+        :name: tag name
+        :classes: css classes
+
+        return SoupStrainer
+    """
+    pattern = re.compile(
+        r'(^|\s)(%s)(\s|$)' % '|'.join(map(re.escape, classes)))
+    return SoupStrainer(name, {'class': pattern})
+
+
+def make_soup(markup: str, parse_only: SoupStrainer = None) -> BeautifulSoup:
+    """
+        Parse html with the selected backend
+
+        :markup: html
+        :parse_only: build tree only for elements matched by strainer
+
+        return bs4 object
+    """
+    return BeautifulSoup(
+        markup, backend, parse_only=parse_only if strainers else None)
+
+
+set_backend()
@@ -0,0 +1,69 @@
+import json
+import time
+
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+from parser.product import Product
+from parser.storage import SqliteStore
+
+
+class CrawlState(SqliteStore):
+    """
+        Persistent state of the crawl kept in a sqlite database.
+
+        Holds a content fingerprint of every fetched page and the products
+        extracted from it, so a page which didn't change since the last
+        run is not parsed again.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        super().__init__(path)
+        self.connection.execute(
+            '''
+            CREATE TABLE IF NOT EXISTS pages (
+                retailer TEXT NOT NULL,
+                key TEXT NOT NULL,
+                fingerprint TEXT NOT NULL,
+                products TEXT NOT NULL,
+                updated_at REAL NOT NULL,
+                PRIMARY KEY (retailer, key)
+            )
+            '''
+        )
+
+    def get(self, retailer: str, key: str) -> Optional[Tuple[str, List[Product]]]:
+        """
+            return (fingerprint, products) of the page from the last run
+        """
+        with self.lock:
+            row = self.connection.execute(
+                'SELECT fingerprint, products FROM pages '
+                'WHERE retailer = ? AND key = ?',
+                (retailer, key)
+            ).fetchone()
+        if row is None:
+            return None
+        return row[0], list(map(Product.from_dict, json.loads(row[1])))
+
+    def set(
+            self,
+            retailer: str,
+            key: str,
+            fingerprint: str,
+            products: List[Product]
+    ) -> None:
+        with self.lock:
+            self.connection.execute(
+                'INSERT OR REPLACE INTO pages VALUES (?, ?, ?, ?, ?)',
+                (
+                    retailer,
+                    key,
+                    fingerprint,
+                    json.dumps(
+                        [product.to_dict() for product in products],
+                        ensure_ascii=False
+                    ),
+                    time.time()
+                )
+            )
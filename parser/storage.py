@@ -0,0 +1,64 @@
+import json
+import os
+import sqlite3
+import threading
+
+from pathlib import Path
+
+
+class JsonStore:
+    """
+        Small persistent key-value store kept in one json file.
+
+        Values must be json serializable, save() replaces the file
+        atomically so a crash never leaves a broken store behind.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.path = Path(path)
+        self.lock = threading.Lock()
+        self.data = {}
+        if self.path.exists():
+            with open(self.path, 'r', encoding='utf-8') as file:
+                self.data = json.load(file)
+
+    def get(self, key: str, default=None):
+        with self.lock:
+            return self.data.get(key, default)
+
+    def set(self, key: str, value) -> None:
+        with self.lock:
+            self.data[key] = value
+
+    def save(self) -> None:
+        with self.lock:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            path_tmp = self.path.with_suffix(self.path.suffix + '.tmp')
+            with open(path_tmp, 'w', encoding='utf-8') as file:
+                json.dump(self.data, file, ensure_ascii=False)
+            os.replace(path_tmp, self.path)
+
+
+class SqliteStore:
+    """
+        Base of the stores kept in a sqlite database: checkpoint, crawl
+        state, response cache and product database.
+
+        The connection is shared by all threads in autocommit mode, WAL
+        lets readers go on while a transaction is written. Every use of
+        the connection must hold the lock.
+    """
+
+    def __init__(self, path: Path | str) -> None:
+        self.lock = threading.Lock()
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(
+            str(path),
+            check_same_thread=False,
+            isolation_level=None
+        )
+        self.connection.execute('PRAGMA journal_mode=WAL')
+
+    def close(self) -> None:
+        with self.lock:
+            self.connection.close()
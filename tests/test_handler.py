@@ -0,0 +1,93 @@
+import asyncio
+import logging
+import threading
+
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Iterator, List
+
+import pytest
+
+from parser.archive import ArchiveReader
+from parser.base import BaseScraper, Unit
+from parser.handler import ParserHandler
+from parser.product import Product
+
+
+class PageHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self) -> None:
+        data = f'<p>{self.path}</p>'.encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/html; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args) -> None:
+        pass
+
+
+@pytest.fixture
+def server_url():
+    server = ThreadingHTTPServer(('127.0.0.1', 0), PageHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{server.server_port}'
+    server.shutdown()
+    server.server_close()
+
+
+def make_handler(url: str, **kwargs) -> ParserHandler:
+
+    class PageScraper(BaseScraper):
+
+        MAIN_URL = url + '/'
+
+        def parse_page_products(self, html: str) -> List[Product]:
+            # <p>/page/N</p>
+            return [Product(name=html, url=url + html[3:-4] + '/product', price='1.00')]
+
+        def iter_products(self) -> Iterator[Product]:
+            units = [
+                Unit('category', f'subcategory {page}', 1, f'{url}/page/{page}')
+                for page in range(3)
+            ]
+            yield from self.crawl(units, self.parse_page_products)
+
+    class PageHandler(ParserHandler):
+        SCRAPER_CLASSES = [PageScraper]
+        BASIC_CLASSES = ['PageScraper']
+
+    return PageHandler(
+        path_webdriver=None,
+        ignore_scrapers=[],
+        logging_level=logging.WARNING,
+        normalize_prices=False,
+        **kwargs
+    )
+
+
+def test_two_runs_are_archived_separately(server_url, tmp_path):
+    handler = make_handler(server_url, archive_path=tmp_path)
+    try:
+        first = handler.get_products()
+        second = handler.get_products(concurrent=True)
+    finally:
+        handler.close()
+    assert len(first) == len(second) == 3
+    archives = sorted(tmp_path.glob('*.warc.gz'))
+    assert len(archives) == 2
+    for path in archives:
+        replay = ArchiveReader(path)
+        assert replay.get(f'{server_url}/page/2').text == '<p>/page/2</p>'
+        replay.close()
+
+
+def test_aget_products_runs_the_concurrent_crawl(server_url):
+    handler = make_handler(server_url)
+    try:
+        products = asyncio.run(handler.aget_products())
+    finally:
+        handler.close()
+    assert sorted(product.url for product in products) == [
+        f'{server_url}/page/{page}/product' for page in range(3)
+    ]
@@ -0,0 +1,59 @@
+from parser.index import ProductIndex
+from parser.janlinders.scraper import JanlindersScraper
+from parser.prices import PriceNormalizer
+from parser.product import Product
+
+
+CATALOG = (
+    '<div class="catalog_list_items"><div class="item_container">'
+    '<div class="item_imgcontainer"><img src="/media/1.jpg"></div>'
+    '<span class="teaser">500 g </span>'
+    '<h3 class="item_header"><a href="producten/product-1.html">Kaas</a></h3>'
+    '<div class="pricebox"><span class="price">2.<sup>37</sup></span></div>'
+    '</div></div>'
+)
+
+OFFERS = (
+    '<div class="offer_container">'
+    '<h3 class="item_header"><a href="producten/product-1.html">Kaas</a></h3>'
+    '<img class="error" src="/media/offers/1.jpg">'
+    '<span class="teaser"><span class="strikethrough">3.37</span></span>'
+    '<div class="labels"> 2e halve prijs </div></div>'
+)
+
+
+def merge(offers, products):
+    index = ProductIndex('JanlindersScraper')
+    list(map(index.add_offer, offers))
+    return list(filter(None, map(index.merge, products)))
+
+
+def test_janlinders_discount_keeps_catalog_price():
+    scraper = JanlindersScraper(check=False)
+    products = merge(
+        scraper.parse_discounts(OFFERS),
+        scraper.parse_products(CATALOG)
+    )
+    product = next(PriceNormalizer().normalize(products))
+    assert product.price == '2.37'
+    assert product.old_price == '3.37'
+    assert product.sale == '2e halve prijs'
+    assert product.price_cents == 237
+    assert product.old_price_cents == 337
+    assert product.discount == 30
+
+
+def test_offer_with_new_price_replaces_price():
+    offer = Product(url='https://shop/p/1', price='1.50', old_price='2.00')
+    product = Product(url='https://shop/p/1/', price='2.00')
+    [merged] = merge([offer], [product])
+    assert merged.price == '1.50'
+    assert merged.old_price == '2.00'
+
+
+def test_offer_without_new_price_keeps_price():
+    offer = Product(url='https://shop/p/1', price='2.00', old_price='2.00', sale='1+1')
+    product = Product(url='https://shop/p/1', price='1.80')
+    [merged] = merge([offer], [product])
+    assert merged.price == '1.80'
+    assert merged.sale == '1+1'
@@ -0,0 +1,31 @@
+import pytest
+
+from parser.prices import PriceError, discount, parse_cents
+
+
+@pytest.mark.parametrize('value, cents', [
+    (1.005, 101),
+    (0.285, 29),
+    (2.37, 237),
+    (3, 300),
+    ('1,29', 129),
+    ('€ 1.29', 129),
+    ('1.-', 100),
+    ('2.5', 250),
+    (None, None),
+    ('', None),
+    (False, None),
+])
+def test_parse_cents(value, cents):
+    assert parse_cents(value) == cents
+
+
+@pytest.mark.parametrize('value', [-1.5, float('nan'), float('inf'), True, 'gratis'])
+def test_parse_cents_rejects(value):
+    with pytest.raises(PriceError):
+        parse_cents(value)
+
+
+def test_discount():
+    assert discount(237, 337) == 30
+    assert discount(337, 337) == 0